@@ -402,6 +402,23 @@ else
     fi
 fi
 
+# Local caches that aren't committed: the manifest database is built from
+# docs_manifest.json, and the search index from the docs (so the first /docs
+# search doesn't have to build it)
+if command -v python3 >/dev/null 2>&1; then
+    echo "Building local indexes..."
+    if python3 "$INSTALL_DIR/scripts/manifest_store.py" --docs-dir "$INSTALL_DIR/docs" import >/dev/null 2>&1; then
+        echo "✓ Manifest database built"
+    else
+        echo "  ⚠️  Could not build the manifest database; docs_manifest.json will be read instead"
+    fi
+    if python3 "$INSTALL_DIR/scripts/search_index.py" --docs-dir "$INSTALL_DIR/docs" update >/dev/null 2>&1; then
+        echo "✓ Search index built"
+    else
+        echo "  ⚠️  Could not build the search index; /docs will search with grep instead"
+    fi
+fi
+
 # Always update command (in case it points to old location)
 echo "Setting up /docs command..."
 mkdir -p ~/.claude/commands
@@ -445,7 +462,7 @@ When showing what's new:
 📎 Full changelog: https://github.com/brennacodes/claude-code-docs/commits/main/docs
 📚 COMMUNITY MIRROR - NOT AFFILIATED WITH ANTHROPIC
 
-Every request checks for the latest documentation from GitHub (takes ~0.4s).
+Docs are served from the local copy instantly; updates from GitHub are pulled in the background.
 The helper script handles all functionality including auto-updates.
 
 Execute: ~/.claude-code-docs/claude-docs-helper.sh "$ARGUMENTS"
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Content-addressed, block-deduplicated storage of the documentation pages.
+
+The API reference under docs/platform/api/ is rendered once per SDK, so most
+of its 20+ MB is the same text several times over. The block store splits
+every page into blocks of whole lines, keeps each distinct block once
+(zlib-compressed) and records each page as a recipe: the list of its blocks,
+keyed by the SHA-256 of the page that the manifest already holds.
+
+The markdown files in docs/ remain the copy that git tracks and the /docs
+helper reads, so the fetcher doesn't write to the store. `pack` builds it
+from docs/ to measure how much deduplication would save; snapshot deltas
+(snapshot_bundle.py) use the same block boundaries.
+
+Block boundaries depend only on the content (a line ends a block when its
+CRC-32 matches BOUNDARY_MASK and the block is at least MIN_BLOCK bytes), so an
+edit or an SDK-specific code sample early in a page only changes the blocks
+around it instead of shifting every block after it.
+
+Everything lives in one SQLite file, docs/_blocks.db (gitignored):
+
+    blocks(hash, size, data)     SHA-256 of the block -> zlib-compressed bytes
+    recipes(hash, size, blocks)  SHA-256 of the page -> concatenated block hashes
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import sys
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+BLOCKS_FILE = "_blocks.db"
+
+# Block boundaries: a line whose CRC-32 has these bits clear ends a block of
+# at least MIN_BLOCK bytes; no block grows past MAX_BLOCK
+MIN_BLOCK = 1024
+MAX_BLOCK = 16384
+BOUNDARY_MASK = 31
+COMPRESSION_LEVEL = 6
+
+DIGEST_SIZE = 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    hash BLOB PRIMARY KEY,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recipes (
+    hash BLOB PRIMARY KEY,
+    size INTEGER NOT NULL,
+    blocks BLOB NOT NULL
+);
+"""
+
+
+def split_blocks(data: bytes) -> Iterator[bytes]:
+    """Split content into blocks of whole lines at content-defined boundaries."""
+    start = 0
+    end = 0
+    for line in data.splitlines(keepends=True):
+        end += len(line)
+        size = end - start
+        if size >= MAX_BLOCK:
+            # An oversized line is cut at fixed offsets
+            while end - start > MAX_BLOCK:
+                yield data[start:start + MAX_BLOCK]
+                start += MAX_BLOCK
+            yield data[start:end]
+            start = end
+        elif size >= MIN_BLOCK and (zlib.crc32(line) & BOUNDARY_MASK) == 0:
+            yield data[start:end]
+            start = end
+    if end > start:
+        yield data[start:end]
+
+
+class BlockStore:
+    """
+    Pages stored as deduplicated blocks, addressed by their SHA-256.
+
+    Safe to share between the fetcher's worker threads.
+
+    Usage:
+        with BlockStore(docs_dir / BLOCKS_FILE) as store:
+            content_hash = store.put(data)
+            data = store.get(content_hash)
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "BlockStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def has(self, content_hash: str) -> bool:
+        """Whether a page with this SHA-256 is stored."""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT 1 FROM recipes WHERE hash = ?", (bytes.fromhex(content_hash),)
+            ).fetchone() is not None
+
+    def put(self, data: bytes, content_hash: Optional[str] = None) -> str:
+        """
+        Store a page, writing only the blocks the store doesn't have yet.
+
+        Args:
+            data: Page content as written to disk
+            content_hash: SHA-256 of data, if already computed
+
+        Returns:
+            SHA-256 of data (the key to get it back with)
+        """
+        content_hash = content_hash or hashlib.sha256(data).hexdigest()
+        key = bytes.fromhex(content_hash)
+        with self.lock, self.conn:
+            if self.conn.execute("SELECT 1 FROM recipes WHERE hash = ?", (key,)).fetchone():
+                return content_hash
+            digests = []
+            for block in split_blocks(data):
+                digest = hashlib.sha256(block).digest()
+                digests.append(digest)
+                if not self.conn.execute("SELECT 1 FROM blocks WHERE hash = ?", (digest,)).fetchone():
+                    self.conn.execute(
+                        "INSERT INTO blocks (hash, size, data) VALUES (?, ?, ?)",
+                        (digest, len(block), zlib.compress(block, COMPRESSION_LEVEL))
+                    )
+            self.conn.execute(
+                "INSERT INTO recipes (hash, size, blocks) VALUES (?, ?, ?)",
+                (key, len(data), b''.join(digests))
+            )
+        return content_hash
+
+    def put_file(self, path: Path, content_hash: Optional[str] = None) -> str:
+        """Store a file's content unless its hash is already stored."""
+        if content_hash and self.has(content_hash):
+            return content_hash
+        return self.put(path.read_bytes(), content_hash)
+
+    def get(self, content_hash: str) -> Optional[bytes]:
+        """
+        Reassemble a stored page, or None if it isn't stored.
+
+        Raises:
+            ValueError: If the reassembled content doesn't match its hash
+        """
+        key = bytes.fromhex(content_hash)
+        with self.lock:
+            row = self.conn.execute("SELECT blocks FROM recipes WHERE hash = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            parts = []
+            for offset in range(0, len(row[0]), DIGEST_SIZE):
+                block = self.conn.execute(
+                    "SELECT data FROM blocks WHERE hash = ?", (row[0][offset:offset + DIGEST_SIZE],)
+                ).fetchone()
+                if block is None:
+                    raise ValueError(f"Block store is missing a block of {content_hash}")
+                parts.append(zlib.decompress(block[0]))
+        data = b''.join(parts)
+        if hashlib.sha256(data).digest() != key:
+            raise ValueError(f"Block store content of {content_hash} doesn't match its hash")
+        return data
+
+    def gc(self, keep: Iterable[str]) -> Tuple[int, int]:
+        """
+        Drop pages not in keep and the blocks no remaining page uses.
+
+        Returns:
+            Tuple of (pages removed, blocks removed)
+        """
+        keep = {bytes.fromhex(content_hash) for content_hash in keep if content_hash}
+        with self.lock, self.conn:
+            stale = [(key,) for key, in self.conn.execute("SELECT hash FROM recipes") if key not in keep]
+            self.conn.executemany("DELETE FROM recipes WHERE hash = ?", stale)
+            used = set()
+            for digests, in self.conn.execute("SELECT blocks FROM recipes"):
+                used.update(digests[offset:offset + DIGEST_SIZE] for offset in range(0, len(digests), DIGEST_SIZE))
+            unused = [(key,) for key, in self.conn.execute("SELECT hash FROM blocks") if key not in used]
+            self.conn.executemany("DELETE FROM blocks WHERE hash = ?", unused)
+        if stale or unused:
+            with self.lock:
+                self.conn.execute("VACUUM")
+        return len(stale), len(unused)
+
+    def sync(self, docs_dir: Path, hashes: Dict[str, str]) -> Tuple[int, int]:
+        """
+        Make the store hold exactly the pages of a manifest.
+
+        Args:
+            docs_dir: Directory holding the pages
+            hashes: {filename: hash} of the manifest
+
+        Returns:
+            Tuple of (pages added, pages removed)
+        """
+        added = 0
+        for filename, content_hash in hashes.items():
+            if content_hash and not self.has(content_hash) and (docs_dir / filename).exists():
+                self.put_file(docs_dir / filename, content_hash)
+                added += 1
+        removed, _ = self.gc(hashes.values())
+        return added, removed
+
+    def stats(self) -> dict:
+        """Page and block counts, and bytes before and after deduplication and compression."""
+        with self.lock:
+            pages, logical = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM recipes").fetchone()
+            blocks, unique, stored = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blocks"
+            ).fetchone()
+        return {
+            "pages": pages,
+            "blocks": blocks,
+            "page_bytes": logical,
+            "unique_bytes": unique,
+            "stored_bytes": stored,
+            "file_bytes": self.path.stat().st_size if self.path.exists() else 0,
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from search_index import load_manifest_hashes
+
+    parser = argparse.ArgumentParser(description="Deduplicated block storage for docs/")
+    parser.add_argument(
+        "--docs-dir",
+        type=Path,
+        default=Path(__file__).parent.parent / 'docs',
+        help="Documentation directory (default: docs/ next to this script)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("pack", help="Store every page in the manifest and drop pages it no longer lists")
+    subparsers.add_parser("stats", help="Show how much the store saves")
+
+    args = parser.parse_args(argv)
+    hashes = load_manifest_hashes(args.docs_dir)
+
+    with BlockStore(args.docs_dir / BLOCKS_FILE) as store:
+        if args.command == "pack":
+            added, removed = store.sync(args.docs_dir, hashes)
+            print(f"Stored {added} new pages, removed {removed}")
+        stats = store.stats()
+    if stats["page_bytes"]:
+        print(f"{stats['pages']} pages, {stats['page_bytes'] / 1e6:.1f} MB -> "
+              f"{stats['blocks']} blocks, {stats['unique_bytes'] / 1e6:.1f} MB unique, "
+              f"{stats['stored_bytes'] / 1e6:.1f} MB compressed ({stats['file_bytes'] / 1e6:.1f} MB on disk)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Per-version index of the Claude Code changelog.
+
+docs/claude-code/changelog.md is one 100 KB+ file, newest release first. The
+index, docs/docs_changelog.json, records every release once:
+
+    {"version": "2.1.21", "anchor": "2121", "start": 210, "end": 1370,
+     "entries": ["Added support for ...", "Fixed ..."]}
+
+where start/end are the byte offsets of the release's section in the file,
+so queries like "changes since 1.0.80" or "entries mentioning hooks" are
+answered from the index without reading the changelog.
+
+New releases are added at the top of the changelog, so updating the index
+only parses the part of the file above the newest indexed release. The rest
+is checked against the hash recorded for it and the index is rebuilt from
+scratch if an older release was edited.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+CHANGELOG_FILE = "claude-code/changelog.md"
+INDEX_FILE = "docs_changelog.json"
+FORMAT_VERSION = 1
+CHANGELOG_PAGE = "https://github.com/anthropics/claude-code/blob/main/CHANGELOG.md"
+
+VERSION_HEADING_RE = re.compile(rb'^## +\[?v?(\d+(?:\.\d+)*[^\s\]]*)\]?[^\n]*$', re.MULTILINE)
+ENTRY_RE = re.compile(r'^[-*] +(.*)$')
+
+
+def version_key(version: str) -> Tuple:
+    """Sort key for a release version: numeric parts compared as numbers (e.g., 1.0.100 > 1.0.99)."""
+    return tuple(int(part) if part.isdigit() else -1 for part in re.split(r'[.\-+]', version))
+
+
+def github_anchor(heading: str) -> str:
+    """The anchor GitHub gives a heading (e.g., "2.1.21" -> "2121")."""
+    return re.sub(r'[^\w\- ]', '', heading.strip().lower()).replace(' ', '-')
+
+
+def parse_entries(section: str) -> List[str]:
+    """Bullet entries of one release section; indented continuation lines are joined on."""
+    entries = []
+    for line in section.splitlines()[1:]:
+        match = ENTRY_RE.match(line)
+        if match:
+            entries.append(match.group(1).strip())
+        elif entries and line.startswith((' ', '\t')) and line.strip():
+            entries[-1] += ' ' + line.strip()
+    return entries
+
+
+def parse_releases(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[dict]:
+    """Index the releases whose headings lie between start and end."""
+    end = len(data) if end is None else end
+    headings = list(VERSION_HEADING_RE.finditer(data, start, end))
+    for i, match in enumerate(headings):
+        section_end = headings[i + 1].start() if i + 1 < len(headings) else end
+        version = match.group(1).decode('utf-8')
+        yield {
+            "version": version,
+            "anchor": github_anchor(match.group(0).decode('utf-8')[3:]),
+            "start": match.start(),
+            "end": section_end,
+            "entries": parse_entries(data[match.start():section_end].decode('utf-8', errors='replace')),
+        }
+
+
+def tail_hash(data: bytes, offset: int) -> str:
+    return hashlib.sha256(data[offset:]).hexdigest()
+
+
+def build_index(data: bytes) -> dict:
+    """Index a whole changelog."""
+    releases = list(parse_releases(data))
+    return {
+        "format": FORMAT_VERSION,
+        "size": len(data),
+        "tail_hash": tail_hash(data, releases[0]["start"]) if releases else "",
+        "releases": releases,
+    }
+
+
+def update_index(index: Optional[dict], data: bytes) -> Tuple[dict, int]:
+    """
+    Bring an index up to date with the changelog's current content.
+
+    Only releases above the newest indexed one are parsed, provided
+    everything from that release down is unchanged; otherwise the whole
+    file is indexed again.
+
+    Returns:
+        Tuple of (index, number of releases added); all of them on a rebuild
+    """
+    if not index or index.get("format") != FORMAT_VERSION or not index["releases"]:
+        index = build_index(data)
+        return index, len(index["releases"])
+
+    newest = index["releases"][0]
+    offset = next(
+        (match.start() for match in VERSION_HEADING_RE.finditer(data)
+         if match.group(1).decode('utf-8') == newest["version"]),
+        -1
+    )
+    if offset < 0 or tail_hash(data, offset) != index["tail_hash"]:
+        index = build_index(data)
+        return index, len(index["releases"])
+
+    added = list(parse_releases(data, 0, offset))
+    shift = offset - newest["start"]
+    releases = added + [
+        dict(release, start=release["start"] + shift, end=release["end"] + shift)
+        for release in index["releases"]
+    ]
+    return {
+        "format": FORMAT_VERSION,
+        "size": len(data),
+        "tail_hash": tail_hash(data, releases[0]["start"]),
+        "releases": releases,
+    }, len(added)
+
+
+def load_index(docs_dir: Path) -> Optional[dict]:
+    try:
+        return json.loads((docs_dir / INDEX_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def write_index(docs_dir: Path, index: dict) -> None:
+    path = docs_dir / INDEX_FILE
+    temp_path = path.with_name(f".{INDEX_FILE}.tmp")
+    temp_path.write_text(json.dumps(index, indent=1))
+    os.replace(temp_path, path)
+
+
+def refresh_index(docs_dir: Path, changelog_path: Optional[Path] = None, base_dir: Optional[Path] = None) -> int:
+    """
+    Update docs_dir's changelog index from the changelog.
+
+    Args:
+        docs_dir: Directory to write the index to
+        changelog_path: Changelog to index (default: the one in docs_dir)
+        base_dir: Directory holding the current index, when docs_dir is a
+            staging directory (default: docs_dir)
+
+    Returns:
+        Number of releases added to the index
+    """
+    changelog_path = changelog_path or docs_dir / CHANGELOG_FILE
+    index, added = update_index(load_index(base_dir or docs_dir), changelog_path.read_bytes())
+    write_index(docs_dir, index)
+    return added
+
+
+def releases_since(index: dict, version: str) -> List[dict]:
+    """Releases newer than version, newest first."""
+    return [release for release in index["releases"] if version_key(release["version"]) > version_key(version)]
+
+
+def releases_between(index: dict, oldest: str, newest: str) -> List[dict]:
+    """Releases from oldest to newest, both included, newest first."""
+    low, high = version_key(oldest), version_key(newest)
+    return [release for release in index["releases"] if low <= version_key(release["version"]) <= high]
+
+
+def find_release(index: dict, version: str) -> Optional[dict]:
+    version = version.lstrip('v')
+    return next((release for release in index["releases"] if release["version"] == version), None)
+
+
+def search_entries(index: dict, term: str) -> List[Tuple[str, str]]:
+    """(version, entry) for every entry mentioning term (case-insensitive), newest first."""
+    term = term.lower()
+    return [
+        (release["version"], entry)
+        for release in index["releases"]
+        for entry in release["entries"]
+        if term in entry.lower()
+    ]
+
+
+def print_matches(index: dict, term: str) -> int:
+    matches = search_entries(index, term)
+    for version, entry in matches:
+        print(f"{version}: {entry}")
+    if not matches:
+        print(f"No changelog entries mention \"{term}\"")
+    return 0 if matches else 1
+
+
+def print_releases(releases: List[dict]) -> None:
+    for release in releases:
+        print(f"## {release['version']}  ({CHANGELOG_PAGE}#{release['anchor']})")
+        for entry in release["entries"]:
+            print(f"- {entry}")
+        print()
+
+
+VERSION_RE = re.compile(r'^v?\d+(\.\d+)*$')
+
+
+def answer_query(index: dict, words: List[str]) -> int:
+    """
+    Answer a free-form query as typed after `/docs changelog`:
+    "since 1.0.80", "1.0.80..2.0.0" (or "1.0.80 to 2.0.0"), "2.1.21", "latest 3",
+    or anything else as a search term.
+    """
+    if len(words) == 2 and words[0] == "since" and VERSION_RE.match(words[1]):
+        releases = releases_since(index, words[1].lstrip('v'))
+    elif len(words) == 1 and '..' in words[0] and all(VERSION_RE.match(w) for w in words[0].split('..', 1)):
+        oldest, newest = words[0].split('..', 1)
+        releases = releases_between(index, oldest.lstrip('v'), newest.lstrip('v'))
+    elif len(words) == 3 and words[1] in ("to", "-") and VERSION_RE.match(words[0]) and VERSION_RE.match(words[2]):
+        releases = releases_between(index, words[0].lstrip('v'), words[2].lstrip('v'))
+    elif len(words) == 1 and VERSION_RE.match(words[0]):
+        release = find_release(index, words[0])
+        releases = [release] if release else []
+    elif words and words[0] in ("latest", "recent"):
+        count = int(words[1]) if len(words) > 1 and words[1].isdigit() else 3
+        releases = index["releases"][:count]
+    else:
+        return print_matches(index, ' '.join(words))
+
+    if not releases:
+        print("No matching releases")
+        return 1
+    print_releases(releases)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Query the Claude Code changelog by version")
+    parser.add_argument(
+        "--docs-dir",
+        type=Path,
+        default=Path(__file__).parent.parent / 'docs',
+        help="Documentation directory (default: docs/ next to this script)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="Update the index from the changelog")
+    since_parser = subparsers.add_parser("since", help="Releases newer than a version")
+    since_parser.add_argument("version")
+    range_parser = subparsers.add_parser("range", help="Releases between two versions, inclusive")
+    range_parser.add_argument("oldest")
+    range_parser.add_argument("newest")
+    search_parser = subparsers.add_parser("search", help="Entries mentioning a term")
+    search_parser.add_argument("term", nargs='+')
+    query_parser = subparsers.add_parser("query", help="Free-form query (e.g., 'since 1.0.80', 'hooks')")
+    query_parser.add_argument("words", nargs='*')
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        added = refresh_index(args.docs_dir)
+        print(f"Indexed {added} new releases in {args.docs_dir / INDEX_FILE}")
+        return 0
+
+    index = load_index(args.docs_dir)
+    if index is None:
+        if not (args.docs_dir / CHANGELOG_FILE).exists():
+            print("No changelog found", file=sys.stderr)
+            return 1
+        index, _ = update_index(None, (args.docs_dir / CHANGELOG_FILE).read_bytes())
+
+    if args.command == "since":
+        return answer_query(index, ["since", args.version])
+    if args.command == "range":
+        return answer_query(index, [args.oldest, "to", args.newest])
+    if args.command == "search":
+        return print_matches(index, ' '.join(args.term))
+    return answer_query(index, args.words or ["latest"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
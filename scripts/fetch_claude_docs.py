@@ -1,31 +1,56 @@
 #!/usr/bin/env python3
 """
 Improved Claude Code documentation fetcher with better robustness.
+
+Usage:
+    fetch_claude_docs.py [fetch] [--workers N] [--incremental]   # fetch docs (default)
+    fetch_claude_docs.py manifest list|show|stats                # query the manifest
+
+requests and the search indexer are imported only by the commands that need
+them, so manifest queries start instantly.
 """
 
-import requests
+from __future__ import annotations
+
 import time
 from pathlib import Path
-from typing import List, Tuple, Set, Optional
+from typing import Callable, List, Tuple, Set, Optional, Dict, NamedTuple, TypeVar, Union, TYPE_CHECKING
 import logging
 from datetime import datetime
 import sys
-import xml.etree.ElementTree as ET
 from urllib.parse import urlparse
 import json
 import hashlib
+import zlib
 import os
 import re
 import random
+import argparse
+import threading
+
+import fetch_metrics
+from changelog_index import INDEX_FILE as CHANGELOG_INDEX, refresh_index as refresh_changelog_index
+from manifest_store import MANIFEST_DB, get_entry, open_manifest, read_manifest, read_meta, source_files, write_manifest
+from staged_update import StagedUpdate
+from topic_index import build_topic_table, write_topic_table
+from work_queue import DONE, QUEUE_FILE, WorkQueue
+
+if TYPE_CHECKING:
+    import requests
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
+
+def configure_logging() -> None:
+    """Configure logging for command line runs."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
 # Documentation sources configuration
 DOC_SOURCES = {
     "claude-code": {
@@ -73,27 +98,428 @@ DOC_SOURCES = {
 }
 
 MANIFEST_FILE = "docs_manifest.json"
+DEFAULT_DOCS_DIR = Path(__file__).parent.parent / 'docs'
 
 # Base URL will be discovered from sitemap
 # No longer using global variable
 
-# Headers to bypass caching and identify the script
+# Headers to identify the script. no-cache makes intermediate caches revalidate
+# with the origin, which still allows 304 answers to conditional requests.
 HEADERS = {
     'User-Agent': 'Claude-Code-Docs-Fetcher/3.0',
-    'Cache-Control': 'no-cache, no-store, must-revalidate',
-    'Pragma': 'no-cache',
-    'Expires': '0'
+    'Cache-Control': 'no-cache',
 }
 
 # Retry configuration
 MAX_RETRIES = 3
 RETRY_DELAY = 2  # initial delay in seconds
 MAX_RETRY_DELAY = 30  # maximum delay in seconds
-RATE_LIMIT_DELAY = 0.5  # seconds between requests
+MAX_INLINE_RETRY_AFTER = 60  # longer Retry-After waits are deferred to a later run
+
+# Circuit breaker: a host that keeps failing is left alone for a while
+CIRCUIT_BREAKER_THRESHOLD = 5  # consecutive failed attempts that open the circuit
+CIRCUIT_BREAKER_COOLDOWN = 10 * 60  # seconds; longer than a run waits, so its pages are deferred
+
+# Concurrency configuration
+MAX_WORKERS = 8  # default number of concurrent page fetches
+RATE_LIMIT_PER_HOST = 8.0  # sustained requests per second per host
+RATE_LIMIT_BURST = 8  # requests a host may receive back-to-back
+
+# Incremental sync configuration
+FULL_SWEEP_INTERVAL_HOURS = 24  # incremental runs still refetch everything this often
+
+# Streaming configuration: pages are written to disk as they arrive
+STREAM_CHUNK_SIZE = 64 * 1024  # bytes read from the response at a time
+VALIDATION_BYTES = 16 * 1024  # leading bytes checked by validate_markdown_content
+
+
+class RetryLater(Exception):
+    """The server asked us to wait longer than a run should block; retry the page in a later run."""
+
+    def __init__(self, message: str, delay: float):
+        super().__init__(message)
+        self.delay = delay
+
+
+class HostRateLimiter:
+    """
+    Thread-safe token bucket rate limiter keyed by host.
+
+    Each host gets its own bucket, so the documentation sites don't throttle
+    each other. A 429 response pauses the whole host (not just the worker that
+    received it) until its Retry-After has elapsed.
+
+    ``acquire`` blocks the calling thread until a token is available.
+    RetryScheduler.run instead takes tokens with the non-blocking
+    ``try_acquire`` before handing a request to a worker, and ``prepaid``
+    tells the worker's ``acquire`` that its token has already been taken.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT_PER_HOST, burst: int = RATE_LIMIT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # host -> (tokens, last refill)
+        self._paused_until: Dict[str, float] = {}
+        self._local = threading.local()
+
+    def try_acquire(self, url: str) -> float:
+        """
+        Take a token for the URL's host if one is available, without blocking.
+
+        Returns:
+            0 if a token was taken, otherwise seconds until one may be
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(host, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+            paused_for = self._paused_until.get(host, 0.0) - now
+
+            if paused_for <= 0 and tokens >= 1:
+                self._buckets[host] = (tokens - 1, now)
+                return 0.0
+            self._buckets[host] = (tokens, now)
+            return max(paused_for, (1 - tokens) / self.rate)
+
+    def acquire(self, url: str, max_wait: Optional[float] = None) -> None:
+        """
+        Block until a request to the URL's host is allowed.
+
+        Returns at once if the calling thread holds a prepaid token for the
+        host. Raises RetryLater instead of blocking if the host is paused for
+        longer than max_wait seconds.
+        """
+        host = urlparse(url).netloc
+        if getattr(self._local, "prepaid", None) == host:
+            self._local.prepaid = None
+            return
+        while True:
+            wait = self.try_acquire(url)
+            if wait <= 0:
+                return
+            paused_for = self.paused_for(url)
+            if max_wait is not None and paused_for > max_wait:
+                raise RetryLater(f"{host} is rate limited for {paused_for:.0f} more seconds", paused_for)
+            time.sleep(wait)
+
+    def prepaid(self, url: Optional[str]) -> None:
+        """Record that the calling thread's next acquire() for the URL's host is already paid for (None clears it)."""
+        self._local.prepaid = urlparse(url).netloc if url else None
+
+    def paused_for(self, url: str) -> float:
+        """Seconds until the URL's host is no longer paused (0 if it isn't)."""
+        host = urlparse(url).netloc
+        with self._lock:
+            return max(self._paused_until.get(host, 0.0) - time.monotonic(), 0.0)
+
+    def pause(self, url: str, seconds: float) -> None:
+        """Stop handing out tokens for the URL's host for the given time."""
+        host = urlparse(url).netloc
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._paused_until[host] = max(self._paused_until.get(host, 0.0), until)
+
+
+def parse_retry_after(value: Optional[str], default: int = 60) -> float:
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class Throttled(Exception):
+    """A single attempt was answered with 429 Too Many Requests."""
+
+    def __init__(self, delay: float):
+        super().__init__(f"Rate limited for {delay:.0f} seconds")
+        self.delay = delay
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed attempt is worth retrying: network errors, timeouts and 5xx/408 answers."""
+    import requests
+
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status >= 500 or status == 408
+    return isinstance(error, requests.exceptions.RequestException)
+
+
+class RetryScheduler:
+    """
+    Retry policy shared by every request of a run, tracked per host.
+
+    A 429 pauses only the host that sent it, for its Retry-After, and a host
+    whose attempts keep failing trips a circuit breaker, so the documentation
+    sites and GitHub never hold each other up. Transient errors are retried
+    with exponential backoff and jitter; anything else (404, bad content)
+    fails at once. A wait longer than MAX_INLINE_RETRY_AFTER ends with
+    RetryLater, deferring the request to a later run.
+
+    ``call`` retries a single request in the calling thread. ``run`` executes
+    many requests on a worker pool and parks throttled or failed ones on a
+    timer instead of sleeping in a worker, so the pool keeps fetching from
+    other hosts in the meantime. It also takes each request's rate limiter
+    token before submitting it, so a task waiting for its host's next token
+    is parked too rather than tying up a worker.
+    """
+
+    def __init__(
+        self,
+        rate_limiter: Optional[HostRateLimiter] = None,
+        max_attempts: int = MAX_RETRIES,
+        failure_threshold: int = CIRCUIT_BREAKER_THRESHOLD,
+        cooldown: float = CIRCUIT_BREAKER_COOLDOWN
+    ):
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.max_attempts = max_attempts
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures: Dict[str, int] = {}  # host -> consecutive failed attempts
+        self._open_until: Dict[str, float] = {}  # host -> end of circuit breaker cooldown
+        self._local = threading.local()
+
+    def host_delay(self, url: str) -> float:
+        """Seconds before the URL's host may be contacted again (Retry-After pause or open circuit)."""
+        host = urlparse(url).netloc
+        with self._lock:
+            circuit = self._open_until.get(host, 0.0) - time.monotonic()
+        return max(self.rate_limiter.paused_for(url), circuit, 0.0)
+
+    def succeeded(self, url: str) -> None:
+        """Reset the failure count of the URL's host."""
+        with self._lock:
+            self._failures.pop(urlparse(url).netloc, None)
+
+    def retry_delay(self, url: str, error: Exception, attempt: int) -> float:
+        """
+        Record a failed attempt and decide when to try again.
+
+        Returns:
+            Seconds to wait before the next attempt
+
+        Raises:
+            The error to give up with: RetryLater if the wait is too long for
+            this run, otherwise the final error
+        """
+        host = urlparse(url).netloc
+
+        if isinstance(error, Throttled):
+            self.rate_limiter.pause(url, error.delay)
+            if error.delay > MAX_INLINE_RETRY_AFTER or attempt >= self.max_attempts:
+                raise RetryLater(str(error), error.delay) from error
+            return error.delay
+
+        if isinstance(error, RetryLater) or not is_transient(error):
+            raise error
+
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if failures >= self.failure_threshold:
+                self._open_until[host] = time.monotonic() + self.cooldown
+        if failures >= self.failure_threshold:
+            logger.warning(f"{host} failed {failures} times in a row; skipping it for {self.cooldown:.0f}s")
+            raise RetryLater(f"Circuit open for {host} after {failures} failures: {error}", self.cooldown) from error
+
+        if attempt >= self.max_attempts:
+            raise Exception(f"Failed to fetch {url} after {self.max_attempts} attempts: {error}") from error
+
+        # Exponential backoff with jitter to prevent thundering herd
+        delay = min(RETRY_DELAY * (2 ** (attempt - 1)), MAX_RETRY_DELAY)
+        return delay * random.uniform(0.5, 1.0)
+
+    def wait_for_host(self, url: str) -> float:
+        """Seconds to hold a request back; raises RetryLater if that is longer than a run should wait."""
+        wait = self.host_delay(url)
+        if wait > MAX_INLINE_RETRY_AFTER:
+            raise RetryLater(f"{urlparse(url).netloc} is unavailable for {wait:.0f} more seconds", wait)
+        return wait
+
+    def call(self, url: str, attempt: Callable[[], T]) -> T:
+        """
+        Run attempt() until it succeeds or the retry policy gives up.
+
+        Inside a ``run`` task only one attempt is made; ``run`` schedules the
+        retries itself.
+        """
+        if getattr(self._local, "in_run", False):
+            return attempt()
+
+        for number in range(1, self.max_attempts + 1):
+            time.sleep(self.wait_for_host(url))
+            try:
+                result = attempt()
+            except Exception as e:
+                delay = self.retry_delay(url, e, number)
+                logger.warning(f"Attempt {number}/{self.max_attempts} failed for {url}: {e}")
+                logger.info(f"Retrying in {delay:.1f} seconds...")
+                time.sleep(delay)
+                continue
+            self.succeeded(url)
+            return result
+        raise AssertionError("unreachable: retry_delay gives up on the last attempt")
+
+    def run(
+        self,
+        tasks: List[Tuple[str, Callable[[], T]]],
+        workers: int,
+        on_complete: Optional[Callable[[int, Optional[T], Optional[Exception]], None]] = None
+    ) -> List[Tuple[Optional[T], Optional[Exception]]]:
+        """
+        Run (url, attempt) tasks on a worker pool with non-blocking retries.
+
+        A task whose host is paused, or whose attempt failed, is parked until
+        its retry time while workers move on to tasks for other hosts.
+        ``on_complete(index, result, error)`` is called as each task finishes.
+
+        Returns:
+            (result, error) per task, in the order of ``tasks``
+        """
+        import heapq
+        from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+        workers = max(workers, 1)
+        results: List[Tuple[Optional[T], Optional[Exception]]] = [(None, None)] * len(tasks)
+        attempts = [0] * len(tasks)
+        parked = [(0.0, index) for index in range(len(tasks))]  # heap of (ready time, task index)
+        running = {}
+
+        def finish(index: int, result, error) -> None:
+            results[index] = (result, error)
+            if on_complete:
+                on_complete(index, result, error)
+
+        def attempt_in_run(index: int):
+            self._local.in_run = True
+            self.rate_limiter.prepaid(tasks[index][0])
+            try:
+                return tasks[index][1]()
+            finally:
+                self._local.in_run = False
+                self.rate_limiter.prepaid(None)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fetch") as executor:
+            while parked or running:
+                now = time.monotonic()
+                while parked and parked[0][0] <= now and len(running) < workers:
+                    _, index = heapq.heappop(parked)
+                    url = tasks[index][0]
+                    try:
+                        wait_time = self.wait_for_host(url)
+                    except RetryLater as e:
+                        finish(index, None, e)
+                        continue
+                    if wait_time <= 0:
+                        wait_time = self.rate_limiter.try_acquire(url)
+                    if wait_time > 0:
+                        heapq.heappush(parked, (now + wait_time, index))
+                        continue
+                    attempts[index] += 1
+                    running[executor.submit(attempt_in_run, index)] = index
+
+                if not running:
+                    if parked:
+                        time.sleep(max(parked[0][0] - time.monotonic(), 0.0))
+                    continue
+
+                timeout = None
+                if parked and len(running) < workers:
+                    timeout = max(parked[0][0] - time.monotonic(), 0.0)
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    index = running.pop(future)
+                    url = tasks[index][0]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        try:
+                            delay = self.retry_delay(url, e, attempts[index])
+                        except Exception as final:
+                            finish(index, None, final)
+                        else:
+                            logger.warning(f"Attempt {attempts[index]}/{self.max_attempts} failed for {url}: {e}; "
+                                           f"retrying in {delay:.1f}s")
+                            heapq.heappush(parked, (time.monotonic() + delay, index))
+                    else:
+                        self.succeeded(url)
+                        finish(index, result, None)
+
+        return results
+
+
+class FetchResult(NamedTuple):
+    """Outcome of fetching a single document."""
+    filename: str
+    content: Optional[str]  # None on 304 Not Modified, or when streamed to temp_path
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None  # SHA-256 of the body; None on 304
+    temp_path: Optional[Path] = None  # Streamed body awaiting rename; caller removes it
+
+    @property
+    def not_modified(self) -> bool:
+        return self.content_hash is None
+
+
+def conditional_headers(entry: Optional[dict]) -> dict:
+    """
+    Build request headers for a conditional GET.
+
+    Args:
+        entry: Previous manifest entry holding the stored validators, if any
+
+    Returns:
+        HEADERS plus If-None-Match / If-Modified-Since when validators are known
+    """
+    headers = dict(HEADERS)
+    if entry:
+        if entry.get("etag"):
+            headers['If-None-Match'] = entry["etag"]
+        if entry.get("last_modified"):
+            headers['If-Modified-Since'] = entry["last_modified"]
+    return headers
+
+
+def create_session(workers: int) -> requests.Session:
+    """Create a session whose connection pool can serve every worker."""
+    import requests
+
+    session = requests.Session()
+    # The adapter reports connection timings to the request's metrics span
+    adapter = fetch_metrics.instrumented_adapter(
+        pool_connections=len(DOC_SOURCES) + 1, pool_maxsize=max(workers, 1)
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 
 def load_manifest(docs_dir: Path) -> dict:
-    """Load the manifest of previously fetched files."""
+    """Load the manifest of previously fetched files, from the database if there is one."""
+    conn = open_manifest(docs_dir)
+    if conn is not None:
+        try:
+            return read_manifest(conn)
+        except Exception as e:
+            logger.warning(f"Failed to read {MANIFEST_DB}, falling back to {MANIFEST_FILE}: {e}")
+        finally:
+            conn.close()
+
     manifest_path = docs_dir / MANIFEST_FILE
     if manifest_path.exists():
         try:
@@ -107,8 +533,17 @@ def load_manifest(docs_dir: Path) -> dict:
     return {"files": {}, "last_updated": None}
 
 
-def save_manifest(docs_dir: Path, manifest: dict) -> None:
-    """Save the manifest of fetched files."""
+def save_manifest(docs_dir: Path, manifest: dict, live_dir: Optional[Path] = None) -> None:
+    """
+    Save the manifest of fetched files: the JSON, then the database built
+    from the same data (written last, so it isn't older than the JSON).
+
+    Args:
+        docs_dir: Directory to write the manifest files to
+        manifest: Manifest to save
+        live_dir: Directory holding the current database, when docs_dir is a
+            staging directory; only rows that changed since then are written
+    """
     manifest_path = docs_dir / MANIFEST_FILE
     manifest["last_updated"] = datetime.now().isoformat()
 
@@ -130,7 +565,10 @@ def save_manifest(docs_dir: Path, manifest: dict) -> None:
     manifest["github_repository"] = github_repo
     manifest["github_ref"] = github_ref
     manifest["description"] = "Claude Code documentation manifest. Keys are filenames, append to base_url for full URL."
+
     manifest_path.write_text(json.dumps(manifest, indent=2))
+    changes = write_manifest(docs_dir / MANIFEST_DB, manifest, (live_dir or docs_dir) / MANIFEST_DB)
+    logger.info(f"Manifest: {changes} of {len(manifest.get('files', {}))} entries changed")
 
 
 def url_to_safe_filename(url_path: str, source_key: str, preserve_hierarchy: bool = False) -> str:
@@ -170,54 +608,202 @@ def url_to_safe_filename(url_path: str, source_key: str, preserve_hierarchy: boo
         return f"{source_key}/{flat_name}"
 
 
-def discover_sitemap_and_base_url(session: requests.Session, sitemap_urls: List[str]) -> Tuple[str, str]:
+class Sitemap:
     """
-    Discover the sitemap URL and extract the base URL from it.
+    A parsed sitemap: page URLs with their <lastmod> and the site's base URL.
+
+    Discovery builds one of these per source and everything downstream reuses
+    it, so each sitemap is downloaded and parsed exactly once.
+    """
+
+    def __init__(self, url: str, entries: Dict[str, Optional[str]], sitemaps: Optional[List[str]] = None):
+        self.url = url
+        self.entries = entries  # page URL -> lastmod (None if absent), in document order
+        self.sitemaps = sitemaps or []  # child sitemap URLs if this is a <sitemapindex>
+
+    @property
+    def base_url(self) -> Optional[str]:
+        """Scheme and host of the first page URL (e.g., https://platform.claude.com)."""
+        for page_url in self.entries:
+            parsed = urlparse(page_url)
+            return f"{parsed.scheme}://{parsed.netloc}"
+        return None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+SITEMAP_CHUNK_SIZE = 64 * 1024  # bytes fed to the XML parser at a time
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024  # sitemap protocol limit for an uncompressed sitemap
+SITEMAP_MAX_DEPTH = 3  # how many <sitemapindex> levels to follow
+SITEMAP_WORKERS = 4  # concurrent child sitemap fetches
+
+
+def gunzip_stream(chunks, max_bytes: int = SITEMAP_MAX_BYTES):
+    """
+    Transparently decompress a gzip byte stream (e.g., a .xml.gz sitemap).
+
+    Streams that don't start with the gzip magic number are passed through
+    unchanged. Output is capped at max_bytes to guard against gzip bombs.
+    """
+    decompressor = None
+    produced = 0
+    first = True
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if first:
+            if chunk[:2] == b'\x1f\x8b':
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            first = False
+        if decompressor:
+            chunk = decompressor.decompress(chunk)
+        produced += len(chunk)
+        if produced > max_bytes:
+            raise ValueError(f"Sitemap exceeds {max_bytes} bytes")
+        yield chunk
+
+    if decompressor:
+        yield decompressor.flush()
+
+
+def parse_sitemap_stream(chunks, sitemap_url: str = "") -> Sitemap:
+    """
+    Incrementally parse sitemap XML from an iterable of byte chunks.
+
+    Elements are discarded as soon as their <loc>/<lastmod> have been read, so
+    memory use does not grow with the size of the document. Documents with a
+    DOCTYPE are rejected to rule out entity expansion attacks.
+
+    Args:
+        chunks: Iterable of bytes (e.g., response.iter_content())
+        sitemap_url: URL the document came from, recorded on the result
+
+    Returns:
+        Sitemap holding page entries and any child sitemap URLs
+    """
+    import xml.etree.ElementTree as ET
+
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    entries: Dict[str, Optional[str]] = {}
+    sitemaps: List[str] = []
+    root = None
+    loc = lastmod = None
+    first = True
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if first:
+            # The prolog precedes the root element, so it is in the first chunk
+            if b'<!DOCTYPE' in chunk or b'<!ENTITY' in chunk:
+                raise ValueError(f"Refusing to parse sitemap with a DOCTYPE: {sitemap_url}")
+            first = False
+        parser.feed(chunk)
+
+        for event, elem in parser.read_events():
+            tag = elem.tag.rsplit('}', 1)[-1]  # works with or without the sitemap namespace
+            if event == 'start':
+                if root is None:
+                    root = elem
+                continue
+
+            if tag == 'loc':
+                loc = (elem.text or '').strip() or None
+            elif tag == 'lastmod':
+                lastmod = (elem.text or '').strip() or None
+            elif tag in ('url', 'sitemap'):
+                if loc:
+                    if tag == 'url':
+                        entries[loc] = lastmod
+                    else:
+                        sitemaps.append(loc)
+                loc = lastmod = None
+                # Drop the finished element and everything parsed so far
+                root.clear()
+
+    parser.close()
+    return Sitemap(sitemap_url, entries, sitemaps)
+
+
+def fetch_sitemap(
+    session: requests.Session,
+    sitemap_url: str,
+    depth: int = 0,
+    visited: Optional[Set[str]] = None
+) -> Sitemap:
+    """
+    Download and parse a sitemap as a stream, following sitemap indexes.
+
+    Gzip-compressed sitemaps (.xml.gz) are decompressed on the fly. When the
+    document is a <sitemapindex>, its child sitemaps are fetched concurrently
+    and their pages merged in index order, so the result is deterministic.
+
+    Args:
+        session: requests Session object
+        sitemap_url: URL of the sitemap to fetch
+        depth: Current nesting level (used internally)
+        visited: Sitemap URLs already seen (used internally to break cycles)
+
+    Returns:
+        Parsed Sitemap with the pages of all nested sitemaps
+    """
+    visited = visited if visited is not None else set()
+    visited.add(sitemap_url)
+
+    with fetch_metrics.span(sitemap_url, "sitemap", sitemap_url) as span, \
+            session.get(sitemap_url, headers=HEADERS, timeout=30, stream=True) as response:
+        span.headers_received(response.status_code)
+        response.raise_for_status()
+        chunks = gunzip_stream(span.count(response.iter_content(chunk_size=SITEMAP_CHUNK_SIZE)))
+        sitemap = parse_sitemap_stream(chunks, sitemap_url)
+        span.outcome = fetch_metrics.FETCHED
+
+    children = [url for url in sitemap.sitemaps if url not in visited]
+    if not children:
+        return sitemap
+
+    if depth >= SITEMAP_MAX_DEPTH:
+        logger.warning(f"Not following {len(children)} nested sitemaps in {sitemap_url}: too deep")
+        return sitemap
+
+    logger.info(f"Sitemap index {sitemap_url} lists {len(children)} sitemaps")
+    visited.update(children)
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    # A failing child raises, so a partial page list never reaches cleanup
+    with ThreadPoolExecutor(max_workers=SITEMAP_WORKERS, thread_name_prefix="sitemap") as executor:
+        child_sitemaps = list(executor.map(
+            lambda child_url: fetch_sitemap(session, child_url, depth + 1, visited),
+            children
+        ))
+
+    for child in child_sitemaps:
+        for page_url, lastmod in child.entries.items():
+            sitemap.entries.setdefault(page_url, lastmod)
+    return sitemap
+
+
+def discover_sitemap(session: requests.Session, sitemap_urls: List[str]) -> Sitemap:
+    """
+    Fetch the first usable sitemap from a list of candidates.
 
     Args:
         session: requests Session object
         sitemap_urls: List of sitemap URLs to try
 
     Returns:
-        Tuple of (sitemap_url, base_url)
+        Parsed Sitemap with at least one page
     """
     for sitemap_url in sitemap_urls:
         try:
             logger.info(f"Trying sitemap: {sitemap_url}")
-            response = session.get(sitemap_url, headers=HEADERS, timeout=30)
-            if response.status_code == 200:
-                # Extract base URL from the first URL in sitemap
-                # Parse XML safely to prevent XXE attacks
-                try:
-                    # Try with security parameters (Python 3.8+)
-                    parser = ET.XMLParser(forbid_dtd=True, forbid_entities=True, forbid_external=True)
-                    root = ET.fromstring(response.content, parser=parser)
-                except TypeError:
-                    # Fallback for older Python versions
-                    logger.warning("XMLParser security parameters not available, using default parser")
-                    root = ET.fromstring(response.content)
-
-                # Try with namespace first
-                namespace = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-                first_url = None
-                for url_elem in root.findall('.//ns:url', namespace):
-                    loc_elem = url_elem.find('ns:loc', namespace)
-                    if loc_elem is not None and loc_elem.text:
-                        first_url = loc_elem.text
-                        break
-
-                # If no URLs found, try without namespace
-                if not first_url:
-                    for loc_elem in root.findall('.//loc'):
-                        if loc_elem.text:
-                            first_url = loc_elem.text
-                            break
-
-                if first_url:
-                    parsed = urlparse(first_url)
-                    base_url = f"{parsed.scheme}://{parsed.netloc}"
-                    logger.info(f"Found sitemap at {sitemap_url}, base URL: {base_url}")
-                    return sitemap_url, base_url
+            sitemap = fetch_sitemap(session, sitemap_url)
+            if sitemap.base_url:
+                logger.info(f"Found sitemap at {sitemap_url}, base URL: {sitemap.base_url}")
+                return sitemap
         except Exception as e:
             logger.warning(f"Failed to fetch {sitemap_url}: {e}")
             continue
@@ -225,9 +811,24 @@ def discover_sitemap_and_base_url(session: requests.Session, sitemap_urls: List[
     raise Exception(f"Could not find a valid sitemap from provided URLs")
 
 
+def discover_sitemap_and_base_url(session: requests.Session, sitemap_urls: List[str]) -> Tuple[str, str]:
+    """
+    Discover the sitemap URL and extract the base URL from it.
+
+    Args:
+        session: requests Session object
+        sitemap_urls: List of sitemap URLs to try
+
+    Returns:
+        Tuple of (sitemap_url, base_url)
+    """
+    sitemap = discover_sitemap(session, sitemap_urls)
+    return sitemap.url, sitemap.base_url
+
+
 def discover_documentation_pages(
     session: requests.Session,
-    sitemap_url: str,
+    sitemap: Union[str, Sitemap],
     url_patterns: List[str],
     skip_patterns: List[str],
     source_name: str
@@ -237,7 +838,7 @@ def discover_documentation_pages(
 
     Args:
         session: requests Session object
-        sitemap_url: URL of the sitemap to fetch
+        sitemap: Sitemap returned by discover_sitemap, or a sitemap URL to fetch
         url_patterns: List of URL patterns that identify relevant docs (e.g., ['/docs/en/'])
         skip_patterns: List of URL patterns to skip (e.g., ['/legacy/', '/examples/'])
         source_name: Name of the source for logging (e.g., 'Claude Code', 'Platform API')
@@ -245,44 +846,40 @@ def discover_documentation_pages(
     Returns:
         List of URL paths for discovered documentation pages
     """
+    return list(discover_documentation_lastmods(
+        session, sitemap, url_patterns, skip_patterns, source_name
+    ))
+
+
+def discover_documentation_lastmods(
+    session: requests.Session,
+    sitemap: Union[str, Sitemap],
+    url_patterns: List[str],
+    skip_patterns: List[str],
+    source_name: str
+) -> Dict[str, Optional[str]]:
+    """
+    Discover documentation pages from a sitemap together with their <lastmod>.
+
+    Args:
+        Same as discover_documentation_pages
+
+    Returns:
+        Dict mapping URL paths (sorted) to their lastmod value, or None if the
+        sitemap doesn't provide one
+    """
     logger.info(f"Discovering {source_name} documentation pages from sitemap...")
 
     try:
-        response = session.get(sitemap_url, headers=HEADERS, timeout=30)
-        response.raise_for_status()
+        if isinstance(sitemap, str):
+            sitemap = fetch_sitemap(session, sitemap)
 
-        # Parse XML sitemap safely
-        try:
-            # Try with security parameters (Python 3.8+)
-            parser = ET.XMLParser(forbid_dtd=True, forbid_entities=True, forbid_external=True)
-            root = ET.fromstring(response.content, parser=parser)
-        except TypeError:
-            # Fallback for older Python versions
-            logger.warning("XMLParser security parameters not available, using default parser")
-            root = ET.fromstring(response.content)
-
-        # Extract all URLs from sitemap
-        urls = []
-
-        # Try with namespace first
-        namespace = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-        for url_elem in root.findall('.//ns:url', namespace):
-            loc_elem = url_elem.find('ns:loc', namespace)
-            if loc_elem is not None and loc_elem.text:
-                urls.append(loc_elem.text)
-
-        # If no URLs found, try without namespace
-        if not urls:
-            for loc_elem in root.findall('.//loc'):
-                if loc_elem.text:
-                    urls.append(loc_elem.text)
-
-        logger.info(f"Found {len(urls)} total URLs in sitemap")
+        logger.info(f"Found {len(sitemap)} total URLs in sitemap")
 
         # Filter for relevant documentation pages
-        doc_pages = []
+        doc_pages = {}
 
-        for url in urls:
+        for url, lastmod in sitemap.entries.items():
             # Check if URL matches any of the desired patterns
             if any(pattern in url for pattern in url_patterns):
                 parsed = urlparse(url)
@@ -298,10 +895,12 @@ def discover_documentation_pages(
                 if any(skip in path for skip in skip_patterns):
                     continue
 
-                doc_pages.append(path)
+                # Duplicates keep the most recent lastmod
+                if path not in doc_pages or (lastmod or "") > (doc_pages[path] or ""):
+                    doc_pages[path] = lastmod
 
-        # Remove duplicates and sort
-        doc_pages = sorted(list(set(doc_pages)))
+        # Sort by path
+        doc_pages = {path: doc_pages[path] for path in sorted(doc_pages)}
 
         logger.info(f"Discovered {len(doc_pages)} {source_name} documentation pages")
 
@@ -316,7 +915,12 @@ def validate_markdown_content(content: str, filename: str) -> None:
     """
     Validate that content is proper markdown.
     Raises ValueError if validation fails.
+
+    Only the first VALIDATION_BYTES are inspected, so this can run on the
+    first chunk of a streamed download and never copies a large page.
     """
+    content = content[:VALIDATION_BYTES]
+
     # Check for HTML content
     if not content or content.startswith('<!DOCTYPE') or '<html' in content[:100]:
         raise ValueError("Received HTML instead of markdown")
@@ -326,7 +930,7 @@ def validate_markdown_content(content: str, filename: str) -> None:
         raise ValueError(f"Content too short ({len(content)} bytes)")
 
     # Check for common markdown elements
-    lines = content.split('\n')
+    lines = content.split('\n', 50)
     markdown_indicators = [
         '# ',      # Headers
         '## ',
@@ -362,13 +966,129 @@ def validate_markdown_content(content: str, filename: str) -> None:
         logger.warning(f"Content for {filename} doesn't contain expected documentation patterns")
 
 
+def stream_to_temp_file(chunks, directory: Path, filename: str) -> Tuple[Path, str]:
+    """
+    Write a streamed markdown body to a temporary file, hashing it on the way.
+
+    The body is validated once its first VALIDATION_BYTES have arrived, so an
+    HTML error page is rejected before the rest is downloaded. Memory use is
+    bounded by the chunk size, not the page size.
+
+    Args:
+        chunks: Iterable of bytes (e.g., response.iter_content())
+        directory: Directory for the temp file; use the destination's own
+            directory so the final rename is atomic
+        filename: Document name, for validation messages
+
+    Returns:
+        Tuple of (temp file path, SHA256 hash of the body)
+    """
+    import tempfile
+
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=directory, prefix='.', suffix='.part')
+    temp_path = Path(temp_name)
+    digest = hashlib.sha256()
+    head = bytearray()
+    validated = False
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                if not validated:
+                    head += chunk
+                    if len(head) < VALIDATION_BYTES:
+                        continue
+                    validate_markdown_content(head.decode('utf-8', errors='replace'), filename)
+                    validated = True
+                    chunk, head = bytes(head), bytearray()
+                digest.update(chunk)
+                f.write(chunk)
+
+            if not validated:
+                validate_markdown_content(head.decode('utf-8', errors='replace'), filename)
+                digest.update(head)
+                f.write(head)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+    return temp_path, digest.hexdigest()
+
+
+def fetch_markdown_once(
+    markdown_url: str,
+    filename: str,
+    session: requests.Session,
+    rate_limiter: Optional[HostRateLimiter],
+    validators: Optional[dict],
+    download_dir: Optional[Path],
+    source_key: str = ""
+) -> FetchResult:
+    """
+    Make a single attempt at fetching a markdown page.
+
+    Raises Throttled on 429; retrying is left to RetryScheduler. The request
+    is recorded as a fetch_metrics span labelled with source_key.
+    """
+    if rate_limiter:
+        rate_limiter.acquire(markdown_url, max_wait=MAX_INLINE_RETRY_AFTER)
+
+    headers = conditional_headers(validators)
+    with fetch_metrics.span(markdown_url, source_key, filename) as span, \
+            session.get(markdown_url, headers=headers, timeout=30,
+                        allow_redirects=True, stream=True) as response:
+        span.headers_received(response.status_code)
+
+        # Handle specific HTTP errors
+        if response.status_code == 429:  # Rate limited
+            span.outcome = fetch_metrics.THROTTLED
+            raise Throttled(parse_retry_after(response.headers.get('Retry-After')))
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+        if response.status_code == 304:
+            logger.info(f"Not modified: {filename}")
+            span.outcome = fetch_metrics.NOT_MODIFIED
+            # A 304 may omit validators that haven't changed
+            return FetchResult(
+                filename, None,
+                etag or (validators or {}).get("etag"),
+                last_modified or (validators or {}).get("last_modified")
+            )
+
+        response.raise_for_status()
+
+        if download_dir is not None:
+            temp_path, content_hash = stream_to_temp_file(
+                span.count(response.iter_content(chunk_size=STREAM_CHUNK_SIZE)), download_dir, filename
+            )
+            span.outcome = fetch_metrics.FETCHED
+            logger.info(f"Successfully fetched and validated {filename} ({temp_path.stat().st_size} bytes)")
+            return FetchResult(filename, None, etag, last_modified, content_hash, temp_path)
+
+        # Get content and validate
+        content = response.text
+        span.body_received(len(response.content))
+        validate_markdown_content(content, filename)
+        span.outcome = fetch_metrics.FETCHED
+
+    logger.info(f"Successfully fetched and validated {filename} ({len(content)} bytes)")
+    return FetchResult(filename, content, etag, last_modified, hash_content(content))
+
+
 def fetch_markdown_content(
     path: str,
     session: requests.Session,
     base_url: str,
     source_key: str,
-    preserve_hierarchy: bool
-) -> Tuple[str, str]:
+    preserve_hierarchy: bool,
+    rate_limiter: Optional[HostRateLimiter] = None,
+    validators: Optional[dict] = None,
+    download_dir: Optional[Path] = None,
+    scheduler: Optional[RetryScheduler] = None
+) -> FetchResult:
     """
     Fetch markdown content with better error handling and validation.
 
@@ -378,84 +1098,77 @@ def fetch_markdown_content(
         base_url: Base URL (e.g., https://platform.claude.com)
         source_key: Source key (e.g., 'code' or 'platform')
         preserve_hierarchy: Whether to preserve directory structure in filename
+        rate_limiter: Optional shared per-host rate limiter
+        validators: Previous manifest entry; its ETag / Last-Modified turn the
+            request into a conditional GET
+        download_dir: If given, stream the body into a temp file in this
+            directory instead of reading it into memory
+        scheduler: Shared retry policy; a private one is used if omitted
 
     Returns:
-        Tuple of (filename, content)
+        FetchResult with content_hash None if the page is unchanged (304).
+        When streaming, content is None and temp_path holds the body.
     """
     markdown_url = f"{base_url}{path}.md"
     filename = url_to_safe_filename(path, source_key, preserve_hierarchy)
 
     logger.info(f"Fetching: {markdown_url} -> {filename}")
+    scheduler = scheduler or RetryScheduler(rate_limiter)
+    try:
+        return scheduler.call(markdown_url, lambda: fetch_markdown_once(
+            markdown_url, filename, session, rate_limiter, validators, download_dir, source_key
+        ))
+    except ValueError as e:
+        logger.error(f"Content validation failed for {filename}: {e}")
+        raise
 
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = session.get(markdown_url, headers=HEADERS, timeout=30, allow_redirects=True)
-
-            # Handle specific HTTP errors
-            if response.status_code == 429:  # Rate limited
-                wait_time = int(response.headers.get('Retry-After', 60))
-                logger.warning(f"Rate limited. Waiting {wait_time} seconds...")
-                time.sleep(wait_time)
-                continue
-
-            response.raise_for_status()
-
-            # Get content and validate
-            content = response.text
-            validate_markdown_content(content, filename)
-
-            logger.info(f"Successfully fetched and validated {filename} ({len(content)} bytes)")
-            return filename, content
-
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"Attempt {attempt + 1}/{MAX_RETRIES} failed for {filename}: {e}")
-            if attempt < MAX_RETRIES - 1:
-                # Exponential backoff with jitter
-                delay = min(RETRY_DELAY * (2 ** attempt), MAX_RETRY_DELAY)
-                # Add jitter to prevent thundering herd
-                jittered_delay = delay * random.uniform(0.5, 1.0)
-                logger.info(f"Retrying in {jittered_delay:.1f} seconds...")
-                time.sleep(jittered_delay)
-            else:
-                raise Exception(f"Failed to fetch {filename} after {MAX_RETRIES} attempts: {e}")
 
-        except ValueError as e:
-            logger.error(f"Content validation failed for {filename}: {e}")
-            raise
+def hash_content(content: str) -> str:
+    """SHA256 hash of content as stored on disk (UTF-8)."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
 
 
 def content_has_changed(content: str, old_hash: str) -> bool:
     """Check if content has changed based on hash."""
-    new_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
-    return new_hash != old_hash
+    return hash_content(content) != old_hash
 
 
-def fetch_changelog(session: requests.Session) -> Tuple[str, str]:
-    """
-    Fetch Claude Code changelog from GitHub repository.
-    Returns tuple of (filename, content).
-    """
-    changelog_url = "https://raw.githubusercontent.com/anthropics/claude-code/main/CHANGELOG.md"
-    filename = "changelog.md"
-
-    logger.info(f"Fetching Claude Code changelog: {changelog_url}")
+CHANGELOG_URL = "https://raw.githubusercontent.com/anthropics/claude-code/main/CHANGELOG.md"
 
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = session.get(changelog_url, headers=HEADERS, timeout=30, allow_redirects=True)
 
-            if response.status_code == 429:  # Rate limited
-                wait_time = int(response.headers.get('Retry-After', 60))
-                logger.warning(f"Rate limited. Waiting {wait_time} seconds...")
-                time.sleep(wait_time)
-                continue
+def fetch_changelog_once(session: requests.Session, validators: Optional[dict]) -> FetchResult:
+    """Make a single attempt at fetching the changelog; raises Throttled on 429."""
+    filename = "changelog.md"
+    headers = conditional_headers(validators)
+    with fetch_metrics.span(CHANGELOG_URL, "changelog", "claude-code/changelog.md") as span:
+        response = session.get(CHANGELOG_URL, headers=headers, timeout=30, allow_redirects=True)
+        span.headers_received(response.status_code)
+        span.body_received(len(response.content))
+
+        if response.status_code == 429:  # Rate limited
+            span.outcome = fetch_metrics.THROTTLED
+            raise Throttled(parse_retry_after(response.headers.get('Retry-After')))
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+
+        if response.status_code == 304:
+            logger.info("Changelog not modified")
+            span.outcome = fetch_metrics.NOT_MODIFIED
+            # A 304 may omit validators that haven't changed
+            return FetchResult(
+                filename, None,
+                etag or (validators or {}).get("etag"),
+                last_modified or (validators or {}).get("last_modified")
+            )
 
-            response.raise_for_status()
+        response.raise_for_status()
+        span.outcome = fetch_metrics.FETCHED
 
-            content = response.text
+    content = response.text
 
-            # Add header to indicate this is from Claude Code repo, not docs site
-            header = """# Claude Code Changelog
+    # Add header to indicate this is from Claude Code repo, not docs site
+    header = """# Claude Code Changelog
 
 > **Source**: https://github.com/anthropics/claude-code/blob/main/CHANGELOG.md
 >
@@ -464,28 +1177,32 @@ def fetch_changelog(session: requests.Session) -> Tuple[str, str]:
 ---
 
 """
-            content = header + content
-
-            # Basic validation
-            if len(content.strip()) < 100:
-                raise ValueError(f"Changelog content too short ({len(content)} bytes)")
-
-            logger.info(f"Successfully fetched changelog ({len(content)} bytes)")
-            return filename, content
-
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"Attempt {attempt + 1}/{MAX_RETRIES} failed for changelog: {e}")
-            if attempt < MAX_RETRIES - 1:
-                delay = min(RETRY_DELAY * (2 ** attempt), MAX_RETRY_DELAY)
-                jittered_delay = delay * random.uniform(0.5, 1.0)
-                logger.info(f"Retrying in {jittered_delay:.1f} seconds...")
-                time.sleep(jittered_delay)
-            else:
-                raise Exception(f"Failed to fetch changelog after {MAX_RETRIES} attempts: {e}")
+    content = header + content
 
-        except ValueError as e:
-            logger.error(f"Changelog validation failed: {e}")
-            raise
+    # Basic validation
+    if len(content.strip()) < 100:
+        raise ValueError(f"Changelog content too short ({len(content)} bytes)")
+
+    logger.info(f"Successfully fetched changelog ({len(content)} bytes)")
+    return FetchResult(filename, content, etag, last_modified, hash_content(content))
+
+
+def fetch_changelog(
+    session: requests.Session,
+    validators: Optional[dict] = None,
+    scheduler: Optional[RetryScheduler] = None
+) -> FetchResult:
+    """
+    Fetch Claude Code changelog from GitHub repository.
+    Returns a FetchResult whose content is None if the changelog is unchanged (304).
+    """
+    logger.info(f"Fetching Claude Code changelog: {CHANGELOG_URL}")
+    scheduler = scheduler or RetryScheduler()
+    try:
+        return scheduler.call(CHANGELOG_URL, lambda: fetch_changelog_once(session, validators))
+    except ValueError as e:
+        logger.error(f"Changelog validation failed: {e}")
+        raise
 
 
 def save_markdown_file(docs_dir: Path, filename: str, content: str) -> str:
@@ -502,50 +1219,355 @@ def save_markdown_file(docs_dir: Path, filename: str, content: str) -> str:
         SHA256 hash of the content
     """
     file_path = docs_dir / filename
+    data = content.encode('utf-8')
 
     try:
         # Create parent directories if needed
         file_path.parent.mkdir(parents=True, exist_ok=True)
 
-        file_path.write_text(content, encoding='utf-8')
-        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        # Write beside the target and rename, so readers never see a partial file
+        temp_path = file_path.with_name(f".{file_path.name}.part")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, file_path)
         logger.info(f"Saved: {filename}")
-        return content_hash
+        return hashlib.sha256(data).hexdigest()
     except Exception as e:
         logger.error(f"Failed to save {filename}: {e}")
         raise
 
 
-def cleanup_old_files(docs_dir: Path, current_files: Set[str], manifest: dict) -> None:
+def add_validators(entry: dict, result: FetchResult) -> None:
+    """Record the HTTP validators of a fetch in its manifest entry."""
+    if result.etag:
+        entry["etag"] = result.etag
+    if result.last_modified:
+        entry["last_modified"] = result.last_modified
+
+
+def process_page(
+    page_path: str,
+    session: requests.Session,
+    base_url: str,
+    source_key: str,
+    source_config: dict,
+    docs_dir: Path,
+    manifest: dict,
+    rate_limiter: Optional[HostRateLimiter] = None,
+    staging: Optional[StagedUpdate] = None,
+    scheduler: Optional[RetryScheduler] = None
+) -> Tuple[str, dict]:
+    """
+    Fetch a single page, save it if it changed and build its manifest entry.
+
+    Safe to run from worker threads: each page writes only its own file.
+    With staging, a changed page is written to the staging directory and
+    reaches docs/ only when the whole run commits.
+
+    Returns:
+        Tuple of (filename, manifest entry)
+    """
+    filename = url_to_safe_filename(page_path, source_key, source_config['preserve_hierarchy'])
+    old_entry = manifest.get("files", {}).get(filename, {})
+    old_hash = old_entry.get("hash", "")
+
+    # Only revalidate when we still have the local copy a 304 would refer to
+    validators = old_entry if (old_hash and (docs_dir / filename).exists()) else None
+
+    # The body is streamed to a temp file beside its destination and only
+    # renamed into place if its hash differs from the stored one
+    file_path = docs_dir / filename
+    destination = staging.path(filename) if staging else file_path
+    result = fetch_markdown_content(
+        page_path,
+        session,
+        base_url,
+        source_key,
+        source_config['preserve_hierarchy'],
+        rate_limiter,
+        validators,
+        download_dir=destination.parent,
+        scheduler=scheduler
+    )
+
+    try:
+        if not result.not_modified and (result.content_hash != old_hash or not file_path.exists()):
+            os.replace(result.temp_path, destination)
+            content_hash = result.content_hash
+            logger.info(f"  ✓ Updated: {filename}")
+            last_updated = datetime.now().isoformat()
+        else:
+            content_hash = old_hash
+            logger.info(f"  • Unchanged: {filename}")
+            last_updated = old_entry.get("last_updated", datetime.now().isoformat())
+            # Bytes a 304 didn't download, or an unchanged body didn't write
+            unchanged_copy = file_path if result.not_modified else result.temp_path
+            if unchanged_copy.exists():
+                fetch_metrics.mark_saved(f"{base_url}{page_path}.md", unchanged_copy.stat().st_size)
+    finally:
+        if result.temp_path:
+            result.temp_path.unlink(missing_ok=True)
+
+    entry = {
+        "source": source_key,
+        "source_name": source_config['name'],
+        "original_url": f"{base_url}{page_path}",
+        "original_md_url": f"{base_url}{page_path}.md",
+        "hash": content_hash,
+        "last_updated": last_updated
+    }
+    add_validators(entry, result)
+    return filename, entry
+
+
+def page_task(
+    page_path: str,
+    session: requests.Session,
+    base_url: str,
+    source_key: str,
+    source_config: dict,
+    docs_dir: Path,
+    manifest: dict,
+    scheduler: RetryScheduler,
+    staging: Optional[StagedUpdate] = None
+) -> Tuple[str, Callable[[], Tuple[str, dict]]]:
+    """Build the (url, attempt) task that processes one page under RetryScheduler.run."""
+    def attempt() -> Tuple[str, dict]:
+        return process_page(
+            page_path, session, base_url, source_key, source_config,
+            docs_dir, manifest, scheduler.rate_limiter, staging, scheduler
+        )
+    return f"{base_url}{page_path}.md", attempt
+
+
+def cleanup_old_files(
+    docs_dir: Path,
+    current_files: Set[str],
+    manifest: dict,
+    staging: Optional[StagedUpdate] = None
+) -> None:
     """
     Remove only files that were previously fetched but no longer exist.
-    Preserves manually added files.
+    Preserves manually added files. With staging, removals are deferred
+    until the new manifest has been committed.
     """
     previous_files = set(manifest.get("files", {}).keys())
     files_to_remove = previous_files - current_files
 
     for filename in files_to_remove:
-        if filename == MANIFEST_FILE:  # Never delete the manifest
+        if filename in (MANIFEST_FILE, MANIFEST_DB):  # Never delete the manifest
             continue
 
         file_path = docs_dir / filename
-        if file_path.exists():
+        if staging:
+            staging.remove(filename)
+        elif file_path.exists():
             logger.info(f"Removing obsolete file: {filename}")
             file_path.unlink()
 
 
-def main():
-    """Main function with multi-source support."""
+COMMANDS = ("fetch", "manifest")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parse command line arguments.
+
+    Without a subcommand the arguments are treated as options of `fetch`, so
+    `fetch_claude_docs.py --incremental` keeps working.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv.insert(0, "fetch")
+
+    parser = argparse.ArgumentParser(description="Fetch Claude documentation into docs/")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fetch_parser = subparsers.add_parser("fetch", help="Fetch documentation (default)")
+    fetch_parser.add_argument(
+        "--docs-dir",
+        type=Path,
+        default=DEFAULT_DOCS_DIR,
+        help="Output directory (default: docs/ at the repository root)"
+    )
+    fetch_parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get('FETCH_WORKERS', MAX_WORKERS)),
+        help=f"Number of concurrent page fetches (default: {MAX_WORKERS}, env: FETCH_WORKERS)"
+    )
+    fetch_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch pages whose sitemap <lastmod> changed since the last run"
+    )
+    fetch_parser.add_argument(
+        "--full-sweep-hours",
+        type=float,
+        default=FULL_SWEEP_INTERVAL_HOURS,
+        help=f"In incremental mode, do a full fetch if the last one is older than this "
+             f"(default: {FULL_SWEEP_INTERVAL_HOURS})"
+    )
+    fetch_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run, fetching only the pages it had not finished"
+    )
+    fetch_parser.add_argument(
+        "--trace",
+        type=Path,
+        default=os.environ.get('FETCH_TRACE') or None,
+        help="Write one JSON line per HTTP request (timings, bytes, outcome) to this file (env: FETCH_TRACE)"
+    )
+    fetch_parser.add_argument(
+        "--metrics-file",
+        type=Path,
+        default=os.environ.get('FETCH_METRICS_FILE') or None,
+        help="Write run metrics in Prometheus textfile format to this file (env: FETCH_METRICS_FILE)"
+    )
+
+    fetch_parser.add_argument(
+        "--snapshot-dir",
+        type=Path,
+        default=os.environ.get('FETCH_SNAPSHOT_DIR') or None,
+        help="Also publish a compressed snapshot of docs/ and a delta from the previous one "
+             "to this directory (env: FETCH_SNAPSHOT_DIR)"
+    )
+
+    manifest_parser = subparsers.add_parser("manifest", help="Query the documentation manifest")
+    manifest_parser.add_argument(
+        "--docs-dir",
+        type=Path,
+        default=DEFAULT_DOCS_DIR,
+        help="Documentation directory (default: docs/ at the repository root)"
+    )
+    manifest_commands = manifest_parser.add_subparsers(dest="manifest_command", required=True)
+    list_parser = manifest_commands.add_parser("list", help="List fetched files")
+    list_parser.add_argument("--source", help="Only list files from this source (e.g., platform)")
+    show_parser = manifest_commands.add_parser("show", help="Show the manifest entry of a file")
+    show_parser.add_argument("filename", help="File relative to docs/ (e.g., claude-code/hooks.md)")
+    manifest_commands.add_parser("stats", help="Show metadata of the last fetch")
+
+    return parser.parse_args(argv)
+
+
+def query_manifest(args: argparse.Namespace) -> int:
+    """Answer a `manifest` subcommand. Returns the process exit code."""
+    # The database answers each query directly; the JSON view is parsed only without it
+    conn = open_manifest(args.docs_dir)
+    manifest = load_manifest(args.docs_dir) if conn is None else read_meta(conn)
+    files = manifest.get("files", {})
+
+    if args.manifest_command == "list":
+        if conn is not None:
+            filenames = source_files(conn, args.source)
+        else:
+            filenames = [filename for filename, entry in files.items()
+                         if not args.source or entry.get("source") == args.source]
+        for filename in filenames:
+            print(filename)
+        return 0
+
+    if args.manifest_command == "show":
+        filename = args.filename if args.filename.endswith('.md') else f"{args.filename}.md"
+        entry = get_entry(conn, filename) if conn is not None else files.get(filename)
+        if entry is None:
+            print(f"Not in manifest: {filename}", file=sys.stderr)
+            return 1
+        print(json.dumps(entry, indent=2))
+        return 0
+
+    print(json.dumps({
+        "last_updated": manifest.get("last_updated"),
+        "fetch_metadata": manifest.get("fetch_metadata", {}),
+        "sources": {
+            key: {k: v for k, v in source.items() if k != "failed_pages"}
+            for key, source in manifest.get("sources", {}).items()
+        },
+    }, indent=2))
+    return 0
+
+
+def needs_full_sweep(manifest: dict, interval_hours: float) -> bool:
+    """Check whether the last full fetch recorded in the manifest is too old."""
+    last_full_sweep = manifest.get("fetch_metadata", {}).get("last_full_sweep")
+    if not last_full_sweep:
+        return True
+    try:
+        age = datetime.now() - datetime.fromisoformat(last_full_sweep)
+    except ValueError:
+        return True
+    return age.total_seconds() >= interval_hours * 3600
+
+
+def is_unchanged_in_sitemap(
+    page_path: str,
+    lastmod: Optional[str],
+    source_key: str,
+    source_config: dict,
+    docs_dir: Path,
+    manifest: dict
+) -> bool:
+    """Check whether a page's sitemap <lastmod> matches the one recorded at its last fetch."""
+    if not lastmod:
+        return False
+    filename = url_to_safe_filename(page_path, source_key, source_config['preserve_hierarchy'])
+    old_entry = manifest.get("files", {}).get(filename)
+    return bool(old_entry) and old_entry.get("lastmod") == lastmod and (docs_dir / filename).exists()
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point."""
+    args = parse_args(argv)
+    if args.command == "manifest":
+        sys.exit(query_manifest(args))
+
+    configure_logging()
+    fetch_docs(args)
+
+
+def log_request_summary(request_summary: Dict[str, dict]) -> None:
+    """Log request latency percentiles and the slowest pages of each source."""
+    logger.info("\nRequests:")
+    for source, data in request_summary.items():
+        latency = data["latency_ms"]
+        percentiles = ", ".join(
+            f"{name} {value:.0f}ms" for name, value in latency.items() if value is not None
+        ) or "no responses"
+        logger.info(f"  {source}: {data['requests']} requests ({data['retries']} retries), "
+                    f"{data['bytes'] / 1024:.0f} KiB downloaded, {data['bytes_saved'] / 1024:.0f} KiB saved; "
+                    f"{percentiles}")
+        if source != "sitemap":
+            for page in data["slowest"]:
+                logger.info(f"    slowest: {page['name']} {page['total_ms']:.0f}ms ({page['bytes']} bytes)")
+
+
+def export_metrics(args: argparse.Namespace, metrics: fetch_metrics.FetchMetrics, run_info: Dict[str, float]) -> None:
+    """Write the --trace and --metrics-file outputs; failing to write them doesn't fail the fetch."""
+    try:
+        if args.trace:
+            metrics.write_trace(args.trace)
+            logger.info(f"Request trace written to {args.trace}")
+        if args.metrics_file:
+            metrics.write_prometheus(args.metrics_file, run_info)
+            logger.info(f"Metrics written to {args.metrics_file}")
+    except OSError as e:
+        logger.warning(f"Failed to write fetch metrics: {e}")
+
+
+def fetch_docs(args: argparse.Namespace) -> None:
+    """Fetch all documentation sources (the `fetch` command)."""
     start_time = datetime.now()
+    metrics = fetch_metrics.start_run()
     logger.info("Starting multi-source documentation fetch (v4.0)")
 
     # Log configuration
     github_repo = os.environ.get('GITHUB_REPOSITORY', 'brennacodes/claude-code-docs')
     logger.info(f"GitHub repository: {github_repo}")
     logger.info(f"Documentation sources: {', '.join(DOC_SOURCES.keys())}")
+    logger.info(f"Concurrent workers: {args.workers}")
 
-    # Create docs directory at repository root
-    docs_dir = Path(__file__).parent.parent / 'docs'
+    # Create docs directory (repository root by default)
+    docs_dir = args.docs_dir
     docs_dir.mkdir(exist_ok=True)
     logger.info(f"Output directory: {docs_dir}")
 
@@ -553,111 +1575,100 @@ def main():
     for source_key in DOC_SOURCES.keys():
         (docs_dir / source_key).mkdir(exist_ok=True)
 
+    # Changes are staged and committed together at the end, so a run that
+    # dies part-way leaves docs/ as it was; a previous interrupted run is
+    # completed or discarded here, or continued with --resume
+    staging = StagedUpdate(docs_dir)
+    resumed = staging.begin(resume=args.resume)
+
     # Load manifest
     manifest = load_manifest(docs_dir)
 
+    # Page status is persisted as the run goes so --resume can pick it up
+    queue = WorkQueue.load(staging.dir / QUEUE_FILE) if resumed else None
+    if queue is None:
+        full_sweep = not args.incremental or needs_full_sweep(manifest, args.full_sweep_hours)
+        queue = WorkQueue(staging.dir / QUEUE_FILE, full_sweep)
+    else:
+        full_sweep = queue.full_sweep
+    if args.incremental:
+        logger.info(f"Incremental mode: {'full sweep due' if full_sweep else 'fetching pages with a new <lastmod> only'}")
+
     # Global statistics
     total_successful = 0
     total_failed = 0
+    total_skipped = 0
+    total_deferred = 0
     fetched_files = set()
     new_manifest = {"files": {}, "sources": {}}
 
+    # Shared per-host rate limiter and retry policy for all workers
+    rate_limiter = HostRateLimiter()
+    scheduler = RetryScheduler(rate_limiter)
+
+    changelog_filename = "claude-code/changelog.md"
+    changelog_entry = manifest.get("files", {}).get(changelog_filename, {})
+    changelog_hash = changelog_entry.get("hash", "")
+
     # Create a session for connection pooling
-    with requests.Session() as session:
-        # Process each documentation source
+    with create_session(args.workers) as session:
+        # Discover the pages of every source first, so that all of them can
+        # be fetched in one pass and a throttled host never idles the others
+        sources = {}  # source_key -> (sitemap_url, base_url)
         for source_key, source_config in DOC_SOURCES.items():
             logger.info("\n" + "="*70)
-            logger.info(f"Processing {source_config['name']} ({source_key})")
+            logger.info(f"Discovering {source_config['name']} ({source_key})")
             logger.info("="*70)
 
-            source_successful = 0
-            source_failed = 0
-            source_failed_pages = []
-
             try:
-                # Discover sitemap and base URL for this source
-                sitemap_url, base_url = discover_sitemap_and_base_url(
+                if source_key in queue:
+                    info = queue.info(source_key)
+                    sources[source_key] = (info["sitemap_url"], info["base_url"])
+                    logger.info(f"Resuming: {len(queue.due(source_key))} of "
+                                f"{len(queue.pages(source_key))} pages left")
+                    continue
+
+                # Discover and parse the sitemap once for this source
+                sitemap = discover_sitemap(
                     session,
                     source_config['sitemap_urls']
                 )
+                sitemap_url, base_url = sitemap.url, sitemap.base_url
 
                 # Discover documentation pages
-                documentation_pages = discover_documentation_pages(
+                lastmods = discover_documentation_lastmods(
                     session,
-                    sitemap_url,
+                    sitemap,
                     source_config['url_patterns'],
                     source_config['skip_patterns'],
                     source_config['name']
                 )
 
-                if not documentation_pages:
+                if not lastmods:
                     logger.warning(f"No pages discovered for {source_key}, trying fallback...")
-                    documentation_pages = source_config['fallback_pages']
-
-                # Fetch each page
-                for i, page_path in enumerate(documentation_pages, 1):
-                    logger.info(f"[{source_key}] Processing {i}/{len(documentation_pages)}: {page_path}")
-
-                    try:
-                        filename, content = fetch_markdown_content(
-                            page_path,
-                            session,
-                            base_url,
-                            source_key,
-                            source_config['preserve_hierarchy']
-                        )
-
-                        # Check if content has changed
-                        old_hash = manifest.get("files", {}).get(filename, {}).get("hash", "")
-                        old_entry = manifest.get("files", {}).get(filename, {})
-
-                        if content_has_changed(content, old_hash):
-                            content_hash = save_markdown_file(docs_dir, filename, content)
-                            logger.info(f"  ✓ Updated: {filename}")
-                            last_updated = datetime.now().isoformat()
-                        else:
-                            content_hash = old_hash
-                            logger.info(f"  • Unchanged: {filename}")
-                            last_updated = old_entry.get("last_updated", datetime.now().isoformat())
-
-                        new_manifest["files"][filename] = {
-                            "source": source_key,
-                            "source_name": source_config['name'],
-                            "original_url": f"{base_url}{page_path}",
-                            "original_md_url": f"{base_url}{page_path}.md",
-                            "hash": content_hash,
-                            "last_updated": last_updated
-                        }
-
-                        fetched_files.add(filename)
-                        source_successful += 1
-                        total_successful += 1
-
-                        # Rate limiting
-                        if i < len(documentation_pages):
-                            time.sleep(RATE_LIMIT_DELAY)
-
-                    except Exception as e:
-                        logger.error(f"  ✗ Failed to process {page_path}: {e}")
-                        source_failed += 1
-                        total_failed += 1
-                        source_failed_pages.append(page_path)
-
-                # Store source metadata
-                new_manifest["sources"][source_key] = {
-                    "name": source_config['name'],
-                    "sitemap_url": sitemap_url,
-                    "base_url": base_url,
-                    "pages_discovered": len(documentation_pages),
-                    "pages_fetched": source_successful,
-                    "pages_failed": source_failed,
-                    "failed_pages": source_failed_pages
-                }
+                    lastmods = dict.fromkeys(source_config['fallback_pages'])
 
-                logger.info(f"\n{source_config['name']} Summary:")
-                logger.info(f"  Discovered: {len(documentation_pages)} pages")
-                logger.info(f"  Successful: {source_successful}")
-                logger.info(f"  Failed: {source_failed}")
+                # Pages that failed in earlier runs keep their backoff schedule
+                retry_state = manifest.get("sources", {}).get(source_key, {}).get("retry", {})
+                queue.add_source(
+                    source_key, {"sitemap_url": sitemap_url, "base_url": base_url},
+                    lastmods, retry_state
+                )
+                sources[source_key] = (sitemap_url, base_url)
+
+                # In incremental mode, pages whose <lastmod> didn't move keep their entry
+                if not full_sweep:
+                    unchanged = 0
+                    for page_path, lastmod in lastmods.items():
+                        if is_unchanged_in_sitemap(page_path, lastmod, source_key,
+                                                   source_config, docs_dir, manifest):
+                            filename = url_to_safe_filename(
+                                page_path, source_key, source_config['preserve_hierarchy']
+                            )
+                            queue.mark_done(source_key, page_path, filename,
+                                            manifest["files"][filename], skipped=True)
+                            unchanged += 1
+                    logger.info(f"Skipping {unchanged} pages with unchanged <lastmod>")
 
             except Exception as e:
                 logger.error(f"Failed to process {source_key}: {e}")
@@ -668,48 +1679,152 @@ def main():
                     "pages_fetched": 0
                 }
 
-        # Fetch Claude Code changelog (stored in claude-code/ directory)
+        # Fetch every due page of every source, plus the Claude Code
+        # changelog, on one worker pool
+        jobs = []  # (source_key, page_path), parallel to tasks
+        tasks = []
+        for source_key, (sitemap_url, base_url) in sources.items():
+            for page_path in queue.due(source_key):
+                jobs.append((source_key, page_path))
+                tasks.append(page_task(
+                    page_path, session, base_url, source_key, DOC_SOURCES[source_key],
+                    docs_dir, manifest, scheduler, staging
+                ))
         logger.info("\n" + "="*70)
-        logger.info("Fetching Claude Code changelog...")
-        try:
-            filename, content = fetch_changelog(session)
-            # Save changelog in claude-code directory
-            changelog_filename = f"claude-code/{filename}"
-
-            # Check if content has changed
-            old_hash = manifest.get("files", {}).get(changelog_filename, {}).get("hash", "")
-            old_entry = manifest.get("files", {}).get(changelog_filename, {})
-
-            if content_has_changed(content, old_hash):
-                # Create claude-code directory if needed
-                (docs_dir / "claude-code").mkdir(exist_ok=True)
-                content_hash = save_markdown_file(docs_dir, changelog_filename, content)
-                logger.info(f"  ✓ Updated: {changelog_filename}")
-                last_updated = datetime.now().isoformat()
+        logger.info(f"Fetching {len(tasks)} pages and the Claude Code changelog...")
+        logger.info("="*70)
+
+        changelog_validators = (
+            changelog_entry if (changelog_hash and (docs_dir / changelog_filename).exists()) else None
+        )
+        tasks.append((CHANGELOG_URL, lambda: fetch_changelog(session, changelog_validators, scheduler)))
+
+        def record_result(index, result, error):
+            if index >= len(jobs):
+                return  # the changelog isn't part of the work queue
+            source_key, page_path = jobs[index]
+            if error is None:
+                queue.mark_done(source_key, page_path, *result)
             else:
-                content_hash = old_hash
-                logger.info(f"  • Unchanged: {changelog_filename}")
-                last_updated = old_entry.get("last_updated", datetime.now().isoformat())
-
-            new_manifest["files"][changelog_filename] = {
-                "source": "claude-code",
-                "source_name": "Claude Code Changelog",
-                "original_url": "https://github.com/anthropics/claude-code/blob/main/CHANGELOG.md",
-                "original_raw_url": "https://raw.githubusercontent.com/anthropics/claude-code/main/CHANGELOG.md",
-                "hash": content_hash,
-                "last_updated": last_updated,
-                "type": "changelog"
-            }
-
-            fetched_files.add(changelog_filename)
-            total_successful += 1
+                retry_after = error.delay if isinstance(error, RetryLater) else None
+                queue.mark_failed(source_key, page_path, error, retry_after)
+
+        results = scheduler.run(tasks, args.workers, record_result)
+        queue.save(force=True)
+        attempted = set(jobs)
+
+    # Build the manifest entries of each source from the work queue
+    for source_key, (sitemap_url, base_url) in sources.items():
+        source_config = DOC_SOURCES[source_key]
+        source_successful = 0
+        source_failed = 0
+        source_skipped = 0
+        source_deferred = 0
+        source_failed_pages = []
+        source_retry = {}
+
+        pages = queue.pages(source_key)
+        for page_path, record in pages.items():
+            if record["status"] == DONE:
+                entry = record["entry"]
+                if record["lastmod"]:
+                    entry["lastmod"] = record["lastmod"]
+                new_manifest["files"][record["filename"]] = entry
+                fetched_files.add(record["filename"])
+                if record["skipped"]:
+                    source_skipped += 1
+                else:
+                    source_successful += 1
+                continue
 
-        except Exception as e:
-            logger.error(f"  ✗ Failed to fetch changelog: {e}")
-            total_failed += 1
+            # Failed now or waiting out an earlier failure: keep the
+            # last good copy, if any, until a retry succeeds
+            if (source_key, page_path) in attempted:
+                logger.error(f"  ✗ Failed to process {page_path}: {record['error']}")
+                source_failed += 1
+                source_failed_pages.append(page_path)
+            else:
+                source_deferred += 1
+            source_retry[page_path] = {
+                "attempts": record["attempts"],
+                "retry_at": record["retry_at"],
+                "error": record["error"]
+            }
+            filename = url_to_safe_filename(page_path, source_key, source_config['preserve_hierarchy'])
+            if filename in manifest.get("files", {}):
+                new_manifest["files"][filename] = manifest["files"][filename]
+                fetched_files.add(filename)
+
+        total_successful += source_successful
+        total_failed += source_failed
+        total_skipped += source_skipped
+        total_deferred += source_deferred
+
+        # Store source metadata
+        new_manifest["sources"][source_key] = {
+            "name": source_config['name'],
+            "sitemap_url": sitemap_url,
+            "base_url": base_url,
+            "pages_discovered": len(pages),
+            "pages_fetched": source_successful,
+            "pages_skipped": source_skipped,
+            "pages_failed": source_failed,
+            "pages_deferred": source_deferred,
+            "failed_pages": source_failed_pages,
+            "retry": source_retry
+        }
+
+        logger.info(f"\n{source_config['name']} Summary:")
+        logger.info(f"  Discovered: {len(pages)} pages")
+        logger.info(f"  Successful: {source_successful}")
+        logger.info(f"  Skipped (unchanged <lastmod>): {source_skipped}")
+        logger.info(f"  Failed: {source_failed}")
+        if source_deferred:
+            logger.info(f"  Deferred (retry not due yet): {source_deferred}")
+
+    # Save the Claude Code changelog (stored in claude-code/ directory)
+    result, error = results[-1]
+    if error is None:
+        # Check if content has changed
+        if not result.not_modified and result.content_hash != changelog_hash:
+            content_hash = save_markdown_file(staging.dir, changelog_filename, result.content)
+            logger.info(f"  ✓ Updated: {changelog_filename}")
+            last_updated = datetime.now().isoformat()
+        else:
+            content_hash = changelog_hash
+            logger.info(f"  • Unchanged: {changelog_filename}")
+            last_updated = changelog_entry.get("last_updated", datetime.now().isoformat())
+            if result.not_modified:
+                changelog_path = docs_dir / changelog_filename
+                fetch_metrics.mark_saved(CHANGELOG_URL, changelog_path.stat().st_size if changelog_path.exists() else 0)
+            else:
+                fetch_metrics.mark_saved(CHANGELOG_URL, len(result.content.encode('utf-8')))
+
+        new_manifest["files"][changelog_filename] = {
+            "source": "claude-code",
+            "source_name": "Claude Code Changelog",
+            "original_url": "https://github.com/anthropics/claude-code/blob/main/CHANGELOG.md",
+            "original_raw_url": CHANGELOG_URL,
+            "hash": content_hash,
+            "last_updated": last_updated,
+            "type": "changelog"
+        }
+        add_validators(new_manifest["files"][changelog_filename], result)
+
+        fetched_files.add(changelog_filename)
+        total_successful += 1
+    else:
+        logger.error(f"  ✗ Failed to fetch changelog: {error}")
+        total_failed += 1
 
     # Clean up old files (only those we previously fetched)
-    cleanup_old_files(docs_dir, fetched_files, manifest)
+    cleanup_old_files(docs_dir, fetched_files, manifest, staging)
+
+    # Request latency per source, from the metrics spans of this run
+    request_summary = metrics.summary()
+    for source_key, source_data in new_manifest["sources"].items():
+        if source_key in request_summary:
+            source_data["latency_ms"] = request_summary[source_key]["latency_ms"]
 
     # Add global metadata to manifest
     new_manifest["fetch_metadata"] = {
@@ -718,12 +1833,56 @@ def main():
         "total_files": len(fetched_files),
         "total_successful": total_successful,
         "total_failed": total_failed,
+        "total_skipped": total_skipped,
+        "total_deferred": total_deferred,
+        "requests": sum(data["requests"] for data in request_summary.values()),
+        "bytes_downloaded": sum(data["bytes"] for data in request_summary.values()),
+        "bytes_saved": sum(data["bytes_saved"] for data in request_summary.values()),
         "fetch_tool_version": "4.0",
-        "multi_source": True
+        "multi_source": True,
+        "incremental": not full_sweep,
+        "last_full_sweep": (
+            start_time.isoformat() if full_sweep
+            else manifest.get("fetch_metadata", {}).get("last_full_sweep")
+        )
     }
 
-    # Save new manifest
-    save_manifest(docs_dir, new_manifest)
+    # Topic lookup table for the /docs helper, committed along with the manifest
+    write_topic_table(staging.dir, build_topic_table(new_manifest["files"], [staging.dir, docs_dir]))
+
+    # Per-release changelog index: only releases added since the last run are
+    # parsed; a failure here shouldn't fail the fetch
+    staged_changelog = staging.path(changelog_filename)
+    if staged_changelog.exists() or not (docs_dir / CHANGELOG_INDEX).exists():
+        changelog_path = staged_changelog if staged_changelog.exists() else docs_dir / changelog_filename
+        try:
+            if changelog_path.exists():
+                added = refresh_changelog_index(staging.dir, changelog_path, docs_dir)
+                logger.info(f"Changelog index: {added} new releases")
+        except Exception as e:
+            logger.warning(f"Failed to update changelog index: {e}")
+
+    # Save new manifest, then move it and every staged file into docs/
+    save_manifest(staging.dir, new_manifest, docs_dir)
+    staging.commit()
+
+    # Refresh the full-text search index; a failure here shouldn't fail the fetch
+    try:
+        from search_index import ensure_index
+        ensure_index(docs_dir)
+    except Exception as e:
+        logger.warning(f"Failed to update search index: {e}")
+
+    # Publish a snapshot and the delta from the previous one for clients
+    # that update without git; a failure here shouldn't fail the fetch either
+    if args.snapshot_dir:
+        try:
+            from snapshot_bundle import publish
+            snapshot = publish(docs_dir, args.snapshot_dir)
+            logger.info(f"Published snapshot {snapshot} to {args.snapshot_dir}" if snapshot
+                        else "Docs unchanged since the last published snapshot")
+        except Exception as e:
+            logger.warning(f"Failed to publish snapshot: {e}")
 
     # Final summary
     duration = datetime.now() - start_time
@@ -734,6 +1893,10 @@ def main():
     logger.info(f"Total files: {len(fetched_files)}")
     logger.info(f"Successful: {total_successful}")
     logger.info(f"Failed: {total_failed}")
+    if total_skipped:
+        logger.info(f"Skipped (unchanged <lastmod>): {total_skipped}")
+    if total_deferred:
+        logger.info(f"Deferred (retry not due yet): {total_deferred}")
     logger.info("")
 
     for source_key, source_data in new_manifest["sources"].items():
@@ -742,8 +1905,19 @@ def main():
         else:
             logger.info(f"  {source_data['name']}: {source_data['pages_fetched']} pages")
 
+    log_request_summary(request_summary)
+    export_metrics(args, metrics, {
+        "duration_seconds": duration.total_seconds(),
+        "last_run_timestamp_seconds": time.time(),
+        "files": len(fetched_files),
+        "pages_successful": total_successful,
+        "pages_failed": total_failed,
+        "pages_skipped": total_skipped,
+        "pages_deferred": total_deferred,
+    })
+
     # Exit with error only if everything failed
-    if total_successful == 0:
+    if total_successful == 0 and total_skipped == 0 and total_deferred == 0:
         logger.error("\nNo pages were fetched successfully!")
         sys.exit(1)
     elif total_failed > 0:
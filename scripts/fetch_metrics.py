@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Per-request instrumentation for documentation fetch runs.
+
+Every HTTP request of a run is recorded as a span: how long name resolution,
+connecting (TCP and TLS), waiting for the response headers (TTFB) and reading
+the body took, how many bytes came back, the status and outcome, which
+attempt it was, and how many bytes an unchanged page saved us from writing
+or downloading. A run's spans can be exported as a JSON-lines trace and as a
+Prometheus textfile (for node_exporter's textfile collector), and summarized
+as p50/p95/p99 latency and the slowest pages per source.
+
+Connection timings come from the urllib3 connections opened through
+`instrumented_adapter()`; a request served from a pooled connection has none.
+"""
+
+import json
+import math
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+
+METRIC_PREFIX = "claude_docs_fetch"
+QUANTILES = (0.5, 0.95, 0.99)
+SLOWEST_PAGES = 5  # slowest pages listed per source in the summary
+
+# Outcomes of a request
+FETCHED = "fetched"  # 200 with a new body
+UNCHANGED = "unchanged"  # 200, but the body hashed the same as the stored copy
+NOT_MODIFIED = "not_modified"  # 304 to a conditional GET
+THROTTLED = "throttled"  # 429
+ERROR = "error"  # any other failure
+
+_local = threading.local()
+
+
+def elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+class Span:
+    """Timings, size and outcome of one HTTP request."""
+
+    def __init__(self, url: str, source: str, name: str, attempt: int):
+        self.url = url
+        self.source = source
+        self.name = name
+        self.attempt = attempt
+        self.timestamp = datetime.now().isoformat()
+        self.status: Optional[int] = None
+        self.outcome: Optional[str] = None
+        self.error: Optional[str] = None
+        self.new_connection = False
+        self.dns_ms = 0.0
+        self.connect_ms = 0.0
+        self.ttfb_ms: Optional[float] = None
+        self.download_ms: Optional[float] = None
+        self.total_ms: Optional[float] = None
+        self.bytes = 0
+        self.bytes_saved = 0
+        self._start = time.perf_counter()
+        self._headers_at: Optional[float] = None
+
+    def headers_received(self, status: int) -> None:
+        """Mark the arrival of the response headers; TTFB excludes connection setup."""
+        self._headers_at = time.perf_counter()
+        self.status = status
+        self.ttfb_ms = max(elapsed_ms(self._start) - self.dns_ms - self.connect_ms, 0.0)
+
+    def count(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass body chunks through, counting their bytes and the download time."""
+        for chunk in chunks:
+            self.bytes += len(chunk)
+            yield chunk
+        self.body_received()
+
+    def body_received(self, size: Optional[int] = None) -> None:
+        """Mark the end of the body; size is given when it wasn't read through count()."""
+        if size is not None:
+            self.bytes = size
+        if self._headers_at is not None:
+            self.download_ms = (time.perf_counter() - self._headers_at) * 1000
+
+    def finish(self) -> None:
+        self.total_ms = elapsed_ms(self._start)
+
+    def to_dict(self) -> dict:
+        return {
+            "timestamp": self.timestamp,
+            "url": self.url,
+            "host": urlparse(self.url).netloc,
+            "source": self.source,
+            "name": self.name,
+            "attempt": self.attempt,
+            "status": self.status,
+            "outcome": self.outcome,
+            "error": self.error,
+            "new_connection": self.new_connection,
+            "dns_ms": round(self.dns_ms, 3),
+            "connect_ms": round(self.connect_ms, 3),
+            "ttfb_ms": None if self.ttfb_ms is None else round(self.ttfb_ms, 3),
+            "download_ms": None if self.download_ms is None else round(self.download_ms, 3),
+            "total_ms": None if self.total_ms is None else round(self.total_ms, 3),
+            "bytes": self.bytes,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of values (q between 0 and 1), or None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = min(max(math.ceil(q * len(ordered)), 1), len(ordered))
+    return ordered[rank - 1]
+
+
+class FetchMetrics:
+    """Thread-safe collection of the spans of one fetch run."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._attempts: Dict[str, int] = {}
+        self._last: Dict[str, Span] = {}
+
+    def start(self, url: str, source: str, name: str) -> Span:
+        with self._lock:
+            attempt = self._attempts.get(url, 0) + 1
+            self._attempts[url] = attempt
+            span = Span(url, source, name, attempt)
+            self.spans.append(span)
+            self._last[url] = span
+        return span
+
+    def mark_saved(self, url: str, nbytes: int) -> None:
+        """Credit the latest request for url with bytes it didn't have to write or download."""
+        with self._lock:
+            span = self._last.get(url)
+        if span is None:
+            return
+        span.bytes_saved = nbytes
+        if span.outcome == FETCHED:
+            span.outcome = UNCHANGED
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        Per-source request counts, bytes and latency.
+
+        Returns:
+            source -> {"requests", "retries", "bytes", "bytes_saved", "outcomes",
+            "latency_ms": {"p50", "p95", "p99"}, "slowest": [{"name", "total_ms", "bytes"}]}
+            Latency covers requests that got a response.
+        """
+        with self._lock:
+            spans = list(self.spans)
+
+        summary: Dict[str, dict] = {}
+        for source in dict.fromkeys(span.source for span in spans):
+            source_spans = [span for span in spans if span.source == source]
+            answered = [span for span in source_spans if span.status is not None and span.total_ms is not None]
+            outcomes: Dict[str, int] = {}
+            for span in source_spans:
+                outcomes[span.outcome or ERROR] = outcomes.get(span.outcome or ERROR, 0) + 1
+            latencies = [span.total_ms for span in answered]
+            slowest = sorted(answered, key=lambda span: span.total_ms, reverse=True)[:SLOWEST_PAGES]
+            summary[source] = {
+                "requests": len(source_spans),
+                "retries": sum(1 for span in source_spans if span.attempt > 1),
+                "bytes": sum(span.bytes for span in source_spans),
+                "bytes_saved": sum(span.bytes_saved for span in source_spans),
+                "outcomes": outcomes,
+                "latency_ms": {
+                    f"p{int(q * 100)}": None if not latencies else round(percentile(latencies, q), 1)
+                    for q in QUANTILES
+                },
+                "slowest": [
+                    {"name": span.name, "total_ms": round(span.total_ms, 1), "bytes": span.bytes}
+                    for span in slowest
+                ],
+            }
+        return summary
+
+    def write_trace(self, path: Path) -> None:
+        """Write every span as one JSON object per line."""
+        with self._lock:
+            spans = list(self.spans)
+        write_atomically(path, "".join(json.dumps(span.to_dict()) + "\n" for span in spans))
+
+    def write_prometheus(self, path: Path, run_info: Optional[Dict[str, float]] = None) -> None:
+        """
+        Write the run's metrics in the Prometheus text exposition format.
+
+        Args:
+            run_info: Extra per-run gauges, e.g. {"duration_seconds": 42.0};
+                each is exported as claude_docs_fetch_<name>
+        """
+        with self._lock:
+            spans = list(self.spans)
+        summary = self.summary()
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+
+        def sample(name: str, labels: dict, value: float) -> None:
+            label_text = ",".join(f'{key}="{escape_label(str(val))}"' for key, val in labels.items())
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{METRIC_PREFIX}_{name}{suffix} {value:g}")
+
+        header("requests_total", "counter", "HTTP requests made, by outcome.")
+        for source, data in summary.items():
+            for outcome, count in sorted(data["outcomes"].items()):
+                sample("requests_total", {"source": source, "outcome": outcome}, count)
+
+        for name, key, help_text in (
+            ("retries_total", "retries", "Requests that were retries of an earlier attempt."),
+            ("response_bytes_total", "bytes", "Response body bytes downloaded."),
+            ("bytes_saved_total", "bytes_saved", "Bytes not written or downloaded because the page was unchanged."),
+        ):
+            header(name, "counter", help_text)
+            for source, data in summary.items():
+                sample(name, {"source": source}, data[key])
+
+        header("request_duration_seconds", "summary", "Request latency from sending to the end of the body.")
+        for source in summary:
+            seconds = [span.total_ms / 1000 for span in spans
+                       if span.source == source and span.status is not None and span.total_ms is not None]
+            if seconds:
+                for q in QUANTILES:
+                    sample("request_duration_seconds", {"source": source, "quantile": q}, percentile(seconds, q))
+            sample("request_duration_seconds_sum", {"source": source}, sum(seconds))
+            sample("request_duration_seconds_count", {"source": source}, len(seconds))
+
+        header("phase_seconds_total", "counter", "Time spent in each phase of a request.")
+        for source in summary:
+            source_spans = [span for span in spans if span.source == source]
+            for phase in ("dns", "connect", "ttfb", "download"):
+                total = sum(getattr(span, f"{phase}_ms") or 0.0 for span in source_spans) / 1000
+                sample("phase_seconds_total", {"source": source, "phase": phase}, total)
+
+        for name, value in (run_info or {}).items():
+            header(name, "gauge", f"Fetch run {name.replace('_', ' ')}.")
+            sample(name, {}, value)
+
+        write_atomically(path, "\n".join(lines) + "\n")
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def write_atomically(path: Path, text: str) -> None:
+    """Write beside the target and rename, so collectors never read a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f".{path.name}.tmp")
+    temp_path.write_text(text)
+    os.replace(temp_path, path)
+
+
+_collector = FetchMetrics()
+
+
+def collector() -> FetchMetrics:
+    """The collector requests are currently recorded in."""
+    return _collector
+
+
+def start_run() -> FetchMetrics:
+    """Begin recording a new run in a fresh collector and return it."""
+    global _collector
+    _collector = FetchMetrics()
+    return _collector
+
+
+def current_span() -> Optional[Span]:
+    """The span of the request in progress on this thread, if any."""
+    return getattr(_local, "span", None)
+
+
+@contextmanager
+def span(url: str, source: str, name: str) -> Iterator[Span]:
+    """
+    Record one request. Errors raised inside are noted on the span and re-raised.
+
+    Usage:
+        with fetch_metrics.span(url, "platform", "platform/intro.md") as span:
+            response = session.get(url, stream=True)
+            span.headers_received(response.status_code)
+            ...
+    """
+    current = _collector.start(url, source, name)
+    _local.span = current
+    try:
+        yield current
+    except BaseException as e:
+        current.error = str(e) or type(e).__name__
+        if current.outcome is None:
+            current.outcome = ERROR
+        raise
+    finally:
+        _local.span = None
+        current.finish()
+
+
+def mark_saved(url: str, nbytes: int) -> None:
+    """Credit the latest request for url with bytes saved by an unchanged hash or a 304."""
+    _collector.mark_saved(url, nbytes)
+
+
+_adapter_class = None
+
+
+def instrumented_adapter(**kwargs):
+    """
+    A requests HTTPAdapter whose new connections report DNS and connect time
+    to the span of the request that opened them.
+
+    requests doesn't expose connection timings, so the adapter swaps in
+    urllib3 connection classes that time the name lookup and the TCP (and TLS)
+    handshake themselves. The host is resolved once, and that lookup is the
+    one timed; urllib3 is then given each resolved address to connect to, so
+    it makes no lookup of its own.
+    """
+    global _adapter_class
+    if _adapter_class is None:
+        _adapter_class = build_adapter_class()
+    return _adapter_class(**kwargs)
+
+
+def build_adapter_class():
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+    from urllib3.util.connection import allowed_gai_family
+
+    class TimedConnection:
+        def _new_conn(self):
+            """
+            Resolve the host once, timed, then have urllib3 connect to each
+            resolved address in turn. Its own lookup of a numeric address
+            doesn't go to DNS again.
+            """
+            current = current_span()
+            if current is None:
+                return super()._new_conn()
+
+            start = time.perf_counter()
+            try:
+                addresses = socket.getaddrinfo(self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+            except OSError:
+                addresses = []  # urllib3 resolves again and reports the failure
+            current.dns_ms += elapsed_ms(start)
+            if not addresses:
+                return super()._new_conn()
+
+            dns_host = self._dns_host
+            error = None
+            for *_, sockaddr in addresses:
+                self._dns_host = sockaddr[0]
+                try:
+                    return super()._new_conn()
+                except (ConnectTimeoutError, NewConnectionError) as e:
+                    error = e
+                finally:
+                    self._dns_host = dns_host
+            raise error
+
+        def connect(self):
+            current = current_span()
+            if current is None:
+                return super().connect()
+            start = time.perf_counter()
+            dns_before = current.dns_ms
+            super().connect()
+            current.new_connection = True
+            current.connect_ms += max(elapsed_ms(start) - (current.dns_ms - dns_before), 0.0)
+
+    class TimedHTTPConnection(TimedConnection, HTTPConnection):
+        pass
+
+    class TimedHTTPSConnection(TimedConnection, HTTPSConnection):
+        pass
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    class InstrumentedAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": TimedHTTPConnectionPool,
+                "https": TimedHTTPSConnectionPool,
+            }
+
+    return InstrumentedAdapter
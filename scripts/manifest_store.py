@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Compact SQLite storage for the documentation manifest.
+
+docs/docs_manifest.db holds the same data as docs_manifest.json. The JSON is
+the copy committed to git (a binary database rewritten by every update would
+bloat the history); the database is a local cache built from it, by the fetch
+that writes both or by `manifest_store.py import` after an install or pull.
+Readers look entries up by primary key instead of parsing the whole JSON
+file, and writers only touch the rows that changed. A database older than
+the JSON next to it is stale and ignored until it is rebuilt.
+
+Each file entry is one row. The strings every entry used to repeat are
+interned: source, source name and the scheme://host part of the page URL live
+once in the origins table, the row keeps the URL path, and original_md_url is
+a flag when it is just original_url + ".md". SHA-256 hashes are stored as
+32-byte blobs rather than 64 hex characters. Keys without a column of their
+own (e.g., the changelog's original_raw_url) are kept as JSON in `extra`, so
+every entry round-trips exactly. Top-level keys other than "files" (sources,
+fetch_metadata, ...) are JSON values in the meta table, in their original order.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+MANIFEST_DB = "docs_manifest.db"
+MANIFEST_FILE = "docs_manifest.json"
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS origins (
+    id INTEGER PRIMARY KEY,
+    source TEXT,
+    source_name TEXT,
+    url_prefix TEXT,
+    UNIQUE (source, source_name, url_prefix)
+);
+CREATE TABLE IF NOT EXISTS files (
+    filename TEXT PRIMARY KEY,
+    origin INTEGER NOT NULL REFERENCES origins (id),
+    url_path TEXT,
+    md_url INTEGER NOT NULL DEFAULT 0,
+    hash TEXT,
+    last_updated TEXT,
+    lastmod TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    extra TEXT
+) WITHOUT ROWID;
+"""
+
+# Entry keys stored in a column of their own (string values only)
+COLUMNS = ("hash", "last_updated", "lastmod", "etag", "last_modified")
+HEX_DIGITS = set('0123456789abcdef')
+
+FILE_QUERY = (
+    "SELECT f.filename, o.source, o.source_name, o.url_prefix, f.url_path, f.md_url, "
+    + ", ".join(f"f.{column}" for column in COLUMNS)
+    + ", f.extra FROM files f JOIN origins o ON o.id = f.origin"
+)
+
+Origin = Tuple[Optional[str], Optional[str], Optional[str]]
+Row = tuple  # (url_path, md_url, *COLUMNS, extra), everything but filename and origin
+
+
+def split_url(url: str) -> Tuple[str, str]:
+    """Split a URL into its scheme://host prefix and the rest (e.g., the page path)."""
+    scheme, sep, rest = url.partition('://')
+    if not sep:
+        return '', url
+    slash = rest.find('/')
+    if slash < 0:
+        return url, ''
+    return url[:len(scheme) + 3 + slash], rest[slash:]
+
+
+def pack_hash(value: Optional[str]):
+    """A lowercase SHA-256 hex digest as its 32 raw bytes; anything else unchanged."""
+    if value is not None and len(value) == 64 and set(value) <= HEX_DIGITS:
+        return bytes.fromhex(value)
+    return value
+
+
+def unpack_hash(value) -> Optional[str]:
+    """Inverse of pack_hash."""
+    return value.hex() if isinstance(value, bytes) else value
+
+
+def encode_entry(entry: dict) -> Tuple[Origin, Row]:
+    """Split a manifest entry into its interned origin and the rest of its row."""
+    entry = dict(entry)
+    extra = {}
+
+    def text(key: str) -> Optional[str]:
+        if key not in entry:
+            return None
+        value = entry.pop(key)
+        if isinstance(value, str):
+            return value
+        extra[key] = value  # None, numbers, ...: kept as JSON
+        return None
+
+    source, source_name = text("source"), text("source_name")
+    url = text("original_url")
+    md_url = text("original_md_url")
+    prefix, path = split_url(url) if url is not None else (None, None)
+    md_flag = 0
+    if md_url is not None:
+        if url is not None and md_url == url + '.md':
+            md_flag = 1
+        else:
+            extra["original_md_url"] = md_url
+
+    columns = tuple(pack_hash(text(key)) if key == "hash" else text(key) for key in COLUMNS)
+    extra.update(entry)
+    return (source, source_name, prefix), (path, md_flag) + columns + (json.dumps(extra) if extra else None,)
+
+
+def decode_entry(origin: Origin, row: Row) -> dict:
+    """Rebuild the manifest entry encode_entry split up."""
+    source, source_name, prefix = origin
+    path, md_flag, *columns, extra = row
+    entry = {}
+    if source is not None:
+        entry["source"] = source
+    if source_name is not None:
+        entry["source_name"] = source_name
+    if path is not None:
+        entry["original_url"] = (prefix or '') + path
+        if md_flag:
+            entry["original_md_url"] = entry["original_url"] + '.md'
+    for key, value in zip(COLUMNS, columns):
+        if value is not None:
+            entry[key] = unpack_hash(value) if key == "hash" else value
+    if extra:
+        entry.update(json.loads(extra))
+    return entry
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """Open a manifest database, creating the schema if needed."""
+    conn = sqlite3.connect(str(path))
+    conn.executescript(SCHEMA)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return conn
+
+
+def is_stale(docs_dir: Path) -> bool:
+    """Whether docs_dir's manifest database is missing or older than its JSON (e.g., after a git pull)."""
+    try:
+        db_mtime = (docs_dir / MANIFEST_DB).stat().st_mtime
+    except OSError:
+        return True
+    try:
+        return (docs_dir / MANIFEST_FILE).stat().st_mtime > db_mtime
+    except OSError:
+        return False
+
+
+def open_manifest(docs_dir: Path) -> Optional[sqlite3.Connection]:
+    """Open docs_dir's manifest database for reading, or None if it is missing, stale or unreadable."""
+    path = docs_dir / MANIFEST_DB
+    if is_stale(docs_dir):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            conn.close()
+            return None
+    except sqlite3.Error:
+        return None
+    return conn
+
+
+def iter_entries(conn: sqlite3.Connection, where: str = "", params: tuple = ()) -> Iterator[Tuple[str, dict]]:
+    """Yield (filename, entry) for the rows matching an optional WHERE clause, by filename."""
+    for filename, source, source_name, prefix, *row in conn.execute(f"{FILE_QUERY} {where} ORDER BY f.filename", params):
+        yield filename, decode_entry((source, source_name, prefix), tuple(row))
+
+
+def get_entry(conn: sqlite3.Connection, filename: str) -> Optional[dict]:
+    """The manifest entry of one file, or None if it isn't listed."""
+    return next((entry for _, entry in iter_entries(conn, "WHERE f.filename = ?", (filename,))), None)
+
+
+def source_files(conn: sqlite3.Connection, source: Optional[str] = None) -> List[str]:
+    """Filenames in the manifest, optionally only those of one source."""
+    if source is None:
+        return [filename for filename, in conn.execute("SELECT filename FROM files ORDER BY filename")]
+    return [filename for filename, in conn.execute(
+        "SELECT f.filename FROM files f JOIN origins o ON o.id = f.origin WHERE o.source = ? ORDER BY f.filename",
+        (source,)
+    )]
+
+
+def file_hashes(conn: sqlite3.Connection) -> Dict[str, str]:
+    """{filename: hash} for every markdown file in the manifest."""
+    return {
+        filename: unpack_hash(content_hash) or ""
+        for filename, content_hash in conn.execute("SELECT filename, hash FROM files WHERE filename LIKE '%.md'")
+    }
+
+
+def read_meta(conn: sqlite3.Connection) -> dict:
+    """The manifest's top-level keys other than "files"."""
+    return {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM meta ORDER BY rowid")}
+
+
+def read_manifest(conn: sqlite3.Connection) -> dict:
+    """The whole manifest as the dict docs_manifest.json holds."""
+    manifest = {"files": dict(iter_entries(conn))}
+    manifest.update(read_meta(conn))
+    return manifest
+
+
+def write_manifest(path: Path, manifest: dict, base: Optional[Path] = None) -> int:
+    """
+    Write a manifest database, touching only rows that differ from the current ones.
+
+    Args:
+        path: Database to write; replaced atomically
+        manifest: Manifest dict as docs_manifest.json holds it
+        base: Existing database to start from (e.g., the live one when
+            writing into a staging directory); defaults to path itself
+
+    Returns:
+        Number of file rows added, changed or removed
+    """
+    base = path if base is None else base
+    temp_path = path.with_name(f".{path.name}.tmp")
+    temp_path.unlink(missing_ok=True)
+    if base.exists():
+        shutil.copyfile(base, temp_path)
+
+    try:
+        conn = connect(temp_path)
+    except sqlite3.DatabaseError:
+        temp_path.unlink(missing_ok=True)  # unreadable copy: start over
+        conn = connect(temp_path)
+
+    changes = 0
+    with conn:
+        origins = {
+            (source, source_name, prefix): origin_id
+            for origin_id, source, source_name, prefix in conn.execute(
+                "SELECT id, source, source_name, url_prefix FROM origins"
+            )
+        }
+        current = {
+            filename: (origin_id, tuple(row))
+            for filename, origin_id, *row in conn.execute(
+                f"SELECT filename, origin, url_path, md_url, {', '.join(COLUMNS)}, extra FROM files"
+            )
+        }
+
+        files = manifest.get("files", {})
+        for filename, entry in files.items():
+            origin, row = encode_entry(entry)
+            if origin not in origins:
+                origins[origin] = conn.execute(
+                    "INSERT INTO origins (source, source_name, url_prefix) VALUES (?, ?, ?)", origin
+                ).lastrowid
+            record = (origins[origin], row)
+            if current.get(filename) != record:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO files (filename, origin, url_path, md_url, {', '.join(COLUMNS)}, extra) "
+                    f"VALUES ({', '.join('?' * (len(COLUMNS) + 5))})",
+                    (filename, record[0]) + record[1]
+                )
+                changes += 1
+
+        removed = [(filename,) for filename in current.keys() - files.keys()]
+        conn.executemany("DELETE FROM files WHERE filename = ?", removed)
+        changes += len(removed)
+        conn.execute("DELETE FROM origins WHERE id NOT IN (SELECT DISTINCT origin FROM files)")
+
+        conn.execute("DELETE FROM meta")
+        conn.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in manifest.items() if key != "files"]
+        )
+    conn.close()
+    os.replace(temp_path, path)
+    return changes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert between docs_manifest.db and docs_manifest.json")
+    parser.add_argument(
+        "--docs-dir",
+        type=Path,
+        default=Path(__file__).parent.parent / 'docs',
+        help="Documentation directory (default: docs/ next to this script)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("import", help="Build the database from docs_manifest.json")
+    subparsers.add_parser("export", help="Write docs_manifest.json from the database")
+
+    args = parser.parse_args(argv)
+    db_path = args.docs_dir / MANIFEST_DB
+    json_path = args.docs_dir / MANIFEST_FILE
+
+    if args.command == "import":
+        manifest = json.loads(json_path.read_text())
+        changes = write_manifest(db_path, manifest)
+        print(f"{db_path}: {len(manifest.get('files', {}))} files, {changes} rows written")
+        return 0
+
+    conn = open_manifest(args.docs_dir)
+    if conn is None:
+        print(f"No manifest database at {db_path}", file=sys.stderr)
+        return 1
+    manifest = read_manifest(conn)
+    conn.close()
+    json_path.write_text(json.dumps(manifest, indent=2))
+    print(f"Wrote {json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
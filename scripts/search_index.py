@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+Full-text search over the local documentation mirror.
+
+Builds an on-disk inverted index (SQLite) with one document per markdown
+section, so results point at a heading rather than a whole page, and ranks
+matches with BM25. Only the postings of the query terms are read at query
+time, which keeps searches in the millisecond range regardless of corpus size.
+"""
+
+import argparse
+import json
+import logging
+import math
+import re
+import sqlite3
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from manifest_store import file_hashes, open_manifest
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "_lexical_index.db"
+MANIFEST_FILE = "docs_manifest.json"
+INDEX_VERSION = "1"
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Reciprocal rank fusion constant; 60 is the value from the original paper and
+# damps the influence of the very top ranks of any single retriever.
+RRF_K = 60
+
+# Identifiers such as ANTHROPIC_BEDROCK_BASE_URL, --permission-mode or
+# messages.create are kept whole and also split into their parts.
+TOKEN_RE = re.compile(r'[A-Za-z0-9]+(?:[_\-.][A-Za-z0-9]+)*')
+SPLIT_RE = re.compile(r'[_\-.]')
+CAMEL_RE = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+URL_RE = re.compile(r'https?://([^/\s)"\'>]+)[^\s)"\'>]*')
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+FENCE_RE = re.compile(r'^\s*(```|~~~)')
+MAX_TOKEN_LENGTH = 40  # longer tokens are hashes and base64, not words
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i if in into is it
+its me my not of on or so such that the their then there these this to was
+what when where which who will with you your
+""".split())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, hash TEXT);
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    heading TEXT NOT NULL,
+    anchor TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sections_path ON sections (path);
+CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS postings (
+    term_id INTEGER NOT NULL,
+    section_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term_id, section_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_section ON postings (section_id);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase index terms.
+
+    Compound identifiers produce the whole identifier plus its parts, so both
+    `PreToolUse` and `tool use` find a section mentioning PreToolUse.
+    """
+    text = URL_RE.sub(r' \1 ', text)
+    tokens = []
+    for match in TOKEN_RE.finditer(text):
+        word = match.group()
+        if len(word) > MAX_TOKEN_LENGTH:
+            continue
+        lower = word.lower()
+        if lower not in STOPWORDS:
+            tokens.append(lower)
+
+        parts = [part for piece in SPLIT_RE.split(word) for part in CAMEL_RE.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(part.lower() for part in parts if part.lower() not in STOPWORDS)
+    return tokens
+
+
+def slugify(heading: str) -> str:
+    """Turn a heading into a GitHub-style anchor."""
+    slug = re.sub(r'[^\w\- ]', '', heading.lower()).strip()
+    return re.sub(r'\s+', '-', slug)
+
+
+def split_sections(content: bytes) -> Iterator[Tuple[str, int, int]]:
+    """
+    Split markdown into sections at headings.
+
+    Headings inside fenced code blocks are ignored. Text before the first
+    heading becomes a section with an empty heading.
+
+    Args:
+        content: Raw markdown bytes
+
+    Yields:
+        Tuples of (heading, start byte offset, end byte offset)
+    """
+    heading = ""
+    start = 0
+    offset = 0
+    in_fence = False
+
+    for line in content.splitlines(keepends=True):
+        text = line.decode('utf-8', errors='replace')
+        if FENCE_RE.match(text):
+            in_fence = not in_fence
+        elif not in_fence:
+            match = HEADING_RE.match(text)
+            if match:
+                if offset > start:
+                    yield heading, start, offset
+                heading = match.group(2)
+                start = offset
+        offset += len(line)
+
+    if offset > start:
+        yield heading, start, offset
+
+
+def load_manifest_hashes(docs_dir: Path) -> Dict[str, str]:
+    """Load {filename: hash} for every markdown file listed in the manifest."""
+    conn = open_manifest(docs_dir)
+    if conn is not None:
+        try:
+            return file_hashes(conn)
+        finally:
+            conn.close()
+
+    manifest_path = docs_dir / MANIFEST_FILE
+    if not manifest_path.exists():
+        return {}
+    manifest = json.loads(manifest_path.read_text())
+    return {
+        filename: entry.get("hash", "")
+        for filename, entry in manifest.get("files", {}).items()
+        if filename.endswith('.md')
+    }
+
+
+def diff_hashes(indexed: Dict[str, str], current: Dict[str, str]) -> Tuple[Set[str], Set[str], Set[str]]:
+    """
+    Compare the file hashes an index was built from with the manifest's.
+
+    Args:
+        indexed: {filename: hash} recorded when the index was last updated
+        current: {filename: hash} from the current manifest
+
+    Returns:
+        Tuple of (added, changed, removed) filenames
+    """
+    added = current.keys() - indexed.keys()
+    removed = indexed.keys() - current.keys()
+    changed = {filename for filename in current.keys() & indexed.keys() if current[filename] != indexed[filename]}
+    return set(added), changed, set(removed)
+
+
+def connect(index_path: Path) -> sqlite3.Connection:
+    """Open the index database, creating the schema if needed."""
+    conn = sqlite3.connect(str(index_path))
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def index_file(conn: sqlite3.Connection, docs_dir: Path, filename: str, term_ids: Dict[str, int]) -> int:
+    """
+    Add one markdown file to the index.
+
+    Args:
+        conn: Open index connection
+        docs_dir: Base docs directory
+        filename: Path relative to docs_dir
+        term_ids: Cache of term -> id, updated in place
+
+    Returns:
+        Number of sections indexed
+    """
+    content = (docs_dir / filename).read_bytes()
+    sections = 0
+
+    for heading, start, end in split_sections(content):
+        tokens = tokenize(content[start:end].decode('utf-8', errors='replace'))
+        if not tokens:
+            continue
+
+        cursor = conn.execute(
+            "INSERT INTO sections (path, heading, anchor, start, end, length) VALUES (?, ?, ?, ?, ?, ?)",
+            (filename, heading, slugify(heading), start, end, len(tokens))
+        )
+        section_id = cursor.lastrowid
+
+        postings = []
+        for term, tf in Counter(tokens).items():
+            term_id = term_ids.get(term)
+            if term_id is None:
+                term_id = conn.execute("INSERT INTO terms (term) VALUES (?)", (term,)).lastrowid
+                term_ids[term] = term_id
+            postings.append((term_id, section_id, tf))
+        conn.executemany("INSERT INTO postings (term_id, section_id, tf) VALUES (?, ?, ?)", postings)
+        sections += 1
+
+    return sections
+
+
+def remove_file(conn: sqlite3.Connection, filename: str) -> None:
+    """Remove a file's sections and postings from the index."""
+    section_ids = [(row[0],) for row in conn.execute("SELECT id FROM sections WHERE path = ?", (filename,))]
+    conn.executemany("DELETE FROM postings WHERE section_id = ?", section_ids)
+    conn.execute("DELETE FROM sections WHERE path = ?", (filename,))
+    conn.execute("DELETE FROM files WHERE path = ?", (filename,))
+
+
+def update_stats(conn: sqlite3.Connection) -> None:
+    """Store the corpus statistics BM25 needs."""
+    count, avg_length = conn.execute("SELECT COUNT(*), AVG(length) FROM sections").fetchone()
+    conn.executemany(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+        [("section_count", str(count)), ("avg_length", str(avg_length or 0.0)), ("version", INDEX_VERSION)]
+    )
+
+
+def build_index(docs_dir: Path) -> int:
+    """
+    Build the search index for every file in the manifest from scratch.
+
+    The index is written to a temporary file and renamed into place, so
+    concurrent searches keep using the previous index until it is complete.
+
+    Args:
+        docs_dir: Base docs directory
+
+    Returns:
+        Number of sections indexed
+    """
+    index_path = docs_dir / INDEX_FILE
+    tmp_path = index_path.with_suffix('.db.tmp')
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    hashes = load_manifest_hashes(docs_dir)
+    conn = connect(tmp_path)
+    total = 0
+    try:
+        with conn:
+            term_ids: Dict[str, int] = {}
+            for filename in sorted(hashes):
+                if not (docs_dir / filename).exists():
+                    continue
+                total += index_file(conn, docs_dir, filename, term_ids)
+                conn.execute("INSERT INTO files (path, hash) VALUES (?, ?)", (filename, hashes[filename]))
+            update_stats(conn)
+    finally:
+        conn.close()
+
+    tmp_path.replace(index_path)
+    logger.info(f"Indexed {total} sections from {len(hashes)} files")
+    return total
+
+
+def update_index(docs_dir: Path) -> Tuple[int, int, int]:
+    """
+    Bring an existing index in line with the manifest.
+
+    Only files whose manifest hash differs from the one recorded at index time
+    are re-tokenized, so the cost tracks the size of the change rather than
+    the size of the corpus. All changes are applied in one transaction, so
+    concurrent searches see either the old or the new index.
+
+    Args:
+        docs_dir: Base docs directory
+
+    Returns:
+        Tuple of (added, changed, removed) file counts
+    """
+    hashes = load_manifest_hashes(docs_dir)
+    conn = connect(docs_dir / INDEX_FILE)
+    try:
+        indexed = dict(conn.execute("SELECT path, hash FROM files"))
+        added, changed, removed = diff_hashes(indexed, hashes)
+        if not (added or changed or removed):
+            return 0, 0, 0
+
+        with conn:
+            term_ids = dict(conn.execute("SELECT term, id FROM terms"))
+            for filename in sorted(changed | removed):
+                remove_file(conn, filename)
+            for filename in sorted(added | changed):
+                if not (docs_dir / filename).exists():
+                    continue
+                index_file(conn, docs_dir, filename, term_ids)
+                conn.execute("INSERT INTO files (path, hash) VALUES (?, ?)", (filename, hashes[filename]))
+            update_stats(conn)
+    finally:
+        conn.close()
+
+    logger.info(f"Search index updated: {len(added)} added, {len(changed)} changed, {len(removed)} removed")
+    return len(added), len(changed), len(removed)
+
+
+def index_version(docs_dir: Path) -> Optional[str]:
+    """Return the format version of the on-disk index, or None if there is none."""
+    index_path = docs_dir / INDEX_FILE
+    if not index_path.exists():
+        return None
+    conn = sqlite3.connect(str(index_path))
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else None
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def index_is_current(docs_dir: Path) -> bool:
+    """Check whether the index covers exactly the files and hashes in the manifest."""
+    index_path = docs_dir / INDEX_FILE
+    if not index_path.exists():
+        return False
+    conn = sqlite3.connect(str(index_path))
+    try:
+        indexed = dict(conn.execute("SELECT path, hash FROM files"))
+        version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    except sqlite3.Error:
+        return False
+    finally:
+        conn.close()
+    return version == (INDEX_VERSION,) and indexed == load_manifest_hashes(docs_dir)
+
+
+def ensure_index(docs_dir: Path) -> None:
+    """Build the index if it is missing, otherwise apply the manifest's changes to it."""
+    if index_version(docs_dir) != INDEX_VERSION:
+        build_index(docs_dir)
+    else:
+        update_index(docs_dir)
+
+
+def search(docs_dir: Path, query: str, limit: int = 10) -> List[dict]:
+    """
+    Rank documentation sections against a query with BM25.
+
+    Args:
+        docs_dir: Base docs directory
+        query: Free-text query
+        limit: Maximum number of results
+
+    Returns:
+        List of result dicts (path, topic, heading, anchor, start, end, score),
+        best first
+    """
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return []
+
+    conn = sqlite3.connect(str(docs_dir / INDEX_FILE))
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        section_count = int(meta.get("section_count", 0))
+        avg_length = float(meta.get("avg_length", 0)) or 1.0
+
+        placeholders = ','.join('?' * len(terms))
+        rows = conn.execute(
+            f"SELECT t.term, p.section_id, p.tf, s.length FROM terms t "
+            f"JOIN postings p ON p.term_id = t.id "
+            f"JOIN sections s ON s.id = p.section_id "
+            f"WHERE t.term IN ({placeholders})",
+            terms
+        ).fetchall()
+
+        doc_freq = Counter(term for term, _, _, _ in rows)
+        scores: Dict[int, float] = {}
+        for term, section_id, tf, length in rows:
+            df = doc_freq[term]
+            idf = math.log(1 + (section_count - df + 0.5) / (df + 0.5))
+            norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+            scores[section_id] = scores.get(section_id, 0.0) + idf * norm
+
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        results = []
+        for section_id, score in best:
+            path, heading, anchor, start, end = conn.execute(
+                "SELECT path, heading, anchor, start, end FROM sections WHERE id = ?", (section_id,)
+            ).fetchone()
+            results.append({
+                "path": path,
+                "topic": path[:-3] if path.endswith('.md') else path,
+                "heading": heading,
+                "anchor": anchor,
+                "start": start,
+                "end": end,
+                "score": round(score, 4),
+            })
+        return results
+    finally:
+        conn.close()
+
+
+def locate_sections(docs_dir: Path, locations: Sequence[Tuple[str, str, int]]) -> List[Optional[dict]]:
+    """
+    Find the indexed sections that contain the given byte offsets.
+
+    Used to map hits from another retriever (e.g. embedding chunks) onto the
+    sections this index ranks, so the two result lists can be fused.
+
+    Args:
+        docs_dir: Base docs directory
+        locations: (path, content hash, byte offset) triples
+
+    Returns:
+        One result dict (path, topic, heading, anchor, start, end) per location,
+        or None where the file is not indexed at that hash
+    """
+    conn = sqlite3.connect(str(docs_dir / INDEX_FILE))
+    try:
+        sections = []
+        for path, file_hash, offset in locations:
+            row = conn.execute(
+                "SELECT s.heading, s.anchor, s.start, s.end FROM sections s "
+                "JOIN files f ON f.path = s.path "
+                "WHERE s.path = ? AND f.hash = ? AND s.start <= ? "
+                "ORDER BY s.start DESC LIMIT 1",
+                (path, file_hash, offset)
+            ).fetchone()
+            if row is None:
+                sections.append(None)
+                continue
+            heading, anchor, start, end = row
+            sections.append({
+                "path": path,
+                "topic": path[:-3] if path.endswith('.md') else path,
+                "heading": heading,
+                "anchor": anchor,
+                "start": start,
+                "end": end,
+            })
+        return sections
+    finally:
+        conn.close()
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[Hashable]], k: int = RRF_K) -> List[Tuple[Hashable, float]]:
+    """
+    Fuse several rankings into one with reciprocal rank fusion.
+
+    Each key scores the sum of 1 / (k + rank) over the rankings it appears in,
+    so only ranks matter and retrievers with incomparable scores (BM25,
+    cosine similarity) can be combined without calibration.
+
+    Args:
+        rankings: Lists of distinct keys, best first
+        k: Rank damping constant
+
+    Returns:
+        (key, fused score) pairs, best first; ties keep first-seen order
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+def read_section(docs_dir: Path, result: dict) -> str:
+    """Read the text of a search result's section from the markdown file."""
+    with open(docs_dir / result["path"], 'rb') as f:
+        f.seek(result["start"])
+        return f.read(result["end"] - result["start"]).decode('utf-8', errors='replace')
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Full-text search over the documentation mirror")
+    parser.add_argument(
+        "--docs-dir",
+        type=Path,
+        default=Path(__file__).parent.parent / 'docs',
+        help="Documentation directory (default: docs/ next to this script)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("build", help="Rebuild the search index from scratch")
+    subparsers.add_parser("update", help="Re-index only files that changed since the last update")
+
+    search_parser = subparsers.add_parser("search", help="Search the documentation")
+    search_parser.add_argument("query", nargs='+', help="Search terms")
+    search_parser.add_argument("--limit", type=int, default=10, help="Maximum number of results")
+    search_parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    search_parser.add_argument(
+        "--no-build", action="store_true",
+        help="Search the index as it is instead of building or updating it first; exit 2 if there is none"
+    )
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+
+    if args.command == "build":
+        build_index(args.docs_dir)
+        return 0
+    if args.command == "update":
+        ensure_index(args.docs_dir)
+        return 0
+
+    if not args.no_build:
+        ensure_index(args.docs_dir)
+    elif index_version(args.docs_dir) != INDEX_VERSION:
+        print(f"No search index in {args.docs_dir}; run `search_index.py update` to build it", file=sys.stderr)
+        return 2
+    results = search(args.docs_dir, ' '.join(args.query), args.limit)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            heading = f" — {result['heading']}" if result['heading'] else ""
+            print(f"{result['topic']}{heading}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
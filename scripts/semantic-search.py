@@ -1,37 +1,520 @@
 # scripts/semantic-search.py
-from sentence_transformers import SentenceTransformer
-import numpy as np
+import argparse
 import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
 from pathlib import Path
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+from search_index import (
+    INDEX_FILE as LEXICAL_INDEX_FILE,
+    diff_hashes,
+    ensure_index as ensure_lexical_index,
+    load_manifest_hashes,
+    locate_sections,
+    reciprocal_rank_fusion,
+    search as lexical_search,
+    split_sections,
+)
 
-def build_index():
-    """Build embeddings for all documentation."""
-    docs = []
-    for md_file in Path("docs").rglob("*.md"):
-        with open(md_file) as f:
-            content = f.read()
-        docs.append({
-            "path": str(md_file),
-            "content": content,
-            "embedding": model.encode(content).tolist()
-        })
+MODEL_NAME = 'all-MiniLM-L6-v2'
+_model = None
 
-    with open("docs/_search_index.json", "w") as f:
-        json.dump(docs, f)
+DOCS_DIR = Path(__file__).resolve().parent.parent / "docs"
+# Embeddings live in a contiguous matrix that search() memory-maps; the small
+# metadata file maps each row back to a file, heading and byte range. Chunk
+# text is never stored, it is read from the markdown on demand.
+EMBEDDINGS_PATH = DOCS_DIR / "_embeddings.npy"
+METADATA_PATH = DOCS_DIR / "_embeddings_meta.json"
+LEGACY_INDEX_PATH = DOCS_DIR / "_search_index.json"
+# numpy and the model are imported on first use, so a search answered by the
+# daemon never pays for them.
+EMBEDDING_DTYPE = "float16"
+
+# all-MiniLM-L6-v2 reads at most 256 word pieces, roughly 1 KB of English text,
+# so longer sections are split into several chunks instead of being truncated.
+CHUNK_BYTES = 1200
+BATCH_SIZE = 64
+# Below this many chunks a process pool costs more than it saves
+MULTI_PROCESS_MIN_CHUNKS = 256
+# Rows of the embedding matrix upcast to float32 at a time while scoring
+SCORE_BLOCK_ROWS = 8192
+# Hybrid search fuses this many candidates from each retriever
+HYBRID_CANDIDATES = 50
+
+# Query daemon: keeps the model and index loaded between searches
+SOCKET_PATH = Path(os.environ.get('CLAUDE_DOCS_SEARCH_SOCKET', DOCS_DIR / "_search.sock"))
+DAEMON_IDLE_TIMEOUT = 30 * 60  # seconds without requests before the daemon exits
+CLIENT_TIMEOUT = 10  # seconds to wait for a daemon answer before searching in-process
+
+def get_model():
+    """Load the sentence-transformers model on first use.
+
+    Loading takes seconds, so nothing that only reads the index or talks to
+    the daemon pays for it.
+    """
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+        _model = SentenceTransformer(MODEL_NAME)
+    return _model
+
+def chunk_markdown(content):
+    """Split markdown bytes into (heading, start, end) chunks.
+
+    Chunks never cross a heading. Sections longer than CHUNK_BYTES are cut at
+    the last blank line that fits, or at a line boundary if there is none.
+    """
+    for heading, start, end in split_sections(content):
+        chunk_start = start
+        last_blank = None
+        offset = start
+        for line in content[start:end].splitlines(keepends=True):
+            if offset - chunk_start >= CHUNK_BYTES and offset > chunk_start:
+                cut = last_blank if last_blank and last_blank > chunk_start else offset
+                yield heading, chunk_start, cut
+                chunk_start = cut
+                last_blank = None
+            offset += len(line)
+            if not line.strip():
+                last_blank = offset
+        if end > chunk_start:
+            yield heading, chunk_start, end
+
+def encode_chunks(texts, batch_size=BATCH_SIZE, workers=None):
+    """Embed texts in batches, spreading them over CPU processes when worthwhile."""
+    model = get_model()
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(texts) >= MULTI_PROCESS_MIN_CHUNKS:
+        pool = model.start_multi_process_pool(target_devices=['cpu'] * workers)
+        try:
+            return model.encode_multi_process(texts, pool, batch_size=batch_size)
+        finally:
+            model.stop_multi_process_pool(pool)
+    return model.encode(texts, batch_size=batch_size)
+
+def normalize(vectors):
+    """Scale rows to unit length so a dot product is a cosine similarity."""
+    import numpy as np
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+_loaded_index = {}
+
+def load_index():
+    """Open the embedding matrix (memory-mapped) and its metadata.
+
+    The result is reused by later calls in the same process until either file
+    is replaced on disk.
+
+    Returns:
+        Tuple of (embeddings, metadata dict)
+    """
+    import numpy as np
+
+    key = (os.stat(EMBEDDINGS_PATH).st_mtime_ns, os.stat(METADATA_PATH).st_mtime_ns)
+    if _loaded_index.get("key") == key:
+        return _loaded_index["value"]
+
+    with open(METADATA_PATH) as f:
+        metadata = json.load(f)
+    embeddings = np.load(EMBEDDINGS_PATH, mmap_mode='r')
+    if embeddings.shape[0] != len(metadata["chunks"]):
+        raise ValueError("Embedding matrix and metadata are out of sync; rebuild the index")
+
+    _loaded_index.update(key=key, value=(embeddings, metadata))
+    return embeddings, metadata
+
+def chunk_info(metadata, row):
+    """Expand a compact metadata row into a dict with file, hash, heading, start and end."""
+    file_index, heading, start, end = metadata["chunks"][row]
+    filename, file_hash = metadata["files"][file_index]
+    return {"file": filename, "hash": file_hash, "heading": heading, "start": start, "end": end}
+
+def read_chunk(chunk):
+    """Read a chunk's text from its markdown file using the stored byte range."""
+    with open(DOCS_DIR / chunk["file"], 'rb') as f:
+        f.seek(chunk["start"])
+        return f.read(chunk["end"] - chunk["start"]).decode('utf-8', errors='replace')
+
+def build_index(batch_size=BATCH_SIZE, workers=None):
+    """Build embeddings for all documentation.
+
+    Each file is split into heading-aware chunks and all new chunks are
+    embedded in batches. Only files whose manifest hash changed since the
+    last build are re-embedded; everything else keeps its stored rows.
+
+    Args:
+        batch_size: Number of chunks per encode batch
+        workers: Number of encoder processes (default: CPU count)
+    """
+    import numpy as np
+
+    hashes = load_manifest_hashes(DOCS_DIR)
+
+    previous = {}
+    old_embeddings = None
+    if METADATA_PATH.exists() and EMBEDDINGS_PATH.exists():
+        try:
+            old_embeddings, old_metadata = load_index()
+            if old_metadata.get("model") == MODEL_NAME:
+                for row in range(len(old_metadata["chunks"])):
+                    chunk = chunk_info(old_metadata, row)
+                    previous.setdefault(chunk["file"], []).append((row, chunk))
+        except (ValueError, KeyError, OSError) as e:
+            print(f"Ignoring unreadable index: {e}")
+
+    added, changed, removed = diff_hashes(
+        {name: chunks[0][1]["hash"] for name, chunks in previous.items()}, hashes
+    )
+
+    chunks = []
+    rows = []  # row in old_embeddings, or None for chunks that need encoding
+    pending = []
+    for filename in sorted(hashes):
+        md_file = DOCS_DIR / filename
+        if not md_file.exists():
+            continue
+        if filename in previous and filename not in changed:
+            for row, chunk in previous[filename]:
+                chunks.append(chunk)
+                rows.append(row)
+            continue
+
+        content = md_file.read_bytes()
+        for heading, start, end in chunk_markdown(content):
+            text = content[start:end].decode('utf-8', errors='replace')
+            if not text.strip():
+                continue
+            chunks.append({
+                "file": filename,
+                "hash": hashes[filename],
+                "heading": heading,
+                "start": start,
+                "end": end,
+            })
+            rows.append(None)
+            # Prefix the heading so short chunks keep the context of their section
+            pending.append(f"{heading}\n{text}")
+
+    print(f"Embedding {len(pending)} chunks from {len(added)} added and {len(changed)} changed files, "
+          f"dropping {len(removed)} files")
+    new_embeddings = normalize(encode_chunks(pending, batch_size, workers)) if pending else None
+    dimension = get_model().get_sentence_embedding_dimension()
+
+    matrix = np.empty((len(chunks), dimension), dtype=EMBEDDING_DTYPE)
+    new_row = 0
+    for i, row in enumerate(rows):
+        if row is None:
+            matrix[i] = new_embeddings[new_row]
+            new_row += 1
+        else:
+            matrix[i] = old_embeddings[row]
+
+    files = sorted({(chunk["file"], chunk["hash"]) for chunk in chunks})
+    file_index = {filename: i for i, (filename, _) in enumerate(files)}
+    metadata = {
+        "model": MODEL_NAME,
+        "dimension": dimension,
+        "dtype": EMBEDDING_DTYPE,
+        "files": files,
+        "chunks": [[file_index[c["file"]], c["heading"], c["start"], c["end"]] for c in chunks],
+    }
+
+    # Write both files beside the originals and swap them in, matrix first;
+    # load_index() rejects a matrix whose row count doesn't match the metadata.
+    tmp_embeddings = EMBEDDINGS_PATH.with_suffix('.tmp.npy')
+    tmp_metadata = METADATA_PATH.with_suffix('.tmp.json')
+    np.save(tmp_embeddings, matrix)
+    with open(tmp_metadata, "w") as f:
+        json.dump(metadata, f, separators=(',', ':'))
+    del old_embeddings
+    os.replace(tmp_embeddings, EMBEDDINGS_PATH)
+    os.replace(tmp_metadata, METADATA_PATH)
+
+    if LEGACY_INDEX_PATH.exists():
+        LEGACY_INDEX_PATH.unlink()
+
+def top_k_indices(scores, k):
+    """Indices of the k largest scores, best first, without sorting everything."""
+    import numpy as np
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+def score_matrix(embeddings, query_embeddings):
+    """Cosine scores of every chunk against every query, shape (chunks, queries).
+
+    The float16 matrix is upcast block by block so scoring never holds a
+    float32 copy of the whole index in memory.
+    """
+    import numpy as np
+
+    scores = np.empty((embeddings.shape[0], query_embeddings.shape[0]), dtype=np.float32)
+    for start in range(0, embeddings.shape[0], SCORE_BLOCK_ROWS):
+        block = np.asarray(embeddings[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+        scores[start:start + SCORE_BLOCK_ROWS] = block @ query_embeddings.T
+    return scores
+
+def semantic_candidates(queries, top_k):
+    """Embed all queries in one batch and score them with a single pass over the matrix.
+
+    Returns:
+        One list of (score, chunk dict) pairs per query, best first
+    """
+    embeddings, metadata = load_index()
+    query_embeddings = normalize(get_model().encode(list(queries), batch_size=BATCH_SIZE))
+    scores = score_matrix(embeddings, query_embeddings)
+
+    results = []
+    for column in range(scores.shape[1]):
+        query_scores = scores[:, column]
+        results.append([(float(query_scores[i]), chunk_info(metadata, i))
+                        for i in top_k_indices(query_scores, top_k)])
+    return results
+
+def search_batch(queries, top_k=5):
+    """Search documentation semantically for many queries at once.
+
+    Returns:
+        One list of (score, path, heading) tuples per query, best first
+    """
+    return [[(score, str(DOCS_DIR / chunk["file"]), chunk["heading"]) for score, chunk in hits]
+            for hits in semantic_candidates(queries, top_k)]
 
 def search(query, top_k=5):
-    """Search documentation semantically."""
-    with open("docs/_search_index.json") as f:
-        docs = json.load(f)
+    """Search documentation semantically.
+
+    Returns (score, path, heading) tuples for the best matching sections.
+    """
+    return search_batch([query], top_k)[0]
+
+def hybrid_search_batch(queries, top_k=5, candidates=HYBRID_CANDIDATES):
+    """Search with BM25 and embeddings together, fused by reciprocal rank.
+
+    BM25 reads only the postings of the query terms and shortlists its best
+    `candidates` sections. The embeddings then rerank only that shortlist:
+    each section scores the best cosine of the chunks inside it, and a chunk
+    counts only where locate_sections places it at the hash the lexical index
+    holds, so both rankings use the same section keys and chunks embedded
+    from another version of a page are left out. Queries BM25 finds nothing
+    for, or an install without the lexical index, get the embedding ranking
+    of the whole matrix; without embeddings, the BM25 ranking is returned.
+
+    Returns:
+        One list of (score, path, heading) tuples per query, best first
+    """
+    queries = list(queries)
+    has_embeddings = EMBEDDINGS_PATH.exists()
+    if not (DOCS_DIR / LEXICAL_INDEX_FILE).exists():
+        return search_batch(queries, top_k) if has_embeddings else [[] for _ in queries]
+
+    shortlists = [lexical_search(DOCS_DIR, query, candidates) for query in queries]
+    results = [None] * len(queries)
+    if has_embeddings:
+        embeddings, metadata = load_index()
+        query_embeddings = normalize(get_model().encode(queries, batch_size=BATCH_SIZE))
+        file_index = {filename: i for i, (filename, _) in enumerate(metadata["files"])}
+        rows_by_file = {}
+        for row, chunk in enumerate(metadata["chunks"]):
+            rows_by_file.setdefault(chunk[0], []).append(row)
+
+        unmatched = [i for i, hits in enumerate(shortlists) if not hits]
+        if unmatched:
+            for i, hits in zip(unmatched, search_batch([queries[i] for i in unmatched], top_k)):
+                results[i] = hits
+
+    for i, hits in enumerate(shortlists):
+        if results[i] is not None:
+            continue
+        sections = {(hit["path"], hit["start"]): hit for hit in hits}
+        semantic_ranking = []
+        if has_embeddings:
+            rows = [row for path in sorted({hit["path"] for hit in hits})
+                    for row in rows_by_file.get(file_index.get(path), [])]
+            chunks = [chunk_info(metadata, row) for row in rows]
+            located = locate_sections(DOCS_DIR, [(c["file"], c["hash"], c["start"]) for c in chunks])
+            best = {}
+            if rows:
+                scores = score_matrix(embeddings[rows], query_embeddings[i:i + 1])[:, 0]
+                for score, section in zip(scores, located):
+                    if section is None:
+                        continue
+                    key = (section["path"], section["start"])
+                    if key in sections and score > best.get(key, float('-inf')):
+                        best[key] = float(score)
+            semantic_ranking = sorted(best, key=lambda key: -best[key])
+
+        fused = reciprocal_rank_fusion([list(sections), semantic_ranking])[:top_k]
+        results[i] = [(score, str(DOCS_DIR / sections[key]["path"]), sections[key]["heading"])
+                      for key, score in fused]
+    return results
+
+SEARCH_FUNCTIONS = {"hybrid": hybrid_search_batch, "semantic": search_batch}
+
+class SearchRequestHandler(socketserver.StreamRequestHandler):
+    """Answers one JSON request per line: {"queries": [...], "top_k": 5, "mode": "hybrid"}."""
+
+    def handle(self):
+        for line in self.rfile:
+            self.server.last_request = time.monotonic()
+            try:
+                request = json.loads(line)
+                search_fn = SEARCH_FUNCTIONS[request.get("mode", "semantic")]
+                results = search_fn(request["queries"], int(request.get("top_k", 5)))
+                response = {"results": results}
+            except Exception as e:
+                response = {"error": str(e)}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+class SearchServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(socket_path=SOCKET_PATH, idle_timeout=DAEMON_IDLE_TIMEOUT):
+    """Run the query daemon on a Unix socket until it has been idle for idle_timeout seconds.
+
+    The model and index are loaded before the socket is opened, so the first
+    client never waits for them. A rebuilt index is picked up automatically.
+    """
+    socket_path = Path(socket_path)
+    get_model()
+    load_index()
+
+    if socket_path.exists():
+        if query_daemon(["ping"], 1, socket_path, timeout=1) is not None:
+            print(f"A search daemon is already listening on {socket_path}")
+            return
+        socket_path.unlink()
+
+    # Create the socket owner-only from the start; a chmod after bind() would
+    # leave a window in which other local users could connect
+    umask = os.umask(0o177)
+    try:
+        server = SearchServer(str(socket_path), SearchRequestHandler)
+    finally:
+        os.umask(umask)
+
+    with server:
+        server.last_request = time.monotonic()
+
+        def shutdown_when_idle():
+            while True:
+                remaining = idle_timeout - (time.monotonic() - server.last_request)
+                if remaining <= 0:
+                    break
+                time.sleep(remaining)
+            server.shutdown()
+
+        threading.Thread(target=shutdown_when_idle, daemon=True).start()
+        print(f"Search daemon listening on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            socket_path.unlink(missing_ok=True)
+
+def query_daemon(queries, top_k=5, socket_path=SOCKET_PATH, timeout=CLIENT_TIMEOUT, mode="semantic"):
+    """Send queries to a running daemon.
+
+    Returns:
+        Per-query result lists, or None if no daemon answered
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(socket_path))
+            request = {"queries": list(queries), "top_k": top_k, "mode": mode}
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            with sock.makefile('rb') as reader:
+                response = json.loads(reader.readline())
+    except (OSError, ValueError):
+        return None
+    if "results" not in response:
+        return None
+    return [[tuple(hit) for hit in hits] for hits in response["results"]]
+
+def start_daemon():
+    """Start the query daemon in the background, detached from the caller."""
+    import subprocess
+    subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "serve"],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+def search_via_daemon(queries, top_k=5, mode="semantic", spawn=False):
+    """Search through the daemon if one is running, otherwise in-process.
+
+    With spawn, a daemon is started after an in-process search so the next
+    one doesn't load the model again.
+    """
+    results = query_daemon(queries, top_k, SOCKET_PATH, mode=mode)
+    if results is None:
+        results = SEARCH_FUNCTIONS[mode](queries, top_k)
+        if spawn:
+            start_daemon()
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Semantic search over the documentation mirror")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build or update the embedding index")
+    build_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                              help=f"Chunks per encode batch (default: {BATCH_SIZE})")
+    build_parser.add_argument("--workers", type=int, default=None,
+                              help="Encoder processes (default: CPU count)")
+
+    serve_parser = subparsers.add_parser("serve", help="Run the query daemon")
+    serve_parser.add_argument("--idle-timeout", type=float, default=DAEMON_IDLE_TIMEOUT,
+                              help=f"Exit after this many idle seconds (default: {DAEMON_IDLE_TIMEOUT})")
+
+    search_parser = subparsers.add_parser("search", help="Search the documentation")
+    search_parser.add_argument("query", nargs='+', help="Search terms")
+    search_parser.add_argument("--top-k", type=int, default=5, help="Number of results")
+    search_parser.add_argument("--mode", choices=sorted(SEARCH_FUNCTIONS), default="hybrid",
+                               help="hybrid fuses full-text and embedding rankings (default: hybrid)")
+    search_parser.add_argument("--no-build", action="store_true",
+                               help="Use the full-text index as it is instead of building or updating it first")
+    search_parser.add_argument("--start-daemon", action="store_true",
+                               help="Start the daemon in the background if none answered")
+    search_parser.add_argument("--topics", action="store_true",
+                               help='Print "topic — heading" lines without scores, like search_index.py')
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build_index(args.batch_size, args.workers)
+        return 0
+
+    if args.command == "serve":
+        if not EMBEDDINGS_PATH.exists():
+            print("No embedding index found; run: semantic-search.py build", file=sys.stderr)
+            return 1
+        serve(idle_timeout=args.idle_timeout)
+        return 0
 
-    query_embedding = model.encode(query)
+    if args.mode == "hybrid" and not args.no_build:
+        ensure_lexical_index(DOCS_DIR)
+    if not EMBEDDINGS_PATH.exists():
+        if args.mode == "semantic":
+            print("No embedding index found; run: semantic-search.py build", file=sys.stderr)
+            return 1
+        print("No embedding index found; showing full-text results only", file=sys.stderr)
 
-    scores = []
-    for doc in docs:
-        score = np.dot(query_embedding, doc["embedding"])
-        scores.append((score, doc["path"]))
+    results = search_via_daemon([' '.join(args.query)], args.top_k, args.mode, args.start_daemon)[0]
+    for score, path, heading in results:
+        heading = f" — {heading}" if heading else ""
+        if args.topics:
+            print(f"{Path(path).relative_to(DOCS_DIR).with_suffix('').as_posix()}{heading}")
+        else:
+            print(f"{score:.3f}  {path}{heading}")
+    return 0
 
-    scores.sort(reverse=True)
-    return scores[:top_k]
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
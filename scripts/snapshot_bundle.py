@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Compressed snapshots of docs/ and binary deltas between them.
+
+Installing or updating through git walks a history of 3-hourly commits that
+rewrite multi-megabyte files. A snapshot is instead one xz-compressed tarball
+of the current pages, the manifest, the topic table, the changelog index and
+the search index (about 4 MB for 25 MB of pages), and a delta carries only what changed since
+the previous snapshot, usually a few kilobytes.
+
+Snapshots are identified by the pages' hashes from the manifest and the hashes
+of the topic table and changelog index (see docs_hashes), so a local copy
+knows which snapshot it is at without reading any page, and a change to the
+topics or changelog index alone is a new snapshot. The manifest's own bytes
+are left out: every fetch rewrites its timestamps and run statistics, which
+would otherwise make each run a new snapshot. A published
+directory looks like:
+
+    snapshots.json                  index: the latest snapshot and the deltas
+    snapshot-<id>.tar.xz            the latest full snapshot
+    delta-<from>-<to>.tar.xz        one per consecutive pair, the newest DELTA_KEEP
+
+Inside a delta, each added or changed file is a patch against the file it
+replaces: the new content split into the same content-defined blocks the
+block store uses, each block either copied from the old file by its hash or
+included literally. Deltas are applied through StagedUpdate, so an update
+that dies part-way leaves docs/ at the old snapshot, and every file is checked
+against its SHA-256 before anything is committed. The search index is not in
+deltas; the applier updates it incrementally from the new manifest.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import logging
+import os
+import struct
+import sys
+import tarfile
+import tempfile
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional
+
+from block_store import split_blocks
+from changelog_index import INDEX_FILE as CHANGELOG_INDEX
+from manifest_store import MANIFEST_DB, MANIFEST_FILE, write_manifest
+from search_index import INDEX_FILE, ensure_index, index_is_current, load_manifest_hashes
+from staged_update import StagedUpdate
+from topic_index import TOPICS_FILE
+
+logger = logging.getLogger(__name__)
+
+INDEX_JSON = "snapshots.json"
+SNAPSHOT_INFO = "snapshot.json"
+DELTA_INFO = "delta.json"
+FORMAT_VERSION = 1
+DELTA_KEEP = 56  # one week of 3-hourly updates
+COMPRESSION = "xz"  # stdlib; zstd isn't available before Python 3.14
+
+# Files shipped beside the pages; the index only in full snapshots
+META_FILES = (MANIFEST_FILE, TOPICS_FILE, CHANGELOG_INDEX)
+# Metadata files whose content is part of the snapshot id
+ID_FILES = (TOPICS_FILE, CHANGELOG_INDEX)
+
+# Patch records: copy a block of the old file, or literal bytes
+COPY = b'C'
+LITERAL = b'L'
+DIGEST_SIZE = 32
+
+
+def snapshot_id(hashes: Dict[str, str]) -> str:
+    """Short identifier of the docs described by a manifest's {filename: hash}."""
+    digest = hashlib.sha256()
+    for filename in sorted(hashes):
+        digest.update(f"{filename}\t{hashes[filename]}\n".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def docs_hashes(docs_dir: Path) -> Dict[str, str]:
+    """{filename: hash} of the pages the manifest lists and of the ID_FILES present, for snapshot_id."""
+    hashes = load_manifest_hashes(docs_dir)
+    for name in ID_FILES:
+        if (docs_dir / name).exists():
+            hashes[name] = sha256((docs_dir / name).read_bytes())
+    return hashes
+
+
+def check_name(name: str) -> str:
+    """Reject archive member names that would land outside docs/."""
+    path = PurePosixPath(name)
+    if path.is_absolute() or '..' in path.parts or not path.parts:
+        raise ValueError(f"Unsafe path in bundle: {name}")
+    return name
+
+
+def encode_patch(old: bytes, new: bytes) -> bytes:
+    """Encode new as blocks copied from old and literal bytes."""
+    old_blocks = {hashlib.sha256(block).digest() for block in split_blocks(old)}
+    out = bytearray()
+    literal = bytearray()
+    for block in split_blocks(new):
+        digest = hashlib.sha256(block).digest()
+        if digest in old_blocks:
+            if literal:
+                out += LITERAL + struct.pack('>I', len(literal)) + literal
+                literal.clear()
+            out += COPY + digest
+        else:
+            literal += block
+    if literal:
+        out += LITERAL + struct.pack('>I', len(literal)) + literal
+    return bytes(out)
+
+
+def apply_patch(old: bytes, patch: bytes) -> bytes:
+    """Rebuild the new content from the old one and a patch made by encode_patch."""
+    old_blocks = {hashlib.sha256(block).digest(): block for block in split_blocks(old)}
+    parts = []
+    offset = 0
+    while offset < len(patch):
+        kind = patch[offset:offset + 1]
+        if kind == COPY:
+            digest = patch[offset + 1:offset + 1 + DIGEST_SIZE]
+            if digest not in old_blocks:
+                raise ValueError("Patch copies a block the old file doesn't have")
+            parts.append(old_blocks[digest])
+            offset += 1 + DIGEST_SIZE
+        elif kind == LITERAL:
+            size, = struct.unpack('>I', patch[offset + 1:offset + 5])
+            parts.append(patch[offset + 5:offset + 5 + size])
+            offset += 5 + size
+        else:
+            raise ValueError(f"Corrupt patch record at byte {offset}")
+    return b''.join(parts)
+
+
+def add_member(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = 0  # identical content gives identical bundles
+    tar.addfile(info, io.BytesIO(data))
+
+
+def write_archive(path: Path, info_name: str, info: dict, members: Iterable) -> None:
+    """Write an xz tarball atomically: the info JSON first, then (name, bytes) members."""
+    temp_path = path.with_name(f".{path.name}.tmp")
+    with tarfile.open(temp_path, f"w:{COMPRESSION}") as tar:
+        add_member(tar, info_name, json.dumps(info, indent=2).encode('utf-8'))
+        for name, data in members:
+            add_member(tar, name, data)
+    os.replace(temp_path, path)
+
+
+def read_archive(path: Path, info_name: str) -> tuple:
+    """Read a tarball written by write_archive. Returns (info, {name: bytes})."""
+    members = {}
+    with tarfile.open(path, f"r:{COMPRESSION}") as tar:
+        for member in tar:
+            if member.isfile():
+                members[check_name(member.name)] = tar.extractfile(member).read()
+    if info_name not in members:
+        raise ValueError(f"{path.name} has no {info_name}")
+    return json.loads(members.pop(info_name)), members
+
+
+def snapshot_files(docs_dir: Path, hashes: Dict[str, str]) -> List[str]:
+    """Files a snapshot of docs_dir holds: the listed pages, then the metadata and a current index."""
+    files = sorted(filename for filename in hashes if (docs_dir / filename).exists())
+    files += [name for name in META_FILES if (docs_dir / name).exists()]
+    if index_is_current(docs_dir):
+        files.append(INDEX_FILE)
+    return files
+
+
+def write_snapshot(docs_dir: Path, path: Path) -> dict:
+    """Bundle docs_dir into a full snapshot. Returns the snapshot's info."""
+    hashes = load_manifest_hashes(docs_dir)
+    contents = {filename: (docs_dir / filename).read_bytes() for filename in snapshot_files(docs_dir, hashes)}
+    info = {
+        "format": FORMAT_VERSION,
+        "id": snapshot_id(docs_hashes(docs_dir)),
+        "created": datetime.now().isoformat(),
+        "files": {filename: sha256(data) for filename, data in contents.items()},
+    }
+    write_archive(path, SNAPSHOT_INFO, info, contents.items())
+    return info
+
+
+def write_delta(old_snapshot: Path, new_snapshot: Path, path: Path) -> dict:
+    """Write the delta that turns the docs of old_snapshot into those of new_snapshot."""
+    old_info, old_files = read_archive(old_snapshot, SNAPSHOT_INFO)
+    new_info, new_files = read_archive(new_snapshot, SNAPSHOT_INFO)
+    old_files.pop(INDEX_FILE, None)
+    new_files.pop(INDEX_FILE, None)
+
+    patches = {}
+    for filename, data in new_files.items():
+        old = old_files.get(filename, b'')
+        if old != data:
+            patches[filename] = encode_patch(old, data)
+
+    info = {
+        "format": FORMAT_VERSION,
+        "from": old_info["id"],
+        "to": new_info["id"],
+        "created": new_info["created"],
+        "files": {filename: new_info["files"][filename] for filename in patches},
+        "remove": sorted(old_files.keys() - new_files.keys()),
+    }
+    write_archive(path, DELTA_INFO, info, ((f"patches/{name}", patch) for name, patch in patches.items()))
+    return info
+
+
+def load_index(out_dir: Path) -> dict:
+    try:
+        return json.loads((out_dir / INDEX_JSON).read_text())
+    except (OSError, ValueError):
+        return {"format": FORMAT_VERSION, "latest": None, "snapshot": None, "deltas": []}
+
+
+def publish(docs_dir: Path, out_dir: Path, keep: int = DELTA_KEEP) -> Optional[str]:
+    """
+    Write a snapshot of docs_dir and the delta from the previous one into out_dir.
+
+    Only the latest full snapshot is kept, plus the newest `keep` deltas.
+
+    Returns:
+        The new snapshot's id, or None if the docs haven't changed since the last one
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index = load_index(out_dir)
+    new_id = snapshot_id(docs_hashes(docs_dir))
+    if index["latest"] == new_id:
+        return None
+
+    snapshot_path = out_dir / f"snapshot-{new_id}.tar.{COMPRESSION}"
+    info = write_snapshot(docs_dir, snapshot_path)
+
+    previous = index["snapshot"]
+    previous_path = out_dir / previous["file"] if previous else None
+    if previous_path and previous_path.exists():
+        delta_path = out_dir / f"delta-{previous['id']}-{new_id}.tar.{COMPRESSION}"
+        write_delta(previous_path, snapshot_path, delta_path)
+        index["deltas"].append({
+            "from": previous["id"],
+            "to": new_id,
+            "file": delta_path.name,
+            "size": delta_path.stat().st_size,
+        })
+        previous_path.unlink()
+
+    for delta in index["deltas"][:-keep]:
+        (out_dir / delta["file"]).unlink(missing_ok=True)
+    index["deltas"] = index["deltas"][-keep:]
+    index["latest"] = new_id
+    index["snapshot"] = {
+        "id": new_id,
+        "file": snapshot_path.name,
+        "size": snapshot_path.stat().st_size,
+        "created": info["created"],
+    }
+
+    temp_path = out_dir / f".{INDEX_JSON}.tmp"
+    temp_path.write_text(json.dumps(index, indent=2))
+    os.replace(temp_path, out_dir / INDEX_JSON)
+    return new_id
+
+
+def refresh_derived_files(docs_dir: Path, staging: StagedUpdate) -> None:
+    """Stage the manifest database for the staged JSON manifest, if one is staged."""
+    staged_manifest = staging.path(MANIFEST_FILE)
+    if staged_manifest.exists():
+        write_manifest(staging.path(MANIFEST_DB), json.loads(staged_manifest.read_text()), docs_dir / MANIFEST_DB)
+
+
+def finish_update(docs_dir: Path) -> None:
+    """Bring the search index in line with the new manifest; a failure here isn't fatal."""
+    try:
+        ensure_index(docs_dir)
+    except Exception as e:
+        logger.warning(f"Failed to update search index: {e}")
+
+
+def apply_delta(docs_dir: Path, delta_path: Path) -> str:
+    """
+    Update docs_dir by one delta.
+
+    Returns:
+        The id of the snapshot docs_dir is at afterwards
+
+    Raises:
+        ValueError: If docs_dir isn't at the delta's starting snapshot, or a
+            patched file doesn't match its expected hash
+    """
+    info, members = read_archive(delta_path, DELTA_INFO)
+    current = snapshot_id(docs_hashes(docs_dir))
+    if current != info["from"]:
+        raise ValueError(f"Delta {info['from']} -> {info['to']} doesn't apply to snapshot {current}")
+
+    staging = StagedUpdate(docs_dir)
+    staging.begin()
+    try:
+        for filename, expected in info["files"].items():
+            old_path = docs_dir / check_name(filename)
+            old = old_path.read_bytes() if old_path.exists() else b''
+            data = apply_patch(old, members[f"patches/{filename}"])
+            if sha256(data) != expected:
+                raise ValueError(f"Patched {filename} doesn't match its hash")
+            staging.path(filename).parent.mkdir(parents=True, exist_ok=True)
+            staging.path(filename).write_bytes(data)
+        for filename in info["remove"]:
+            staging.remove(check_name(filename))
+        refresh_derived_files(docs_dir, staging)
+    except BaseException:
+        staging.discard()
+        raise
+    staging.commit()
+
+    finish_update(docs_dir)
+    return info["to"]
+
+
+def install_snapshot(docs_dir: Path, snapshot_path: Path) -> str:
+    """
+    Replace the pages in docs_dir with those of a full snapshot.
+
+    Pages the current manifest lists but the snapshot doesn't are removed;
+    files the manifest never listed are left alone.
+
+    Returns:
+        The snapshot's id
+    """
+    info, members = read_archive(snapshot_path, SNAPSHOT_INFO)
+    previous = load_manifest_hashes(docs_dir)
+
+    staging = StagedUpdate(docs_dir)
+    staging.begin()
+    try:
+        for filename, data in members.items():
+            if info["files"].get(filename) != sha256(data):
+                raise ValueError(f"{filename} in {snapshot_path.name} doesn't match its hash")
+            staging.path(filename).parent.mkdir(parents=True, exist_ok=True)
+            staging.path(filename).write_bytes(data)
+        for filename in previous.keys() - members.keys():
+            staging.remove(check_name(filename))
+        refresh_derived_files(docs_dir, staging)
+    except BaseException:
+        staging.discard()
+        raise
+    staging.commit()
+
+    finish_update(docs_dir)
+    return info["id"]
+
+
+def fetch_file(source: str, name: str, target: Path) -> None:
+    """Copy a published file from a directory or an http(s) URL."""
+    if source.startswith(('http://', 'https://')):
+        from urllib.request import urlopen
+        with urlopen(f"{source.rstrip('/')}/{name}", timeout=60) as response:
+            target.write_bytes(response.read())
+    else:
+        target.write_bytes((Path(source) / name).read_bytes())
+
+
+def update(docs_dir: Path, source: str) -> List[str]:
+    """
+    Bring docs_dir to the latest published snapshot.
+
+    Follows the chain of deltas from the local snapshot when there is one,
+    otherwise installs the full snapshot.
+
+    Returns:
+        Names of the files downloaded (empty if already up to date)
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp = Path(temp_dir)
+        fetch_file(source, INDEX_JSON, temp / INDEX_JSON)
+        index = json.loads((temp / INDEX_JSON).read_text())
+
+        current = snapshot_id(docs_hashes(docs_dir))
+        if current == index["latest"]:
+            return []
+
+        deltas = {delta["from"]: delta for delta in index["deltas"]}
+        chain = []
+        at = current
+        while at != index["latest"] and at in deltas:
+            chain.append(deltas[at])
+            at = deltas[at]["to"]
+        if at != index["latest"] or not chain:
+            chain = [index["snapshot"]]
+
+        for entry in chain:
+            path = temp / entry["file"]
+            fetch_file(source, entry["file"], path)
+            if "from" in entry:
+                apply_delta(docs_dir, path)
+            else:
+                install_snapshot(docs_dir, path)
+        return [entry["file"] for entry in chain]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build and apply compressed docs snapshots and deltas")
+    parser.add_argument(
+        "--docs-dir",
+        type=Path,
+        default=Path(__file__).parent.parent / 'docs',
+        help="Documentation directory (default: docs/ next to this script)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    publish_parser = subparsers.add_parser("publish", help="Write a snapshot and the delta from the previous one")
+    publish_parser.add_argument("out_dir", type=Path, help="Directory holding the published snapshots")
+    publish_parser.add_argument("--keep", type=int, default=DELTA_KEEP,
+                                help=f"Number of deltas to keep (default: {DELTA_KEEP})")
+    update_parser = subparsers.add_parser("update", help="Update docs/ to the latest published snapshot")
+    update_parser.add_argument("source", help="Published directory or URL")
+    apply_parser = subparsers.add_parser("apply", help="Apply a downloaded snapshot or delta")
+    apply_parser.add_argument("bundle", type=Path, help="snapshot-*.tar.xz or delta-*.tar.xz")
+    subparsers.add_parser("id", help="Print the snapshot id of docs/")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if args.command == "id":
+        print(snapshot_id(docs_hashes(args.docs_dir)))
+        return 0
+
+    if args.command == "publish":
+        new_id = publish(args.docs_dir, args.out_dir, args.keep)
+        print(f"Published snapshot {new_id}" if new_id else "No changes since the last snapshot")
+        return 0
+
+    try:
+        if args.command == "update":
+            downloaded = update(args.docs_dir, args.source)
+            print(f"Applied {', '.join(downloaded)}" if downloaded else "Already up to date")
+        elif args.bundle.name.startswith("delta-"):
+            print(f"Now at snapshot {apply_delta(args.docs_dir, args.bundle)}")
+        else:
+            print(f"Now at snapshot {install_snapshot(args.docs_dir, args.bundle)}")
+    except (OSError, ValueError) as e:
+        print(f"Update failed: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Crash-safe updates of the documentation tree.
+
+A fetch writes every changed file into a staging directory inside docs/
+instead of over the live copy. Committing fsyncs the staged files, writes a
+journal, and then renames each file into place, the manifest last. The journal
+is the commit point: a run that dies before writing it leaves docs/ untouched
+and its staging directory is discarded on the next run (roll back); a run that
+dies after writing it is completed on the next run by replaying the renames,
+which are idempotent (roll forward).
+
+Every rename replaces a whole file, so readers of docs/ never see a partially
+written page, and the manifest only ever lists files that are already in place.
+"""
+
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR = ".staging"
+JOURNAL_FILE = ".journal.json"
+MANIFEST_FILE = "docs_manifest.json"
+MANIFEST_DB = "docs_manifest.db"
+MANIFEST_FILES = (MANIFEST_DB, MANIFEST_FILE)  # moved last, database first
+
+
+def fsync_path(path: Path) -> None:
+    """Flush a file or directory to disk. Directories can't be fsynced everywhere; that's ignored."""
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class StagedUpdate:
+    """
+    Collects the changes of one fetch run and applies them to docs/ atomically.
+
+    Usage:
+        staging = StagedUpdate(docs_dir)
+        staging.begin()
+        ... write files under staging.path(filename), call staging.remove(filename) ...
+        staging.commit()
+    """
+
+    def __init__(self, docs_dir: Path):
+        self.docs_dir = docs_dir
+        self.dir = docs_dir / STAGING_DIR
+        self.journal_path = self.dir / JOURNAL_FILE
+        self.removals: Set[str] = set()
+
+    def path(self, filename: str) -> Path:
+        """Where the staged copy of a docs-relative filename is written."""
+        return self.dir / filename
+
+    def begin(self, resume: bool = False) -> bool:
+        """
+        Start an update, first finishing or discarding any interrupted one.
+
+        Args:
+            resume: Keep the files staged by an interrupted, uncommitted run
+                so it can carry on where it stopped
+
+        Returns:
+            True if an interrupted update was kept for resuming
+        """
+        self.removals.clear()
+        if resume and self.dir.exists() and not self.journal_path.exists():
+            logger.info(f"Resuming the interrupted update staged in {self.dir}")
+            return True
+        recover(self.docs_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        return False
+
+    def remove(self, filename: str) -> None:
+        """Schedule a live file for deletion once the new manifest is in place."""
+        self.removals.add(filename)
+
+    def staged_files(self) -> List[str]:
+        """Docs-relative names of all staged files, excluding temp files and the journal."""
+        return sorted(
+            path.relative_to(self.dir).as_posix()
+            for path in self.dir.rglob('*')
+            if path.is_file() and not path.name.startswith('.')
+        )
+
+    def commit(self) -> None:
+        """Make the staged files durable, record the journal, and move them into docs/."""
+        files = self.staged_files()
+        for filename in files:
+            fsync_path(self.path(filename))
+        for directory in {self.path(filename).parent for filename in files}:
+            fsync_path(directory)
+
+        journal = {
+            "files": [filename for filename in files if filename not in MANIFEST_FILES],
+            "manifest": any(filename in files for filename in MANIFEST_FILES),
+            "remove": sorted(self.removals - set(files)),
+        }
+        temp_journal = self.dir / f"{JOURNAL_FILE}.tmp"
+        with open(temp_journal, 'w') as f:
+            json.dump(journal, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_journal, self.journal_path)
+        fsync_path(self.dir)
+
+        apply_journal(self.docs_dir, journal)
+
+    def discard(self) -> None:
+        """Drop everything staged so far; docs/ is left as it was."""
+        shutil.rmtree(self.dir, ignore_errors=True)
+        self.removals.clear()
+
+
+def apply_journal(docs_dir: Path, journal: dict) -> None:
+    """
+    Move staged files into docs/ as recorded in a journal, then clean up.
+
+    Safe to run more than once: files already moved are skipped.
+    """
+    staging_dir = docs_dir / STAGING_DIR
+    touched_dirs = set()
+
+    def move(filename: str) -> None:
+        source = staging_dir / filename
+        if not source.exists():
+            return  # moved by an earlier, interrupted attempt
+        target = docs_dir / filename
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, target)
+        touched_dirs.add(target.parent)
+
+    for filename in journal["files"]:
+        move(filename)
+    for directory in touched_dirs:
+        fsync_path(directory)
+
+    # The manifest goes last so it never lists a file that isn't in place yet
+    if journal["manifest"]:
+        for filename in MANIFEST_FILES:
+            move(filename)
+        fsync_path(docs_dir)
+
+    # Obsolete files go only after the manifest that still listed them is gone
+    for filename in journal["remove"]:
+        path = docs_dir / filename
+        if path.exists():
+            logger.info(f"Removing obsolete file: {filename}")
+            path.unlink()
+
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def recover(docs_dir: Path) -> Optional[str]:
+    """
+    Resolve an update left behind by an interrupted run.
+
+    Returns:
+        "rolled forward" if a committed update was completed, "rolled back" if
+        an uncommitted one was discarded, or None if there was nothing to do
+    """
+    staging_dir = docs_dir / STAGING_DIR
+    if not staging_dir.exists():
+        return None
+
+    journal_path = staging_dir / JOURNAL_FILE
+    if journal_path.exists():
+        try:
+            journal = json.loads(journal_path.read_text())
+        except ValueError:
+            journal = None
+        if journal is not None:
+            logger.warning("Completing an interrupted docs update from its journal")
+            apply_journal(docs_dir, journal)
+            return "rolled forward"
+
+    logger.warning("Discarding files staged by an interrupted fetch")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    return "rolled back"
+
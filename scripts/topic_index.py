@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Topic lookup table for the /docs helper.
+
+Maps every name a document can be asked for to its file, so resolving a topic
+is a single read of one small file instead of probing and walking docs/. For
+platform/about-claude/models/overview.md the aliases are:
+
+    platform/about-claude/models/overview   source-qualified path
+    about-claude/models/overview            path within the source
+    about-claude__models__overview          flattened name
+    models/overview, overview               trailing parts of the path
+    models-overview                         slug of the page title
+
+Claude Code pages are stored flattened (sdk__migration-guide.md), so their
+hierarchical form (sdk/migration-guide) is an alias too. When several files
+claim an alias, the most specific kind of alias wins, then Claude Code over
+the platform docs, then the shallower path.
+
+The table is written by fetch_claude_docs.py as docs/docs_topics.tsv, one
+"alias<TAB>filename" line per alias, sorted by alias.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from manifest_store import open_manifest, source_files
+
+TOPICS_FILE = "docs_topics.tsv"
+MANIFEST_FILE = "docs_manifest.json"
+SOURCE_ORDER = ("claude-code", "platform")  # earlier sources win shared aliases
+TITLE_BYTES = 4096  # leading bytes searched for the page's "# Title"
+
+# Alias kinds, most specific first
+QUALIFIED, PATH, SUFFIX, TITLE = range(4)
+
+TITLE_RE = re.compile(r'^#\s+(.+?)\s*#*\s*$', re.MULTILINE)
+SLUG_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_topic(topic: str) -> str:
+    """Canonical form of a topic as typed: lowercase, no .md, spaces as hyphens."""
+    topic = topic.strip().strip('/').lower()
+    if topic.endswith('.md'):
+        topic = topic[:-3]
+    return re.sub(r'\s+', '-', topic)
+
+
+def slugify(text: str) -> str:
+    """Title slug: lowercase words joined by hyphens (e.g., "Models overview" -> "models-overview")."""
+    return SLUG_RE.sub('-', text.lower()).strip('-')
+
+
+def read_title(path: Path) -> Optional[str]:
+    """The first level-one heading near the top of a markdown file, if any."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(TITLE_BYTES).decode('utf-8', errors='replace')
+    except OSError:
+        return None
+    match = TITLE_RE.search(head)
+    return match.group(1) if match else None
+
+
+def topic_aliases(filename: str, title: Optional[str] = None) -> List[Tuple[int, str]]:
+    """
+    Every (kind, alias) a docs-relative filename can be looked up by.
+
+    Args:
+        filename: File relative to docs/ (e.g., 'platform/about-claude/models/overview.md')
+        title: Page title, if known
+    """
+    source, _, rest = filename[:-3].partition('/')
+    aliases = [(QUALIFIED, normalize_topic(filename))]
+    if not rest:
+        return aliases
+
+    parts = rest.split('/')
+    if len(parts) == 1 and '__' in rest:
+        parts = rest.split('__')  # flattened Claude Code page
+    aliases.append((PATH, normalize_topic(rest)))
+    aliases.append((PATH, normalize_topic('/'.join(parts))))
+    aliases.append((PATH, normalize_topic('__'.join(parts))))
+    for start in range(1, len(parts)):
+        aliases.append((SUFFIX, normalize_topic('/'.join(parts[start:]))))
+    if title and slugify(title):
+        aliases.append((TITLE, slugify(title)))
+    return aliases
+
+
+def alias_rank(kind: int, filename: str) -> tuple:
+    """Sort key deciding which file an alias shared by several files points to."""
+    source = filename.split('/', 1)[0]
+    source_rank = SOURCE_ORDER.index(source) if source in SOURCE_ORDER else len(SOURCE_ORDER)
+    return kind, source_rank, filename.count('/'), filename
+
+
+def build_topic_table(filenames: Iterable[str], roots: Sequence[Path]) -> Dict[str, str]:
+    """
+    Build the alias -> filename table for a set of markdown files.
+
+    Args:
+        filenames: Files relative to docs/ (non-markdown names are ignored)
+        roots: Directories to read titles from, first match wins (e.g., the
+            staging directory of a fetch, then docs/)
+
+    Returns:
+        Dict mapping each alias to the file it resolves to
+    """
+    best: Dict[str, tuple] = {}
+    for filename in filenames:
+        if not filename.endswith('.md'):
+            continue
+        title = None
+        for root in roots:
+            if (root / filename).exists():
+                title = read_title(root / filename)
+                break
+        for kind, alias in topic_aliases(filename, title):
+            rank = alias_rank(kind, filename)
+            if alias and (alias not in best or rank < best[alias]):
+                best[alias] = rank
+    return {alias: rank[-1] for alias, rank in best.items()}
+
+
+def write_topic_table(docs_dir: Path, table: Dict[str, str]) -> None:
+    """Write the table as sorted "alias<TAB>filename" lines, atomically."""
+    path = docs_dir / TOPICS_FILE
+    temp_path = path.with_name(f".{TOPICS_FILE}.tmp")
+    temp_path.write_text(''.join(f"{alias}\t{table[alias]}\n" for alias in sorted(table)))
+    os.replace(temp_path, path)
+
+
+def load_topic_table(docs_dir: Path) -> Dict[str, str]:
+    """Load the table written by write_topic_table, or an empty one if there is none."""
+    table = {}
+    try:
+        with open(docs_dir / TOPICS_FILE, encoding='utf-8') as f:
+            for line in f:
+                alias, _, filename = line.rstrip('\n').partition('\t')
+                if filename:
+                    table[alias] = filename
+    except OSError:
+        pass
+    return table
+
+
+def resolve_topic(table: Dict[str, str], topic: str) -> Optional[str]:
+    """Filename a topic refers to: an exact alias first, then the slug of the topic as a title."""
+    return table.get(normalize_topic(topic)) or table.get(slugify(topic))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Resolve /docs topics to documentation files")
+    parser.add_argument(
+        "--docs-dir",
+        type=Path,
+        default=Path(__file__).parent.parent / 'docs',
+        help="Documentation directory (default: docs/ next to this script)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="Rebuild the topic table from the manifest")
+    resolve_parser = subparsers.add_parser("resolve", help="Print source|path|topic for a topic")
+    resolve_parser.add_argument("topic", nargs='+', help="Topic (e.g., hooks, models overview, platform/intro)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        conn = open_manifest(args.docs_dir)
+        if conn is not None:
+            filenames = source_files(conn)
+            conn.close()
+        else:
+            filenames = json.loads((args.docs_dir / MANIFEST_FILE).read_text()).get("files", {})
+        table = build_topic_table(filenames, [args.docs_dir])
+        write_topic_table(args.docs_dir, table)
+        print(f"Wrote {len(table)} aliases to {args.docs_dir / TOPICS_FILE}")
+        return 0
+
+    filename = resolve_topic(load_topic_table(args.docs_dir), ' '.join(args.topic))
+    if not filename or not (args.docs_dir / filename).exists():
+        return 1
+    source, _, rest = filename.partition('/')
+    print(f"{source}|{args.docs_dir / filename}|{rest[:-3]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Persisted work queue for documentation fetch runs.
+
+Every discovered page gets a record with its status (pending, done or
+failed), attempt count and the earliest time it may be retried. The queue is
+saved in the staging directory as pages complete, so a run that is
+interrupted can be resumed with `fetch_claude_docs.py --resume` and only the
+remaining pages are fetched. Failed pages are retried with exponential backoff
+across runs instead of blocking the current one.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+QUEUE_FILE = ".queue.json"
+QUEUE_VERSION = 1
+QUEUE_SAVE_INTERVAL = 1.0  # seconds between queue writes while pages complete
+
+# Backoff for pages that failed in an earlier run
+RETRY_BACKOFF_BASE = 15 * 60  # seconds after the first failure
+RETRY_BACKOFF_MAX = 24 * 60 * 60  # cap between attempts
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def retry_backoff(attempts: int) -> float:
+    """Seconds to wait before the next attempt of a page that failed `attempts` times."""
+    return min(RETRY_BACKOFF_BASE * 2 ** max(attempts - 1, 0), RETRY_BACKOFF_MAX)
+
+
+class WorkQueue:
+    """
+    Thread-safe per-page status for one fetch run, persisted as JSON.
+
+    Records are keyed by source and page path and kept in discovery order, so
+    the manifest built from them is deterministic.
+    """
+
+    def __init__(self, path: Path, full_sweep: bool = True):
+        self.path = path
+        self.state = {"version": QUEUE_VERSION, "full_sweep": full_sweep, "sources": {}}
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["WorkQueue"]:
+        """Load a saved queue, or None if there is none or it can't be read."""
+        try:
+            state = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if state.get("version") != QUEUE_VERSION:
+            return None
+        queue = cls(path)
+        queue.state = state
+        return queue
+
+    @property
+    def full_sweep(self) -> bool:
+        return self.state["full_sweep"]
+
+    def __contains__(self, source_key: str) -> bool:
+        return source_key in self.state["sources"]
+
+    def add_source(
+        self,
+        source_key: str,
+        info: dict,
+        lastmods: Dict[str, Optional[str]],
+        retry_state: Optional[Dict[str, dict]] = None
+    ) -> None:
+        """
+        Queue the pages discovered for a source.
+
+        Args:
+            source_key: Source key (e.g., 'claude-code')
+            info: Source details to keep for a resumed run (sitemap_url, base_url)
+            lastmods: Page path -> sitemap <lastmod>, in discovery order
+            retry_state: Page path -> {"attempts", "retry_at", "error"} carried
+                over from the previous run's manifest
+        """
+        retry_state = retry_state or {}
+        pages = {}
+        for page_path, lastmod in lastmods.items():
+            record = {"status": PENDING, "lastmod": lastmod, "attempts": 0}
+            previous = retry_state.get(page_path)
+            if previous:
+                record.update(
+                    status=FAILED,
+                    attempts=previous.get("attempts", 1),
+                    retry_at=previous.get("retry_at"),
+                    error=previous.get("error")
+                )
+            pages[page_path] = record
+
+        with self._lock:
+            self.state["sources"][source_key] = {"info": info, "pages": pages}
+        self.save(force=True)
+
+    def info(self, source_key: str) -> dict:
+        return self.state["sources"][source_key]["info"]
+
+    def pages(self, source_key: str) -> Dict[str, dict]:
+        """Page path -> record for a source, in discovery order."""
+        return self.state["sources"][source_key]["pages"]
+
+    def due(self, source_key: str, now: Optional[datetime] = None) -> List[str]:
+        """Pages to fetch now: pending ones, and failed ones whose retry time has come."""
+        now = (now or datetime.now()).isoformat()
+        return [
+            page_path for page_path, record in self.pages(source_key).items()
+            if record["status"] == PENDING
+            or (record["status"] == FAILED and (record.get("retry_at") or "") <= now)
+        ]
+
+    def mark_done(self, source_key: str, page_path: str, filename: str, entry: dict, skipped: bool = False) -> None:
+        """Record a page as fetched (or skipped as unchanged) with its manifest entry."""
+        with self._lock:
+            record = self.pages(source_key)[page_path]
+            record.update(status=DONE, filename=filename, entry=entry, skipped=skipped)
+            record.pop("retry_at", None)
+            record.pop("error", None)
+        self.save()
+
+    def mark_failed(self, source_key: str, page_path: str, error: Exception, retry_after: Optional[float] = None) -> dict:
+        """
+        Record a failed attempt and schedule the next one.
+
+        Args:
+            retry_after: Seconds the server asked us to wait; defaults to
+                exponential backoff on the number of attempts
+
+        Returns:
+            The updated page record
+        """
+        with self._lock:
+            record = self.pages(source_key)[page_path]
+            record["attempts"] = record.get("attempts", 0) + 1
+            delay = retry_after if retry_after is not None else retry_backoff(record["attempts"])
+            record.update(
+                status=FAILED,
+                retry_at=(datetime.now() + timedelta(seconds=delay)).isoformat(),
+                error=str(error)
+            )
+        self.save()
+        return record
+
+    def save(self, force: bool = False) -> None:
+        """Write the queue atomically; calls closer than QUEUE_SAVE_INTERVAL are coalesced unless forced."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_save < QUEUE_SAVE_INTERVAL:
+                return
+            self._last_save = now
+            data = json.dumps(self.state)
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(f"{self.path.name}.tmp")
+            temp_path.write_text(data)
+            os.replace(temp_path, self.path)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for fetching and searching the documentation.
+
+Fetch benchmarks discover and download a synthetic corpus from local mock
+documentation sites (one per source, see mock_docs_server.py) through the
+same discover_* / fetch_markdown_content path as a real run: a cold fetch,
+a revalidation where every page answers 304, and a cold fetch with injected
+429s. Search benchmarks build, update and query the lexical index of a fixed,
+generated fixture corpus.
+
+Every scenario runs in its own process, so its peak RSS is its own.
+
+Usage:
+    bin/bench                                  # every benchmark, default sizes
+    bin/bench fetch --pages 300 --latency-ms 50
+    bin/bench fetch --rate 0                   # without the per-host rate limit
+    bin/bench --json results.json              # save the results
+    bin/bench --compare results.json           # exit 1 if a scenario got slower
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from mock_docs_server import MockDocsServer, page_paths, synthetic_page
+
+FETCH_SCENARIOS = ("fetch-cold", "fetch-revalidate", "fetch-throttled")
+SEARCH_SCENARIOS = ("index-build", "index-update", "search-query")
+
+# Fixed search workload; the fixture corpus is generated deterministically,
+# so results are comparable between runs
+SEARCH_QUERIES = [
+    "tool permission",
+    "stream response",
+    "retry limit error",
+    "embedding search index",
+    "hook config setting",
+    "batch request",
+    "python client install",
+    "context token",
+    "agent session memory",
+    "json schema output",
+    "client.message.create",
+    "terminal workflow review",
+]
+UPDATED_SHARE = 0.05  # share of the fixture corpus changed for index-update
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def fetch_tree(sites: Dict[str, str], docs_dir: Path, workers: int, rate: float) -> dict:
+    """
+    Discover and fetch every page of the given sites into docs_dir.
+
+    Pages already listed in docs_dir's manifest are revalidated with their
+    stored validators, as in a real run. The manifest is rewritten afterwards.
+    """
+    import fetch_metrics
+    from fetch_claude_docs import (
+        DOC_SOURCES, HostRateLimiter, RetryScheduler, create_session, discover_sitemap,
+        discover_documentation_lastmods, load_manifest, page_task, save_manifest,
+    )
+
+    manifest = load_manifest(docs_dir)
+    metrics = fetch_metrics.start_run()
+    scheduler = RetryScheduler(HostRateLimiter(rate=rate or float("inf")))
+
+    start = time.perf_counter()
+    with create_session(workers) as session:
+        tasks = []
+        for source_key, sitemap_url in sites.items():
+            source_config = DOC_SOURCES[source_key]
+            sitemap = discover_sitemap(session, [sitemap_url])
+            lastmods = discover_documentation_lastmods(
+                session, sitemap, source_config['url_patterns'],
+                source_config['skip_patterns'], source_config['name']
+            )
+            tasks += [
+                page_task(page_path, session, sitemap.base_url, source_key, source_config,
+                          docs_dir, manifest, scheduler)
+                for page_path in lastmods
+            ]
+        results = scheduler.run(tasks, workers)
+    wall = time.perf_counter() - start
+
+    files = {result[0]: result[1] for result, error in results if error is None}
+    save_manifest(docs_dir, {"files": files})
+
+    summary = metrics.summary()
+    pages = [data for source, data in summary.items() if source != "sitemap"]
+    downloaded = sum(data["bytes"] for data in summary.values())
+    latencies = sorted(span.total_ms for span in metrics.spans
+                       if span.source != "sitemap" and span.status is not None)
+    return {
+        "pages": len(files),
+        "failed": len(results) - len(files),
+        "requests": sum(data["requests"] for data in pages),
+        "retries": sum(data["retries"] for data in pages),
+        "bytes": downloaded,
+        "wall_s": wall,
+        "pages_per_s": len(files) / wall if wall else 0.0,
+        "mb_per_s": downloaded / wall / (1024 * 1024) if wall else 0.0,
+        "p50_ms": fetch_metrics.percentile(latencies, 0.5),
+        "p95_ms": fetch_metrics.percentile(latencies, 0.95),
+    }
+
+
+def write_corpus(docs_dir: Path, pages: int, page_bytes: int) -> None:
+    """Write the fixture corpus and a manifest listing it."""
+    files = {}
+    for path in page_paths(pages):
+        filename = f"platform/{path[len('/docs/en/'):]}.md"
+        body = synthetic_page(path, page_bytes)
+        (docs_dir / filename).parent.mkdir(parents=True, exist_ok=True)
+        (docs_dir / filename).write_bytes(body)
+        files[filename] = {"source": "platform", "hash": hashlib.sha256(body).hexdigest()}
+    (docs_dir / "docs_manifest.json").write_text(json.dumps({"files": files}, indent=2))
+
+
+def index_build(docs_dir: Path) -> dict:
+    from search_index import INDEX_FILE, build_index
+
+    start = time.perf_counter()
+    sections = build_index(docs_dir)
+    wall = time.perf_counter() - start
+    return {
+        "sections": sections,
+        "index_mb": (docs_dir / INDEX_FILE).stat().st_size / (1024 * 1024),
+        "wall_s": wall,
+        "sections_per_s": sections / wall if wall else 0.0,
+    }
+
+
+def index_update(docs_dir: Path) -> dict:
+    """Change UPDATED_SHARE of the corpus, then time the incremental index update."""
+    from search_index import update_index
+
+    manifest_path = docs_dir / "docs_manifest.json"
+    manifest = json.loads(manifest_path.read_text())
+    filenames = sorted(manifest["files"])
+    changed = filenames[::max(int(1 / UPDATED_SHARE), 1)]
+    for filename in changed:
+        body = (docs_dir / filename).read_bytes() + b"\n## Changelog\n\nUpdated retry limit for batch requests.\n"
+        (docs_dir / filename).write_bytes(body)
+        manifest["files"][filename]["hash"] = hashlib.sha256(body).hexdigest()
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+
+    start = time.perf_counter()
+    added, updated, removed = update_index(docs_dir)
+    return {"files_changed": updated, "wall_s": time.perf_counter() - start}
+
+
+def search_query(docs_dir: Path, repeat: int) -> dict:
+    import fetch_metrics
+    from search_index import search
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in SEARCH_QUERIES:
+            began = time.perf_counter()
+            search(docs_dir, query, limit=10)
+            latencies.append((time.perf_counter() - began) * 1000)
+    wall = time.perf_counter() - start
+    return {
+        "queries": len(latencies),
+        "wall_s": wall,
+        "queries_per_s": len(latencies) / wall if wall else 0.0,
+        "p50_ms": fetch_metrics.percentile(latencies, 0.5),
+        "p95_ms": fetch_metrics.percentile(latencies, 0.95),
+        "p99_ms": fetch_metrics.percentile(latencies, 0.99),
+    }
+
+
+def run_scenario(scenario: str, config: dict) -> dict:
+    """Run one scenario in this process (the child side of run_isolated)."""
+    logging.basicConfig(level=logging.ERROR)
+    docs_dir = Path(config["docs_dir"])
+    if scenario.startswith("fetch-"):
+        result = fetch_tree(config["sites"], docs_dir, config["workers"], config["rate"])
+    elif scenario == "index-build":
+        result = index_build(docs_dir)
+    elif scenario == "index-update":
+        result = index_update(docs_dir)
+    elif scenario == "search-query":
+        result = search_query(docs_dir, config["repeat"])
+    else:
+        raise ValueError(f"Unknown scenario: {scenario}")
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_isolated(scenario: str, config: dict) -> dict:
+    """Run a scenario in a fresh interpreter and return its results."""
+    completed = subprocess.run(
+        [sys.executable, __file__, "--scenario", scenario, json.dumps(config)],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr)
+        raise RuntimeError(f"Benchmark {scenario} failed with exit code {completed.returncode}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_fetch_benchmarks(args: argparse.Namespace, workdir: Path) -> Dict[str, dict]:
+    results = {}
+    sources = ("claude-code", "platform")
+    sites = {
+        source_key: MockDocsServer(
+            pages=args.pages, page_bytes=args.page_kb * 1024, latency=args.latency_ms / 1000,
+            retry_after=1, seed=index
+        ).start()
+        for index, source_key in enumerate(sources)
+    }
+    try:
+        config = {
+            "sites": {source_key: site.sitemap_url for source_key, site in sites.items()},
+            "workers": args.workers,
+            "rate": args.rate,
+        }
+        for scenario in FETCH_SCENARIOS:
+            docs_dir = workdir / ("throttled" if scenario == "fetch-throttled" else "fetch")
+            docs_dir.mkdir(exist_ok=True)
+            for site in sites.values():
+                site.throttle_rate = args.throttle_rate if scenario == "fetch-throttled" else 0.0
+            results[scenario] = run_isolated(scenario, dict(config, docs_dir=str(docs_dir)))
+            report(scenario, results[scenario])
+    finally:
+        for site in sites.values():
+            site.stop()
+    return results
+
+
+def run_search_benchmarks(args: argparse.Namespace, workdir: Path) -> Dict[str, dict]:
+    results = {}
+    docs_dir = workdir / "search"
+    docs_dir.mkdir()
+    write_corpus(docs_dir, args.search_pages, args.page_kb * 1024)
+    config = {"docs_dir": str(docs_dir), "repeat": args.repeat}
+    for scenario in SEARCH_SCENARIOS:
+        results[scenario] = run_isolated(scenario, config)
+        report(scenario, results[scenario])
+    return results
+
+
+def report(scenario: str, result: dict) -> None:
+    details = []
+    if "pages_per_s" in result:
+        details.append(f"{result['pages']} pages, {result['pages_per_s']:.1f} pages/s, {result['mb_per_s']:.2f} MB/s")
+        details.append(f"{result['requests']} requests ({result['retries']} retries)")
+        if result["failed"]:
+            details.append(f"{result['failed']} failed")
+    if "sections_per_s" in result:
+        details.append(f"{result['sections']} sections, {result['sections_per_s']:.0f} sections/s, "
+                       f"{result['index_mb']:.1f} MB index")
+    if "files_changed" in result:
+        details.append(f"{result['files_changed']} files re-indexed")
+    if "queries_per_s" in result:
+        details.append(f"{result['queries']} queries, {result['queries_per_s']:.0f} queries/s")
+    latency = [f"{name[:-3]} {result[name]:.1f}ms" for name in ("p50_ms", "p95_ms", "p99_ms")
+               if result.get(name) is not None]
+    print(f"{scenario:<18} {result['wall_s']:8.2f}s  {result['peak_rss_mb']:6.0f} MB peak  "
+          + "; ".join(details + ([" ".join(latency)] if latency else [])))
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Scenarios whose wall time exceeds the baseline's by more than the tolerance."""
+    regressions = []
+    for scenario, result in results.items():
+        before = baseline.get(scenario, {}).get("wall_s")
+        if before and result["wall_s"] > before * (1 + tolerance):
+            regressions.append(f"{scenario}: {result['wall_s']:.2f}s vs {before:.2f}s "
+                               f"(+{(result['wall_s'] / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    from fetch_claude_docs import MAX_WORKERS, RATE_LIMIT_PER_HOST
+
+    parser = argparse.ArgumentParser(description="Offline fetch and search benchmarks")
+    parser.add_argument("suite", nargs="?", choices=("all", "fetch", "search"), default="all")
+    parser.add_argument("--pages", type=int, default=100, help="Pages per mock source (default: 100)")
+    parser.add_argument("--page-kb", type=int, default=8, help="Size of each page in KiB (default: 8)")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Mock server latency per page (default: 20)")
+    parser.add_argument("--throttle-rate", type=float, default=0.05,
+                        help="Share of requests answered with 429 in fetch-throttled (default: 0.05)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help=f"Fetch workers (default: {MAX_WORKERS})")
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT_PER_HOST,
+                        help=f"Requests per second per host, 0 for no limit (default: {RATE_LIMIT_PER_HOST})")
+    parser.add_argument("--search-pages", type=int, default=500, help="Pages in the search fixture corpus (default: 500)")
+    parser.add_argument("--repeat", type=int, default=20, help="Times the query set is run (default: 20)")
+    parser.add_argument("--json", type=Path, help="Write the results to this file")
+    parser.add_argument("--compare", type=Path, help="Results file to compare wall times against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown against --compare before failing (default: 0.25)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv[:1] == ["--scenario"]:
+        print(json.dumps(run_scenario(argv[1], json.loads(argv[2]))))
+        return 0
+
+    args = parse_args(argv)
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="claude-docs-bench-") as workdir:
+        if args.suite in ("all", "fetch"):
+            results.update(run_fetch_benchmarks(args, Path(workdir)))
+        if args.suite in ("all", "search"):
+            results.update(run_search_benchmarks(args, Path(workdir)))
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"Slower than baseline: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for a documentation site, for offline tests and benchmarks.
+
+Serves a synthetic sitemap and markdown corpus the way code.claude.com and
+platform.claude.com do: /sitemap.xml lists /docs/en/... pages with <lastmod>,
+and each page is available as markdown at its URL plus ".md". The corpus size,
+per-request latency and the share of requests answered with 429 are
+configurable, and pages carry ETags so conditional requests get 304.
+
+Usage:
+    with MockDocsServer(pages=200, page_bytes=8192, latency=0.02) as site:
+        sitemap = discover_sitemap(session, [site.sitemap_url])
+"""
+
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+WORDS = """
+claude api model message tool hook agent session prompt token context request
+response stream batch file memory setting permission command server client
+config output input error retry limit cache embedding search index schema
+json python typescript install terminal workflow project team review test
+""".split()
+SECTIONS = ["get-started", "build-with-claude", "agents", "api", "tools", "admin"]
+
+
+def page_paths(pages: int) -> List[str]:
+    """URL paths of a synthetic corpus, spread over a few nested sections."""
+    return [f"/docs/en/{SECTIONS[i % len(SECTIONS)]}/page-{i}" for i in range(pages)]
+
+
+def synthetic_page(path: str, size: int, version: int = 0) -> bytes:
+    """
+    A deterministic markdown page of about `size` bytes for a URL path.
+
+    The same path and version always give the same body; bumping the version
+    gives a different one. Every page opens with a title, a quote and a short
+    list, so it passes the fetcher's markdown validation whatever follows.
+    """
+    rng = random.Random(f"{path}:{version}")
+    title = path.rsplit('/', 1)[-1].replace('-', ' ').title()
+    parts = [
+        f"# {title}\n\n> Claude documentation for {path}\n\n"
+        f"- Source: `{path}`\n- Revision: {version}\n\n"
+    ]
+    length = len(parts[0])
+    section = 0
+    while length < size:
+        if rng.random() < 0.15:
+            section += 1
+            block = f"## {' '.join(rng.choices(WORDS, k=3)).capitalize()} {section}\n\n"
+        elif rng.random() < 0.15:
+            block = f"```python\nclient.{rng.choice(WORDS)}.create({rng.choice(WORDS)}=True)\n```\n\n"
+        else:
+            block = ' '.join(rng.choices(WORDS, k=rng.randint(20, 60))).capitalize() + ".\n\n"
+        parts.append(block)
+        length += len(block)
+    return ''.join(parts).encode('utf-8')[:size]
+
+
+class MockDocsServer:
+    """
+    A threaded HTTP server serving one synthetic documentation site.
+
+    Args:
+        pages: Number of pages listed in the sitemap
+        page_bytes: Approximate size of each markdown page
+        latency: Seconds to wait before answering a page request
+        throttle_rate: Share of page requests answered with 429
+        retry_after: Retry-After seconds sent with a 429
+        seed: Seed for choosing which requests are throttled
+    """
+
+    def __init__(
+        self,
+        pages: int = 50,
+        page_bytes: int = 4096,
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 1,
+        seed: int = 0
+    ):
+        self.paths = page_paths(pages)
+        self._known = set(self.paths)
+        self.page_bytes = page_bytes
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.versions: Dict[str, int] = {}
+        self.counts = {"sitemap": 0, "200": 0, "304": 0, "404": 0, "429": 0}
+        self._bodies: Dict[str, bytes] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def sitemap_url(self) -> str:
+        return f"{self.base_url}/sitemap.xml"
+
+    def body(self, path: str) -> bytes:
+        with self._lock:
+            version = self.versions.get(path, 0)
+            key = f"{path}:{version}"
+            if key not in self._bodies:
+                self._bodies[key] = synthetic_page(path, self.page_bytes, version)
+            return self._bodies[key]
+
+    def change(self, paths: List[str]) -> None:
+        """Publish a new version of the given pages (new body, ETag and lastmod)."""
+        with self._lock:
+            for path in paths:
+                self.versions[path] = self.versions.get(path, 0) + 1
+
+    def sitemap(self) -> bytes:
+        with self._lock:
+            versions = dict(self.versions)
+        urls = ''.join(
+            f"<url><loc>{self.base_url}{path}</loc><lastmod>2026-01-{1 + versions.get(path, 0):02d}</lastmod></url>"
+            for path in self.paths
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+        ).encode('utf-8')
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def throttle(self) -> bool:
+        with self._lock:
+            return self.throttle_rate > 0 and self._rng.random() < self.throttle_rate
+
+    def start(self) -> "MockDocsServer":
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path == "/sitemap.xml":
+                    site.count("sitemap")
+                    return self.reply(200, site.sitemap(), "application/xml")
+
+                path = self.path[:-3] if self.path.endswith(".md") else None
+                if path not in site._known:
+                    site.count("404")
+                    return self.reply(404, b"Not found", "text/plain")
+
+                if site.latency:
+                    time.sleep(site.latency)
+                if site.throttle():
+                    site.count("429")
+                    return self.reply(429, b"", "text/plain", {"Retry-After": str(site.retry_after)})
+
+                body = site.body(path)
+                etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+                if self.headers.get("If-None-Match") == etag:
+                    site.count("304")
+                    return self.reply(304, b"", None, {"ETag": etag})
+                site.count("200")
+                self.reply(200, body, "text/markdown; charset=utf-8", {"ETag": etag})
+
+            def reply(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                if content_type:
+                    self.send_header("Content-Type", content_type)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "MockDocsServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
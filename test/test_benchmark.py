@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the mock docs server and the benchmark harness.
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import requests
+
+from benchmark import compare, fetch_tree, write_corpus, index_build, search_query
+from fetch_claude_docs import discover_sitemap, validate_markdown_content
+from mock_docs_server import MockDocsServer, page_paths, synthetic_page
+
+
+def test_synthetic_pages_are_deterministic():
+    assert synthetic_page("/docs/en/api/page-1", 2048) == synthetic_page("/docs/en/api/page-1", 2048)
+    assert synthetic_page("/docs/en/api/page-1", 2048, version=1) != synthetic_page("/docs/en/api/page-1", 2048)
+    assert len(synthetic_page("/docs/en/api/page-1", 2048)) == 2048
+
+
+def test_synthetic_pages_pass_markdown_validation():
+    # Failures in a benchmark run should only come from injected faults
+    for path in page_paths(300):
+        for version in (0, 1):
+            validate_markdown_content(synthetic_page(path, 1024, version).decode('utf-8'), path)
+
+
+def test_mock_server_serves_sitemap_pages_and_conditional_requests():
+    with MockDocsServer(pages=3, page_bytes=1024) as site, requests.Session() as session:
+        sitemap = discover_sitemap(session, [site.sitemap_url])
+        assert len(sitemap) == 3
+        assert sitemap.base_url == site.base_url
+
+        url = f"{next(iter(sitemap.entries))}.md"
+        first = session.get(url)
+        assert first.status_code == 200 and len(first.content) == 1024
+        assert session.get(url, headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+
+        site.change([site.paths[0]])
+        changed = session.get(url, headers={"If-None-Match": first.headers["ETag"]})
+        assert changed.status_code == 200 and changed.content != first.content
+
+        assert session.get(f"{site.base_url}/docs/en/missing.md").status_code == 404
+        site.throttle_rate = 1.0
+        throttled = session.get(url)
+        assert throttled.status_code == 429 and throttled.headers["Retry-After"] == "1"
+        assert site.counts == {"sitemap": 1, "200": 2, "304": 1, "404": 1, "429": 1}
+
+
+def test_fetch_tree_cold_then_revalidated(tmp_path):
+    with MockDocsServer(pages=6, page_bytes=2048) as code, MockDocsServer(pages=4, page_bytes=2048) as platform:
+        sites = {"claude-code": code.sitemap_url, "platform": platform.sitemap_url}
+        cold = fetch_tree(sites, tmp_path, workers=4, rate=0)
+        assert (cold["pages"], cold["failed"], cold["requests"]) == (10, 0, 10)
+        assert (tmp_path / "platform" / "get-started" / "page-0.md").read_bytes() == \
+            synthetic_page("/docs/en/get-started/page-0", 2048)
+
+        warm = fetch_tree(sites, tmp_path, workers=4, rate=0)
+        assert warm["pages"] == 10
+        assert code.counts["304"] + platform.counts["304"] == 10
+
+
+def test_search_benchmarks_on_fixture_corpus(tmp_path):
+    write_corpus(tmp_path, pages=12, page_bytes=2048)
+    built = index_build(tmp_path)
+    assert built["sections"] > 12
+    queried = search_query(tmp_path, repeat=1)
+    assert queried["queries"] > 0 and queried["p95_ms"] >= queried["p50_ms"]
+
+
+def test_compare_flags_regressions():
+    baseline = {"fetch-cold": {"wall_s": 10.0}, "search-query": {"wall_s": 1.0}}
+    results = {"fetch-cold": {"wall_s": 11.0}, "search-query": {"wall_s": 2.0}, "index-build": {"wall_s": 5.0}}
+    regressions = compare(results, baseline, tolerance=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith("search-query")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the deduplicated block store.
+"""
+import hashlib
+import sys
+import zlib
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import pytest
+
+from block_store import BLOCKS_FILE, MAX_BLOCK, BlockStore, main, split_blocks
+from manifest_store import MANIFEST_DB, write_manifest
+
+
+def reference_page(language: str, endpoints: int = 4) -> bytes:
+    """An API reference page with a language-specific sample in every section."""
+    sections = []
+    for n in range(endpoints):
+        sections.append(
+            f"## Endpoint {n}\n\n"
+            + "".join(f"Parameter {n}.{i}: shared description of the request field.\n" for i in range(400))
+            + f"\n```{language}\nclient.endpoint_{n}()  # {language} sample\n```\n\n"
+        )
+    return "".join(sections).encode()
+
+
+def test_blocks_are_whole_lines_and_survive_an_insertion():
+    page = reference_page("python")
+    blocks = list(split_blocks(page))
+    assert b"".join(blocks) == page
+    assert all(block.endswith(b"\n") for block in blocks)
+    assert all(len(block) <= MAX_BLOCK for block in blocks)
+
+    # An edit near the top only changes the blocks around it
+    edited = page.replace(b"Parameter 0.3:", b"Parameter 0.3 (required):", 1)
+    shared = set(blocks) & set(split_blocks(edited))
+    assert len(shared) >= len(blocks) - 2
+
+    assert list(split_blocks(b"x" * (MAX_BLOCK * 2 + 5))) == [b"x" * MAX_BLOCK] * 2 + [b"x" * 5]
+
+
+def test_similar_pages_share_blocks(tmp_path):
+    pages = {language: reference_page(language) for language in ("go", "java", "python", "typescript")}
+    with BlockStore(tmp_path / BLOCKS_FILE) as store:
+        hashes = {language: store.put(page) for language, page in pages.items()}
+        for language, page in pages.items():
+            assert hashes[language] == hashlib.sha256(page).hexdigest()
+            assert store.get(hashes[language]) == page
+        stats = store.stats()
+        assert stats["page_bytes"] == sum(map(len, pages.values()))
+        assert stats["unique_bytes"] < stats["page_bytes"] / 2
+
+        assert store.put(pages["go"]) == hashes["go"]
+        assert store.stats()["blocks"] == stats["blocks"]
+        assert store.get("0" * 64) is None
+
+
+def test_gc_drops_unlisted_pages_and_their_blocks(tmp_path):
+    with BlockStore(tmp_path / BLOCKS_FILE) as store:
+        kept = store.put(b"# Kept\n\nShared line\n")
+        dropped = store.put(b"# Dropped\n\nOnly here\n")
+        assert store.gc([kept]) == (1, 1)
+        assert store.has(kept) and not store.has(dropped)
+
+
+def test_corrupt_block_is_detected(tmp_path):
+    with BlockStore(tmp_path / BLOCKS_FILE) as store:
+        content_hash = store.put(b"# Page\n\nBody\n")
+        store.conn.execute("UPDATE blocks SET data = ?", (zlib.compress(b"# Tampered\n"),))
+        with pytest.raises(ValueError):
+            store.get(content_hash)
+
+
+def test_cli_packs_the_manifest_pages(tmp_path, capsys):
+    files = {}
+    for language in ("go", "python"):
+        filename = f"platform/api/{language}/messages.md"
+        page = reference_page(language, endpoints=1)
+        (tmp_path / filename).parent.mkdir(parents=True)
+        (tmp_path / filename).write_bytes(page)
+        files[filename] = {"source": "platform", "hash": hashlib.sha256(page).hexdigest()}
+    write_manifest(tmp_path / MANIFEST_DB, {"files": files})
+
+    assert main(["--docs-dir", str(tmp_path), "pack"]) == 0
+    assert "Stored 2 new pages" in capsys.readouterr().out
+    with BlockStore(tmp_path / BLOCKS_FILE) as store:
+        for filename, entry in files.items():
+            assert store.get(entry["hash"]) == (tmp_path / filename).read_bytes()
+
+    assert main(["--docs-dir", str(tmp_path), "pack"]) == 0
+    assert "Stored 0 new pages, removed 0" in capsys.readouterr().out
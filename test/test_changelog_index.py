@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the per-release changelog index.
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from changelog_index import (
+    CHANGELOG_FILE,
+    INDEX_FILE,
+    build_index,
+    load_index,
+    main,
+    refresh_index,
+    releases_between,
+    releases_since,
+    search_entries,
+    update_index,
+)
+
+HEADER = b"# Claude Code Changelog\n\n> **Source**: CHANGELOG.md\n\n---\n\n# Changelog\n\n"
+
+
+def release(version: str, *entries: str) -> bytes:
+    return f"## {version}\n\n".encode() + b"".join(f"- {entry}\n".encode() for entry in entries) + b"\n"
+
+
+RELEASES = [
+    release("1.0.100", "Added hooks for session start", "Fixed a crash"),
+    release("1.0.99", "Improved startup time"),
+    release("1.0.80", "Added `PreToolUse` hooks"),
+    release("0.2.21", "Fuzzy matching for /commands"),
+]
+
+
+def changelog(*releases: bytes) -> bytes:
+    return HEADER + b"".join(releases)
+
+
+def test_index_records_entries_anchors_and_offsets():
+    data = changelog(*RELEASES)
+    index = build_index(data)
+    assert [r["version"] for r in index["releases"]] == ["1.0.100", "1.0.99", "1.0.80", "0.2.21"]
+    first = index["releases"][0]
+    assert first["anchor"] == "10100"
+    assert first["entries"] == ["Added hooks for session start", "Fixed a crash"]
+    for entry, section in zip(index["releases"], RELEASES):
+        assert data[entry["start"]:entry["end"]] == section
+
+
+def test_continuation_lines_join_their_entry():
+    index = build_index(changelog(b"## 2.0.0\n\n- Added a setting that\n  spans two lines\n- Second\n"))
+    assert index["releases"][0]["entries"] == ["Added a setting that spans two lines", "Second"]
+
+
+def test_update_only_adds_new_releases():
+    index = build_index(changelog(*RELEASES))
+    data = changelog(release("1.0.101", "Added a `/hooks` command"), *RELEASES)
+
+    updated, added = update_index(index, data)
+    assert added == 1
+    assert updated == build_index(data)
+    assert update_index(updated, data) == (updated, 0)
+
+
+def test_edit_to_an_older_release_rebuilds():
+    index = build_index(changelog(*RELEASES))
+    edited = changelog(*RELEASES[:3], release("0.2.21", "Fuzzy matching for slash commands"))
+
+    updated, added = update_index(index, edited)
+    assert added == len(RELEASES)
+    assert updated == build_index(edited)
+
+
+def test_version_queries_compare_numerically():
+    index = build_index(changelog(*RELEASES))
+    assert [r["version"] for r in releases_since(index, "1.0.80")] == ["1.0.100", "1.0.99"]
+    assert [r["version"] for r in releases_between(index, "0.2.21", "1.0.99")] == ["1.0.99", "1.0.80", "0.2.21"]
+    assert search_entries(index, "HOOKS") == [
+        ("1.0.100", "Added hooks for session start"),
+        ("1.0.80", "Added `PreToolUse` hooks"),
+    ]
+
+
+def test_cli_queries_the_index_without_the_changelog(tmp_path, capsys):
+    (tmp_path / CHANGELOG_FILE).parent.mkdir(parents=True)
+    (tmp_path / CHANGELOG_FILE).write_bytes(changelog(*RELEASES[1:]))
+    assert refresh_index(tmp_path) == 3
+    (tmp_path / CHANGELOG_FILE).write_bytes(changelog(*RELEASES))
+    assert main(["--docs-dir", str(tmp_path), "build"]) == 0
+    assert load_index(tmp_path)["releases"][0]["version"] == "1.0.100"
+    (tmp_path / CHANGELOG_FILE).unlink()
+    capsys.readouterr()
+
+    assert main(["--docs-dir", str(tmp_path), "query", "since", "1.0.80"]) == 0
+    out = capsys.readouterr().out
+    assert "## 1.0.100" in out and "## 1.0.99" in out and "1.0.80" not in out
+
+    assert main(["--docs-dir", str(tmp_path), "query", "1.0.80", "to", "1.0.99"]) == 0
+    assert "## 1.0.80" in capsys.readouterr().out
+
+    assert main(["--docs-dir", str(tmp_path), "query", "hooks"]) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        "1.0.100: Added hooks for session start",
+        "1.0.80: Added `PreToolUse` hooks",
+    ]
+
+    assert main(["--docs-dir", str(tmp_path), "query", "since", "1.0.100"]) == 1
+    assert (tmp_path / INDEX_FILE).exists()
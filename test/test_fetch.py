@@ -63,13 +63,14 @@ def test_sources():
                     print(f"  Will save as: {filename}")
 
                     # Actually fetch it
-                    filename, content = fetch_markdown_content(
+                    result = fetch_markdown_content(
                         test_page,
                         session,
                         base_url,
                         source_key,
                         source_config['preserve_hierarchy']
                     )
+                    filename, content = result.filename, result.content
                     print(f"  ✓ Fetched {len(content)} bytes")
                     print(f"  ✓ First 100 chars: {content[:100]}...")
 
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Offline tests for per-request fetch metrics.
+"""
+import json
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import pytest
+
+import fetch_metrics
+from fetch_claude_docs import create_session, fetch_markdown_once, Throttled
+
+PAGE = b"# Hooks\n\nConfigure hooks in your settings.\n" * 200
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path.endswith("throttled.md"):
+            self.send_response(429)
+            self.send_header("Retry-After", "5")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert fetch_metrics.percentile(values, 0.5) == 50
+    assert fetch_metrics.percentile(values, 0.95) == 95
+    assert fetch_metrics.percentile(values, 0.99) == 99
+    assert fetch_metrics.percentile([7], 0.99) == 7
+    assert fetch_metrics.percentile([], 0.5) is None
+
+
+def test_spans_record_timings_bytes_and_outcomes(server, tmp_path):
+    metrics = fetch_metrics.start_run()
+    with create_session(workers=1) as session:
+        url = f"{server}/docs/en/hooks.md"
+        result = fetch_markdown_once(url, "claude-code/hooks.md", session, None, None, tmp_path, "claude-code")
+        fetch_markdown_once(url, "claude-code/hooks.md", session, None, {"etag": result.etag}, tmp_path, "claude-code")
+        fetch_metrics.mark_saved(url, len(PAGE))
+        with pytest.raises(Throttled):
+            fetch_markdown_once(f"{server}/docs/en/throttled.md", "claude-code/throttled.md",
+                                session, None, None, tmp_path, "claude-code")
+
+    first, second, throttled = metrics.spans
+    assert (first.status, first.outcome, first.bytes, first.attempt) == (200, fetch_metrics.FETCHED, len(PAGE), 1)
+    assert first.new_connection and first.connect_ms > 0
+    assert first.ttfb_ms is not None and first.download_ms is not None
+    assert first.total_ms >= first.ttfb_ms
+
+    # The conditional request reused the pooled connection
+    assert (second.status, second.outcome, second.attempt) == (304, fetch_metrics.NOT_MODIFIED, 2)
+    assert not second.new_connection and second.connect_ms == 0
+    assert second.bytes_saved == len(PAGE)
+
+    assert (throttled.status, throttled.outcome) == (429, fetch_metrics.THROTTLED)
+    assert "Rate limited" in throttled.error
+
+    summary = metrics.summary()["claude-code"]
+    assert summary["requests"] == 3
+    assert summary["retries"] == 1
+    assert summary["bytes"] == len(PAGE)
+    assert summary["bytes_saved"] == len(PAGE)
+    assert summary["outcomes"] == {"fetched": 1, "not_modified": 1, "throttled": 1}
+    assert set(summary["latency_ms"]) == {"p50", "p95", "p99"}
+    assert summary["slowest"][0]["name"] in {"claude-code/hooks.md", "claude-code/throttled.md"}
+
+
+def test_new_connection_resolves_the_host_once(server, tmp_path, monkeypatch):
+    lookups = []
+    getaddrinfo = socket.getaddrinfo
+
+    def counting_getaddrinfo(host, *args, **kwargs):
+        lookups.append(host)
+        return getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", counting_getaddrinfo)
+    url = server.replace("127.0.0.1", "localhost") + "/docs/en/hooks.md"
+    metrics = fetch_metrics.start_run()
+    with create_session(workers=1) as session:
+        result = fetch_markdown_once(url, "claude-code/hooks.md", session, None, None, tmp_path, "claude-code")
+
+    assert result.content_hash
+    assert lookups.count("localhost") == 1
+    span, = metrics.spans
+    assert span.new_connection and span.dns_ms > 0
+
+
+def test_unchanged_body_is_reported_as_saved():
+    metrics = fetch_metrics.FetchMetrics()
+    span = metrics.start("https://code.claude.com/docs/en/hooks.md", "claude-code", "claude-code/hooks.md")
+    span.headers_received(200)
+    span.body_received(1000)
+    span.outcome = fetch_metrics.FETCHED
+    span.finish()
+
+    metrics.mark_saved("https://code.claude.com/docs/en/hooks.md", 1000)
+    assert span.outcome == fetch_metrics.UNCHANGED
+    assert metrics.summary()["claude-code"]["bytes_saved"] == 1000
+
+
+def test_exports(tmp_path):
+    metrics = fetch_metrics.FetchMetrics()
+    for i, ms in enumerate([10, 20, 30]):
+        span = metrics.start(f"https://platform.claude.com/docs/en/page{i}.md", "platform", f"platform/page{i}.md")
+        span.headers_received(200)
+        span.body_received(100)
+        span.outcome = fetch_metrics.FETCHED
+        span.total_ms = ms
+
+    trace = tmp_path / "trace.jsonl"
+    metrics.write_trace(trace)
+    lines = [json.loads(line) for line in trace.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["platform/page0.md", "platform/page1.md", "platform/page2.md"]
+    assert lines[0]["host"] == "platform.claude.com"
+
+    prom = tmp_path / "fetch.prom"
+    metrics.write_prometheus(prom, {"duration_seconds": 1.5})
+    text = prom.read_text()
+    assert 'claude_docs_fetch_requests_total{source="platform",outcome="fetched"} 3' in text
+    assert 'claude_docs_fetch_request_duration_seconds{source="platform",quantile="0.5"} 0.02' in text
+    assert 'claude_docs_fetch_request_duration_seconds_count{source="platform"} 3' in text
+    assert "# TYPE claude_docs_fetch_duration_seconds gauge" in text
+    assert "claude_docs_fetch_duration_seconds 1.5" in text
+    assert not list(tmp_path.glob(".*.tmp"))
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the SQLite manifest and its JSON view.
+"""
+import json
+import os
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from fetch_claude_docs import load_manifest, query_manifest, parse_args, save_manifest
+from manifest_store import (
+    MANIFEST_DB,
+    MANIFEST_FILE,
+    file_hashes,
+    get_entry,
+    main,
+    open_manifest,
+    read_manifest,
+    source_files,
+    write_manifest,
+)
+
+HASH = "35d135909a864653a39f1fa5b2f606453332ac12ea49c5cafdf99c754cc9f7a2"
+
+MANIFEST = {
+    "files": {
+        "claude-code/hooks.md": {
+            "source": "claude-code",
+            "source_name": "Claude Code",
+            "original_url": "https://code.claude.com/docs/en/hooks",
+            "original_md_url": "https://code.claude.com/docs/en/hooks.md",
+            "hash": HASH,
+            "last_updated": "2026-01-24T03:29:43.596901",
+            "etag": '"abc"',
+            "lastmod": "2026-01-20",
+        },
+        "claude-code/changelog.md": {
+            "source": "claude-code",
+            "source_name": "Claude Code Changelog",
+            "original_url": "https://github.com/anthropics/claude-code/blob/main/CHANGELOG.md",
+            "original_raw_url": "https://raw.githubusercontent.com/anthropics/claude-code/main/CHANGELOG.md",
+            "hash": "not-a-sha256",
+            "last_updated": "2026-01-28T09:14:02.201880",
+            "type": "changelog",
+        },
+        "platform/intro.md": {
+            "source": "platform",
+            "source_name": "Claude Platform API",
+            "original_url": "https://platform.claude.com/docs/en/intro",
+            "original_md_url": "https://platform.claude.com/docs/en/intro.markdown",
+            "hash": HASH,
+            "last_updated": None,
+        },
+    },
+    "sources": {"platform": {"name": "Claude Platform API", "failed_pages": []}},
+    "fetch_metadata": {"total_files": 3},
+}
+
+
+def test_entries_round_trip_exactly(tmp_path):
+    assert write_manifest(tmp_path / MANIFEST_DB, MANIFEST) == 3
+    conn = open_manifest(tmp_path)
+    assert read_manifest(conn) == MANIFEST
+    assert list(read_manifest(conn)) == ["files", "sources", "fetch_metadata"]
+    assert get_entry(conn, "claude-code/changelog.md") == MANIFEST["files"]["claude-code/changelog.md"]
+    assert get_entry(conn, "claude-code/missing.md") is None
+    assert source_files(conn, "claude-code") == ["claude-code/changelog.md", "claude-code/hooks.md"]
+    assert file_hashes(conn)["platform/intro.md"] == HASH
+
+    # Source names and hosts are stored once, not per entry
+    assert conn.execute("SELECT COUNT(*) FROM origins").fetchone()[0] == 3
+
+
+def test_rewrite_touches_only_changed_rows(tmp_path):
+    live = tmp_path / "live"
+    staging = tmp_path / "staging"
+    live.mkdir()
+    staging.mkdir()
+    write_manifest(live / MANIFEST_DB, MANIFEST)
+    assert write_manifest(live / MANIFEST_DB, MANIFEST) == 0
+
+    manifest = json.loads(json.dumps(MANIFEST))
+    manifest["files"]["claude-code/hooks.md"]["hash"] = "0" * 64
+    del manifest["files"]["platform/intro.md"]
+    assert write_manifest(staging / MANIFEST_DB, manifest, base=live / MANIFEST_DB) == 2
+
+    assert read_manifest(open_manifest(staging)) == manifest
+    assert read_manifest(open_manifest(live)) == MANIFEST
+    assert open_manifest(tmp_path) is None
+
+
+def test_fetcher_reads_the_database_and_exports_json(tmp_path):
+    save_manifest(tmp_path, json.loads(json.dumps(MANIFEST)))
+    exported = json.loads((tmp_path / MANIFEST_FILE).read_text())
+    assert exported["files"] == MANIFEST["files"]
+
+    conn = open_manifest(tmp_path)
+    assert conn is not None
+    conn.close()
+    assert load_manifest(tmp_path)["files"] == MANIFEST["files"]
+
+    # A JSON newer than the database (e.g., from a git pull) makes it a stale cache
+    (tmp_path / MANIFEST_FILE).write_text('{"files": {}}')
+    json_mtime = (tmp_path / MANIFEST_FILE).stat().st_mtime
+    os.utime(tmp_path / MANIFEST_DB, (json_mtime - 10, json_mtime - 10))
+    assert open_manifest(tmp_path) is None
+    assert load_manifest(tmp_path)["files"] == {}
+
+    # Rebuilding it from the JSON makes it current again
+    assert main(["--docs-dir", str(tmp_path), "import"]) == 0
+    assert load_manifest(tmp_path)["files"] == {}
+    assert open_manifest(tmp_path) is not None
+
+
+def test_manifest_show_answers_from_the_database(tmp_path, capsys):
+    write_manifest(tmp_path / MANIFEST_DB, MANIFEST)
+    assert query_manifest(parse_args(["manifest", "--docs-dir", str(tmp_path), "show", "platform/intro"])) == 0
+    assert json.loads(capsys.readouterr().out) == MANIFEST["files"]["platform/intro.md"]
+    assert query_manifest(parse_args(["manifest", "--docs-dir", str(tmp_path), "list", "--source", "platform"])) == 0
+    assert capsys.readouterr().out.split() == ["platform/intro.md"]
+
+
+def test_cli_import_and_export(tmp_path):
+    (tmp_path / MANIFEST_FILE).write_text(json.dumps(MANIFEST))
+    assert main(["--docs-dir", str(tmp_path), "import"]) == 0
+    (tmp_path / MANIFEST_FILE).unlink()
+    assert main(["--docs-dir", str(tmp_path), "export"]) == 0
+    assert json.loads((tmp_path / MANIFEST_FILE).read_text()) == MANIFEST
+    assert main(["--docs-dir", str(tmp_path / "missing"), "export"]) == 1
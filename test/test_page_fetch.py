@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Offline tests for fetching pages from the mock docs server.
+"""
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import pytest
+import requests
+
+import fetch_claude_docs
+from fetch_claude_docs import (
+    DOC_SOURCES,
+    HEADERS,
+    HostRateLimiter,
+    RetryLater,
+    RetryScheduler,
+    FetchResult,
+    conditional_headers,
+    fetch_markdown_content,
+    hash_content,
+    is_unchanged_in_sitemap,
+    needs_full_sweep,
+    process_page,
+    url_to_safe_filename,
+)
+from mock_docs_server import MockDocsServer
+
+
+def fetch(site, session, path, limiter, scheduler=None):
+    return fetch_markdown_content(path, session, site.base_url, "platform", True, limiter, scheduler=scheduler)
+
+
+def test_limiter_spaces_requests_after_the_burst():
+    limiter = HostRateLimiter(rate=20.0, burst=2)
+    with MockDocsServer(pages=6, page_bytes=1024) as site, requests.Session() as session:
+        start = time.monotonic()
+        for path in site.paths:
+            fetch(site, session, path, limiter)
+        elapsed = time.monotonic() - start
+
+    # Two requests go out at once, the other four one token (50ms) apart
+    assert site.counts["200"] == 6
+    assert 0.18 <= elapsed < 1.5
+
+
+def test_limiter_backs_off_for_the_retry_after_of_a_429():
+    limiter = HostRateLimiter(rate=1000.0, burst=10)
+    with MockDocsServer(pages=1, page_bytes=1024, throttle_rate=1.0, retry_after=1) as site, \
+            requests.Session() as session:
+        # Only the first request is answered with 429
+        threading.Timer(0.2, setattr, (site, "throttle_rate", 0.0)).start()
+        start = time.monotonic()
+        result = fetch(site, session, site.paths[0], limiter, RetryScheduler(limiter))
+        elapsed = time.monotonic() - start
+
+    assert result.content_hash
+    assert site.counts["429"] == 1 and site.counts["200"] == 1
+    assert elapsed >= 0.9
+
+
+def test_long_retry_after_pauses_the_whole_host():
+    limiter = HostRateLimiter()
+    scheduler = RetryScheduler(limiter)
+    with MockDocsServer(pages=2, page_bytes=1024, throttle_rate=1.0, retry_after=3600) as site, \
+            MockDocsServer(pages=1, page_bytes=1024) as other, requests.Session() as session:
+        with pytest.raises(RetryLater):
+            fetch(site, session, site.paths[0], limiter, scheduler)
+        assert limiter.paused_for(f"{site.base_url}{site.paths[1]}.md") > 3000
+
+        # Other pages of the host are deferred without another request
+        with pytest.raises(RetryLater):
+            fetch(site, session, site.paths[1], limiter, scheduler)
+        assert site.counts["429"] == 1
+
+        # Other hosts are unaffected
+        assert fetch(other, session, other.paths[0], limiter, scheduler).content_hash
+
+
+def test_conditional_headers_carry_the_stored_validators():
+    assert conditional_headers(None) == HEADERS
+    assert conditional_headers({"hash": "abc"}) == HEADERS
+    headers = conditional_headers({"etag": '"v1"', "last_modified": "Wed, 01 Jan 2026 00:00:00 GMT"})
+    assert headers["If-None-Match"] == '"v1"'
+    assert headers["If-Modified-Since"] == "Wed, 01 Jan 2026 00:00:00 GMT"
+    assert "If-None-Match" not in HEADERS
+
+
+def test_not_modified_page_keeps_its_hash_and_file(tmp_path):
+    source = DOC_SOURCES["platform"]
+    with MockDocsServer(pages=1, page_bytes=2048) as site, requests.Session() as session:
+        path = site.paths[0]
+        filename, entry = process_page(path, session, site.base_url, "platform", source, tmp_path, {})
+        target = tmp_path / filename
+        assert target.read_bytes() == site.body(path)
+        manifest = {"files": {filename: entry}}
+        before = target.stat()
+
+        _, revalidated = process_page(path, session, site.base_url, "platform", source, tmp_path, manifest)
+        assert site.counts["304"] == 1
+        assert revalidated["hash"] == entry["hash"] and revalidated["etag"] == entry["etag"]
+        assert revalidated["last_updated"] == entry["last_updated"]
+        assert target.stat().st_ino == before.st_ino and target.stat().st_mtime_ns == before.st_mtime_ns
+        assert [p.name for p in target.parent.iterdir()] == [target.name]
+
+        # Without the local copy a 304 would refer to, the page is fetched in full
+        target.unlink()
+        _, refetched = process_page(path, session, site.base_url, "platform", source, tmp_path, manifest)
+        assert site.counts == {"sitemap": 0, "200": 2, "304": 1, "404": 0, "429": 0}
+        assert refetched["hash"] == entry["hash"] and target.exists()
+
+        site.change([path])
+        _, changed = process_page(path, session, site.base_url, "platform", source, tmp_path, manifest)
+        assert site.counts["200"] == 3
+        assert changed["hash"] != entry["hash"] and changed["etag"] != entry["etag"]
+        assert target.read_bytes() == site.body(path)
+
+
+def test_full_sweep_is_due_when_missing_or_old():
+    def manifest(hours_ago):
+        return {"fetch_metadata": {"last_full_sweep": (datetime.now() - timedelta(hours=hours_ago)).isoformat()}}
+
+    assert needs_full_sweep({}, 24)
+    assert needs_full_sweep({"fetch_metadata": {"last_full_sweep": "not a date"}}, 24)
+    assert needs_full_sweep(manifest(25), 24)
+    assert not needs_full_sweep(manifest(1), 24)
+
+
+def test_unchanged_lastmod_requires_the_entry_and_the_file(tmp_path):
+    source = DOC_SOURCES["platform"]
+    (tmp_path / "platform").mkdir()
+    (tmp_path / "platform" / "intro.md").write_text("# Intro\n")
+    manifest = {"files": {"platform/intro.md": {"hash": "abc", "lastmod": "2026-01-01"}}}
+
+    assert is_unchanged_in_sitemap("/docs/en/intro", "2026-01-01", "platform", source, tmp_path, manifest)
+    assert not is_unchanged_in_sitemap("/docs/en/intro", "2026-01-02", "platform", source, tmp_path, manifest)
+    assert not is_unchanged_in_sitemap("/docs/en/intro", None, "platform", source, tmp_path, manifest)
+    assert not is_unchanged_in_sitemap("/docs/en/other", "2026-01-01", "platform", source, tmp_path, manifest)
+    (tmp_path / "platform" / "intro.md").unlink()
+    assert not is_unchanged_in_sitemap("/docs/en/intro", "2026-01-01", "platform", source, tmp_path, manifest)
+
+
+def test_incremental_runs_refetch_changed_lastmods_and_sweep_when_due(tmp_path, monkeypatch):
+    changelog = "# Changelog\n\n## 1.0.0\n\n- Added a feature to the code\n"
+    monkeypatch.setattr(fetch_claude_docs, "fetch_changelog", lambda *args: FetchResult(
+        "changelog.md", changelog, content_hash=hash_content(changelog)))
+
+    with MockDocsServer(pages=4, page_bytes=1024) as code, MockDocsServer(pages=4, page_bytes=1024) as platform:
+        for source_key, site in (("claude-code", code), ("platform", platform)):
+            monkeypatch.setitem(DOC_SOURCES[source_key], "sitemap_urls", [site.sitemap_url])
+
+        def run(*args):
+            fetch_claude_docs.main(["--docs-dir", str(tmp_path), "--workers", "4", "--incremental", *args])
+            return code.counts["200"] + platform.counts["200"], code.counts["304"] + platform.counts["304"]
+
+        # No sweep recorded yet: every page is fetched
+        assert run() == (8, 0)
+
+        # Unchanged lastmods are skipped without a request
+        assert run() == (8, 0)
+
+        # A changed lastmod is refetched
+        code.change([code.paths[0]])
+        assert run() == (9, 0)
+        manifest = json.loads((tmp_path / "docs_manifest.json").read_text())
+        filename = url_to_safe_filename(code.paths[0], "claude-code", DOC_SOURCES["claude-code"]["preserve_hierarchy"])
+        assert manifest["files"][filename]["lastmod"] == "2026-01-02"
+
+        # Once the sweep is due, every page is revalidated
+        manifest["fetch_metadata"]["last_full_sweep"] = (datetime.now() - timedelta(days=30)).isoformat()
+        (tmp_path / "docs_manifest.json").write_text(json.dumps(manifest))
+        assert run() == (9, 8)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the shared retry scheduler.
+"""
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import pytest
+import requests
+
+import fetch_claude_docs
+from fetch_claude_docs import HostRateLimiter, RetryScheduler, RetryLater, Throttled
+
+HOST_A = "https://code.claude.com/docs/en/"
+HOST_B = "https://platform.claude.com/docs/en/"
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(fetch_claude_docs, "RETRY_DELAY", 0.01)
+
+
+def flaky(failures, value):
+    """An attempt that raises each of `failures` in turn, then returns value."""
+    failures = list(failures)
+
+    def attempt():
+        if failures:
+            raise failures.pop(0)
+        return value
+    return attempt
+
+
+def test_throttled_host_does_not_hold_up_other_hosts():
+    scheduler = RetryScheduler()
+    tasks = [(HOST_A + "hooks.md", flaky([Throttled(0.3)], "a"))]
+    tasks += [(HOST_B + f"page{i}.md", flaky([], f"b{i}")) for i in range(3)]
+    order = []
+
+    start = time.monotonic()
+    results = scheduler.run(tasks, workers=1, on_complete=lambda i, result, error: order.append(result))
+
+    assert [result for result, _ in results] == ["a", "b0", "b1", "b2"]
+    # With one worker, host B finished while host A was parked, not slept on
+    assert order == ["b0", "b1", "b2", "a"]
+    assert time.monotonic() - start < 2
+
+
+def run_rate_limited(hosts, pages):
+    """Wall time of fetching `pages` pages from each host, listed host by host, as fetch_markdown_once does."""
+    limiter = HostRateLimiter(rate=20.0, burst=2)
+    scheduler = RetryScheduler(limiter)
+
+    def page(url):
+        def attempt():
+            limiter.acquire(url)
+            time.sleep(0.005)
+            return url
+        return attempt
+
+    tasks = [(url, page(url)) for url in (host + f"page{i}.md" for host in hosts for i in range(pages))]
+    start = time.monotonic()
+    results = scheduler.run(tasks, workers=8)
+    assert all(error is None for _, error in results)
+    return time.monotonic() - start
+
+
+def test_rate_limited_hosts_proceed_independently():
+    one_host = run_rate_limited([HOST_A], 20)
+    two_hosts = run_rate_limited([HOST_A, HOST_B], 20)
+    # Waiting for host A's tokens must not tie up the workers host B needs
+    assert one_host > 0.8
+    assert two_hosts < one_host * 1.3
+
+
+def test_try_acquire_reports_the_wait_for_the_next_token():
+    limiter = HostRateLimiter(rate=10.0, burst=1)
+    assert limiter.try_acquire(HOST_A + "a.md") == 0
+    assert 0.05 < limiter.try_acquire(HOST_A + "b.md") <= 0.1
+    assert limiter.try_acquire(HOST_B + "c.md") == 0
+
+    # A token taken for a worker isn't charged again by its acquire()
+    limiter.prepaid(HOST_A + "b.md")
+    start = time.monotonic()
+    limiter.acquire(HOST_A + "b.md")
+    assert time.monotonic() - start < 0.05
+
+
+def test_long_retry_after_defers_to_a_later_run():
+    scheduler = RetryScheduler()
+    results = scheduler.run([(HOST_A + "hooks.md", flaky([Throttled(3600)], "a"))], workers=2)
+    result, error = results[0]
+    assert result is None
+    assert isinstance(error, RetryLater) and error.delay == 3600
+
+    # The pause applies to the whole host
+    assert scheduler.host_delay(HOST_A + "other.md") > 3000
+    assert scheduler.host_delay(HOST_B + "intro.md") == 0
+
+
+def test_circuit_opens_after_repeated_failures():
+    scheduler = RetryScheduler(max_attempts=10, failure_threshold=3)
+    calls = []
+
+    def always_down():
+        calls.append(1)
+        raise requests.exceptions.ConnectionError("connection refused")
+
+    tasks = [(HOST_A + f"page{i}.md", always_down) for i in range(5)]
+    tasks.append((HOST_B + "intro.md", flaky([], "ok")))
+    results = scheduler.run(tasks, workers=1)
+
+    assert len(calls) == 3
+    assert all(isinstance(error, RetryLater) for _, error in results[:5])
+    assert results[5] == ("ok", None)
+
+
+def test_permanent_errors_are_not_retried():
+    scheduler = RetryScheduler()
+    calls = []
+
+    def invalid():
+        calls.append(1)
+        raise ValueError("Received HTML instead of markdown")
+
+    with pytest.raises(ValueError):
+        scheduler.call(HOST_A + "hooks.md", invalid)
+    assert len(calls) == 1
+
+
+def test_call_retries_transient_errors():
+    scheduler = RetryScheduler()
+    attempt = flaky([requests.exceptions.Timeout("slow"), requests.exceptions.ConnectionError("reset")], "done")
+    assert scheduler.call(HOST_A + "hooks.md", attempt) == "done"
+
+    always = flaky([requests.exceptions.Timeout("slow")] * 5, "never")
+    with pytest.raises(Exception, match="after 3 attempts"):
+        scheduler.call(HOST_B + "intro.md", always)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the full-text search index.
+"""
+import json
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import pytest
+
+from search_index import (
+    tokenize,
+    split_sections,
+    build_index,
+    update_index,
+    ensure_index,
+    diff_hashes,
+    INDEX_FILE,
+    main,
+    index_is_current,
+    search,
+    read_section,
+    locate_sections,
+    reciprocal_rank_fusion,
+)
+
+DOCS = {
+    "claude-code/hooks.md": """# Hooks reference
+
+Hooks run shell commands at points in a session.
+
+## PreToolUse
+
+Runs before a tool call. Set `ANTHROPIC_BEDROCK_BASE_URL` to route requests.
+
+```bash
+# Not a heading
+echo hook
+```
+
+## PostToolUse
+
+Runs after a tool call succeeds.
+""",
+    "claude-code/cli-reference.md": """# CLI reference
+
+## CLI flags
+
+Use `--permission-mode plan` to start in plan mode.
+""",
+}
+
+
+@pytest.fixture
+def docs_dir(tmp_path):
+    files = {}
+    for filename, content in DOCS.items():
+        path = tmp_path / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        files[filename] = {"hash": str(len(content))}
+    (tmp_path / "docs_manifest.json").write_text(json.dumps({"files": files}))
+    return tmp_path
+
+
+def test_tokenize_keeps_identifiers_and_parts():
+    tokens = tokenize("Set ANTHROPIC_BEDROCK_BASE_URL and PreToolUse with --permission-mode")
+    for token in ["anthropic_bedrock_base_url", "bedrock", "pretooluse", "tool", "permission-mode", "mode"]:
+        assert token in tokens
+    assert "and" not in tokens
+
+
+def test_split_sections_ignores_headings_in_code_blocks():
+    content = DOCS["claude-code/hooks.md"].encode()
+    headings = [heading for heading, _, _ in split_sections(content)]
+    assert headings == ["Hooks reference", "PreToolUse", "PostToolUse"]
+
+    sections = list(split_sections(content))
+    assert sections[0][1] == 0 and sections[-1][2] == len(content)
+
+
+def test_search_ranks_sections(docs_dir):
+    build_index(docs_dir)
+    assert index_is_current(docs_dir)
+
+    results = search(docs_dir, "PreToolUse")
+    assert results[0]["path"] == "claude-code/hooks.md"
+    assert results[0]["heading"] == "PreToolUse"
+    assert results[0]["anchor"] == "pretooluse"
+    assert "Runs before a tool call" in read_section(docs_dir, results[0])
+
+    results = search(docs_dir, "--permission-mode")
+    assert results[0]["topic"] == "claude-code/cli-reference"
+
+    assert search(docs_dir, "the and of") == []
+
+
+def test_search_without_build_never_indexes_inline(docs_dir, capsys):
+    # The /docs helper falls back to grep rather than wait for a first build
+    assert main(["--docs-dir", str(docs_dir), "search", "--no-build", "PreToolUse"]) == 2
+    assert not (docs_dir / INDEX_FILE).exists()
+    assert capsys.readouterr().out == ""
+
+    assert main(["--docs-dir", str(docs_dir), "update"]) == 0
+    assert main(["--docs-dir", str(docs_dir), "search", "--no-build", "PreToolUse"]) == 0
+    assert capsys.readouterr().out.splitlines()[0] == "claude-code/hooks — PreToolUse"
+
+
+def test_index_goes_stale_when_manifest_changes(docs_dir):
+    build_index(docs_dir)
+    manifest = json.loads((docs_dir / "docs_manifest.json").read_text())
+    manifest["files"]["claude-code/hooks.md"]["hash"] = "changed"
+    (docs_dir / "docs_manifest.json").write_text(json.dumps(manifest))
+    assert not index_is_current(docs_dir)
+
+
+def test_diff_hashes():
+    added, changed, removed = diff_hashes({"a": "1", "b": "2", "c": "3"}, {"a": "1", "b": "x", "d": "4"})
+    assert (added, changed, removed) == ({"d"}, {"b"}, {"c"})
+
+
+def test_update_index_only_touches_changed_files(docs_dir):
+    ensure_index(docs_dir)
+    assert update_index(docs_dir) == (0, 0, 0)
+
+    manifest = json.loads((docs_dir / "docs_manifest.json").read_text())
+    (docs_dir / "claude-code/hooks.md").write_text("# Hooks reference\n\n## SessionStart\n\nRuns when a session starts.\n")
+    manifest["files"]["claude-code/hooks.md"]["hash"] = "changed"
+    (docs_dir / "claude-code/new.md").write_text("# Sandboxing\n\nFilesystem isolation for bash commands.\n")
+    manifest["files"]["claude-code/new.md"] = {"hash": "new"}
+    del manifest["files"]["claude-code/cli-reference.md"]
+    (docs_dir / "docs_manifest.json").write_text(json.dumps(manifest))
+
+    assert update_index(docs_dir) == (1, 1, 1)
+    assert index_is_current(docs_dir)
+    assert search(docs_dir, "PreToolUse") == []
+    assert search(docs_dir, "SessionStart")[0]["heading"] == "SessionStart"
+    assert search(docs_dir, "isolation")[0]["path"] == "claude-code/new.md"
+    assert search(docs_dir, "--permission-mode") == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60)
+    keys = [key for key, _ in fused]
+    assert keys[0] == "c"
+    assert keys[1:] == ["a", "b", "d"]  # b and d tie; first seen wins
+    assert fused[0][1] == pytest.approx(1 / 63 + 1 / 61)
+
+
+def test_locate_sections_maps_offsets_to_sections(docs_dir):
+    build_index(docs_dir)
+    content = DOCS["claude-code/hooks.md"]
+    offset = content.index("Runs after a tool call")
+    file_hash = str(len(content))
+
+    section, stale = locate_sections(docs_dir, [
+        ("claude-code/hooks.md", file_hash, offset),
+        ("claude-code/hooks.md", "old-hash", offset),
+    ])
+    assert section["heading"] == "PostToolUse"
+    assert section["start"] <= offset < section["end"]
+    assert stale is None
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Offline tests for semantic search, with a stub in place of the embedding model.
+"""
+import hashlib
+import importlib.util
+import json
+import socket
+import stat
+import sys
+import threading
+import time
+import zlib
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import numpy as np
+import pytest
+
+from search_index import build_index as build_lexical_index, search as lexical_search, split_sections
+
+# The script's file name isn't importable as a module name
+_spec = importlib.util.spec_from_file_location(
+    'semantic_search', Path(__file__).resolve().parent.parent / 'scripts' / 'semantic-search.py'
+)
+semantic_search = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(semantic_search)
+
+CHUNK_BYTES = semantic_search.CHUNK_BYTES
+
+PARAGRAPH = "Hooks run shell commands " * 6 + "\n\n"
+
+DOCS = {
+    "claude-code/hooks.md": "# Hooks reference\n\nHooks run shell commands.\n\n"
+                            "## PreToolUse\n\n" + PARAGRAPH * 20 + "## PostToolUse\n\nRuns after a tool call.\n",
+    "claude-code/settings.md": "# Settings\n\nSettings live in `settings.json`.\n\n"
+                               "## Permissions\n\nAllow or deny tools with permission rules.\n",
+}
+
+
+class StubModel:
+    """Bag-of-words encoder standing in for the sentence-transformers model."""
+
+    dimension = 32
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size=None):
+        self.encoded.extend(texts)
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % self.dimension] += 1
+        return vectors
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+
+@pytest.fixture
+def docs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(semantic_search, "DOCS_DIR", tmp_path)
+    monkeypatch.setattr(semantic_search, "EMBEDDINGS_PATH", tmp_path / "_embeddings.npy")
+    monkeypatch.setattr(semantic_search, "METADATA_PATH", tmp_path / "_embeddings_meta.json")
+    monkeypatch.setattr(semantic_search, "LEGACY_INDEX_PATH", tmp_path / "_search_index.json")
+    monkeypatch.setattr(semantic_search, "SOCKET_PATH", tmp_path / "_search.sock")
+    monkeypatch.setattr(semantic_search, "_model", StubModel())
+    monkeypatch.setattr(semantic_search, "_loaded_index", {})
+    write_docs(tmp_path, DOCS)
+    return tmp_path
+
+
+def write_docs(docs_dir, docs):
+    """Write markdown files and a manifest listing their hashes."""
+    files = {}
+    for filename, content in docs.items():
+        path = docs_dir / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        files[filename] = {"hash": hashlib.sha256(content.encode()).hexdigest()}
+    (docs_dir / "docs_manifest.json").write_text(json.dumps({"files": files}))
+
+
+def test_chunks_cover_the_file_without_crossing_headings():
+    content = DOCS["claude-code/hooks.md"].encode()
+    chunks = list(semantic_search.chunk_markdown(content))
+    sections = list(split_sections(content))
+
+    assert chunks[0][1] == 0 and chunks[-1][2] == len(content)
+    for (_, _, end), (_, start, _) in zip(chunks, chunks[1:]):
+        assert end == start
+    for heading, start, end in chunks:
+        assert any(h == heading and s <= start and end <= e for h, s, e in sections)
+
+    # The long section is split at blank lines into chunks that fit
+    long_chunks = [c for c in chunks if c[0] == "PreToolUse"]
+    assert len(long_chunks) > 1
+    for _, start, end in long_chunks:
+        assert end - start <= CHUNK_BYTES + len(PARAGRAPH)
+    for _, _, end in long_chunks[:-1]:
+        assert content[:end].endswith(b"\n\n")
+
+
+def test_section_without_blank_lines_is_cut_at_line_ends():
+    content = ("## Reference\n" + "A line of reference text.\n" * 200).encode()
+    chunks = list(semantic_search.chunk_markdown(content))
+    assert len(chunks) > 1
+    for _, start, end in chunks:
+        assert content[end - 1:end] == b"\n"
+        assert end - start < CHUNK_BYTES + 30
+
+
+def rows_by_file(docs_dir):
+    embeddings, metadata = semantic_search.load_index()
+    rows = {}
+    for row in range(len(metadata["chunks"])):
+        chunk = semantic_search.chunk_info(metadata, row)
+        rows.setdefault(chunk["file"], []).append(np.array(embeddings[row]))
+    return rows
+
+
+def embedded_texts(content):
+    """The texts build_index() encodes for a file: each chunk prefixed with its heading."""
+    data = content.encode()
+    return [f"{heading}\n{data[start:end].decode()}" for heading, start, end in semantic_search.chunk_markdown(data)]
+
+
+def test_rebuild_embeds_only_changed_files(docs_dir):
+    model = semantic_search._model
+    semantic_search.build_index()
+    first = rows_by_file(docs_dir)
+    assert sorted(model.encoded) == sorted(text for content in DOCS.values() for text in embedded_texts(content))
+
+    model.encoded.clear()
+    semantic_search.build_index()
+    assert model.encoded == []
+
+    settings = DOCS["claude-code/settings.md"] + "\n## Sandbox\n\nRun bash commands in isolation.\n"
+    write_docs(docs_dir, {**DOCS, "claude-code/settings.md": settings})
+    semantic_search.build_index()
+    assert model.encoded == embedded_texts(settings)
+    second = rows_by_file(docs_dir)
+    assert len(second["claude-code/settings.md"]) == len(first["claude-code/settings.md"]) + 1
+    assert len(second["claude-code/hooks.md"]) == len(first["claude-code/hooks.md"])
+    for old, new in zip(first["claude-code/hooks.md"], second["claude-code/hooks.md"]):
+        assert np.array_equal(old, new)
+
+    # A file dropped from the manifest loses its rows without re-embedding the rest
+    model.encoded.clear()
+    write_docs(docs_dir, {"claude-code/hooks.md": DOCS["claude-code/hooks.md"]})
+    semantic_search.build_index()
+    assert model.encoded == []
+    assert list(rows_by_file(docs_dir)) == ["claude-code/hooks.md"]
+
+
+def test_index_is_memory_mapped_and_reloaded_when_replaced(docs_dir):
+    (docs_dir / "_search_index.json").write_text("{}")
+    semantic_search.build_index()
+    assert not (docs_dir / "_search_index.json").exists()
+
+    embeddings, metadata = semantic_search.load_index()
+    assert isinstance(embeddings, np.memmap) and embeddings.dtype == np.float16
+    assert embeddings.shape == (len(metadata["chunks"]), StubModel.dimension)
+    assert semantic_search.load_index()[0] is embeddings
+
+    chunk = semantic_search.chunk_info(metadata, 0)
+    assert chunk["file"] == "claude-code/hooks.md" and chunk["heading"] == "Hooks reference"
+    assert semantic_search.read_chunk(chunk) == DOCS["claude-code/hooks.md"][chunk["start"]:chunk["end"]]
+
+    write_docs(docs_dir, {"claude-code/hooks.md": DOCS["claude-code/hooks.md"]})
+    semantic_search.build_index()
+    assert semantic_search.load_index()[0].shape[0] < embeddings.shape[0]
+
+
+def test_matrix_out_of_sync_with_metadata_is_rejected(docs_dir, capsys):
+    semantic_search.build_index()
+    embeddings, metadata = semantic_search.load_index()
+    rows = len(metadata["chunks"])
+    np.save(docs_dir / "_embeddings.npy", np.array(embeddings[:-1]))
+
+    with pytest.raises(ValueError, match="out of sync"):
+        semantic_search.load_index()
+
+    # A rebuild ignores the broken index and embeds everything again
+    model = semantic_search._model
+    model.encoded.clear()
+    semantic_search.build_index()
+    assert "Ignoring unreadable index" in capsys.readouterr().out
+    assert len(model.encoded) == rows
+    assert semantic_search.load_index()[0].shape[0] == rows
+
+
+def test_top_k_matches_a_full_sort():
+    rng = np.random.default_rng(0)
+    scores = rng.standard_normal(1000).astype(np.float32)
+    for k in (1, 5, 50, 1000, 2000):
+        expected = np.argsort(-scores, kind='stable')[:k]
+        assert np.array_equal(semantic_search.top_k_indices(scores, k), expected)
+    assert len(semantic_search.top_k_indices(scores, 0)) == 0
+
+
+def test_blockwise_scores_match_a_dense_product(monkeypatch):
+    monkeypatch.setattr(semantic_search, "SCORE_BLOCK_ROWS", 7)
+    rng = np.random.default_rng(1)
+    embeddings = semantic_search.normalize(rng.standard_normal((50, 16))).astype(np.float16)
+    queries = semantic_search.normalize(rng.standard_normal((3, 16)))
+
+    scores = semantic_search.score_matrix(embeddings, queries)
+    assert scores.shape == (50, 3) and scores.dtype == np.float32
+    assert np.allclose(scores, embeddings.astype(np.float32) @ queries.T, atol=1e-6)
+
+
+def test_batch_search_matches_single_queries(docs_dir):
+    semantic_search.build_index()
+    queries = ["permission rules", "tool call", "hooks shell commands"]
+    results = semantic_search.search_batch(queries, top_k=3)
+    assert results == [semantic_search.search(query, top_k=3) for query in queries]
+    score, path, heading = results[0][0]
+    assert path == str(docs_dir / "claude-code/settings.md") and heading == "Permissions"
+    assert [hit[0] for hit in results[2]] == sorted((hit[0] for hit in results[2]), reverse=True)
+
+
+def test_hybrid_reranks_only_the_lexical_shortlist(docs_dir, monkeypatch):
+    semantic_search.build_index()
+    build_lexical_index(docs_dir)
+    scored_rows = []
+    score_matrix = semantic_search.score_matrix
+
+    def recording_score_matrix(embeddings, query_embeddings):
+        scored_rows.append(embeddings.shape[0])
+        return score_matrix(embeddings, query_embeddings)
+    monkeypatch.setattr(semantic_search, "score_matrix", recording_score_matrix)
+
+    results = semantic_search.hybrid_search_batch(["permission rules"], top_k=5)[0]
+    shortlist = {(str(docs_dir / hit["path"]), hit["heading"]) for hit in lexical_search(docs_dir, "permission rules", 50)}
+    assert results[0][1:] == (str(docs_dir / "claude-code/settings.md"), "Permissions")
+    assert {(path, heading) for _, path, heading in results} <= shortlist
+
+    # Only the chunks of the shortlisted file were scored, not the whole matrix
+    _, metadata = semantic_search.load_index()
+    settings_rows = [chunk for chunk in metadata["chunks"] if metadata["files"][chunk[0]][0] == "claude-code/settings.md"]
+    assert scored_rows == [len(settings_rows)]
+    assert len(settings_rows) < len(metadata["chunks"])
+
+    # A query BM25 finds nothing for still gets the embedding ranking
+    assert semantic_search.hybrid_search_batch(["isolation"], top_k=2) == semantic_search.search_batch(["isolation"], 2)
+
+
+def test_hybrid_lists_each_section_once_when_the_indexes_disagree(docs_dir):
+    semantic_search.build_index()
+    # The page changes and only the lexical index is rebuilt, so the embedded
+    # chunks of hooks.md no longer line up with its sections
+    hooks = DOCS["claude-code/hooks.md"].replace("# Hooks reference\n\n", "# Hooks reference\n\nSee also settings.\n\n")
+    write_docs(docs_dir, {**DOCS, "claude-code/hooks.md": hooks})
+    build_lexical_index(docs_dir)
+
+    query = "hooks run shell commands after a tool call"
+    results = semantic_search.hybrid_search_batch([query], top_k=10)[0]
+    keys = [(path, heading) for _, path, heading in results]
+    assert len(keys) == len(set(keys))
+    assert keys == [(str(docs_dir / hit["path"]), hit["heading"]) for hit in lexical_search(docs_dir, query, 10)]
+
+
+def test_search_falls_back_to_in_process_without_a_daemon(docs_dir):
+    semantic_search.build_index()
+    expected = semantic_search.search_batch(["permission rules"], 3)
+    socket_path = docs_dir / "_search.sock"
+
+    assert semantic_search.query_daemon(["permission rules"], 3, socket_path, timeout=1) is None
+    assert semantic_search.search_via_daemon(["permission rules"], 3) == expected
+
+    # A socket file left behind by a daemon that died is no better than none
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(str(socket_path))
+    assert socket_path.exists()
+    assert semantic_search.search_via_daemon(["permission rules"], 3) == expected
+
+
+def test_cli_prints_topics_and_starts_a_daemon_for_next_time(docs_dir, monkeypatch, capsys):
+    semantic_search.build_index()
+    started = []
+    monkeypatch.setattr(semantic_search, "start_daemon", lambda: started.append(True))
+    capsys.readouterr()
+
+    assert semantic_search.main(["search", "--mode", "semantic", "--topics", "--top-k", "1",
+                                 "permission", "rules"]) == 0
+    assert capsys.readouterr().out == "claude-code/settings — Permissions\n"
+    assert started == []
+
+    assert semantic_search.main(["search", "--no-build", "--start-daemon", "--topics", "permission", "rules"]) == 0
+    assert capsys.readouterr().out.splitlines()[0] == "claude-code/settings — Permissions"
+    assert started == [True]
+    assert not (docs_dir / "_lexical_index.db").exists()
+
+
+def test_daemon_answers_like_in_process_search_then_exits_when_idle(docs_dir, monkeypatch):
+    semantic_search.build_index()
+    socket_path = docs_dir / "_search.sock"
+
+    # The socket must never be reachable by other users, not even right after bind()
+    modes = []
+    server_bind = semantic_search.SearchServer.server_bind
+
+    def record_mode(server):
+        server_bind(server)
+        modes.append(stat.S_IMODE(socket_path.stat().st_mode))
+    monkeypatch.setattr(semantic_search.SearchServer, "server_bind", record_mode)
+
+    daemon = threading.Thread(target=semantic_search.serve, args=(socket_path, 1.0), daemon=True)
+    daemon.start()
+    deadline = time.monotonic() + 5
+    while not socket_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    queries = ["permission rules", "tool call"]
+    for mode, search_fn in semantic_search.SEARCH_FUNCTIONS.items():
+        results = semantic_search.query_daemon(queries, 3, socket_path, mode=mode)
+        assert results == [[tuple(hit) for hit in hits] for hits in search_fn(queries, 3)]
+
+    assert modes == [0o600]
+
+    daemon.join(timeout=5)
+    assert not daemon.is_alive() and not socket_path.exists()
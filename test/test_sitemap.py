@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Offline tests for streaming sitemap parsing and page discovery.
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import gzip
+
+import pytest
+
+from fetch_claude_docs import (
+    Sitemap,
+    parse_sitemap_stream,
+    fetch_sitemap,
+    gunzip_stream,
+    discover_documentation_lastmods,
+)
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://platform.claude.com/docs/en/intro</loc><lastmod>2026-01-02</lastmod></url>
+  <url><loc>https://platform.claude.com/docs/en/legacy/old</loc></url>
+  <url><loc>https://platform.claude.com/docs/en/api/overview/</loc><lastmod>2026-01-03</lastmod></url>
+  <url><loc>https://platform.claude.com/pricing</loc></url>
+</urlset>
+"""
+
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_parse_urlset_in_small_chunks():
+    sitemap = parse_sitemap_stream(chunked(URLSET, 7), "https://platform.claude.com/sitemap.xml")
+
+    assert sitemap.base_url == "https://platform.claude.com"
+    assert len(sitemap) == 4
+    assert sitemap.entries["https://platform.claude.com/docs/en/intro"] == "2026-01-02"
+    assert sitemap.entries["https://platform.claude.com/docs/en/legacy/old"] is None
+    assert sitemap.sitemaps == []
+
+
+def test_parse_without_namespace():
+    data = b"<urlset><url><loc>https://code.claude.com/docs/en/hooks</loc></url></urlset>"
+    sitemap = parse_sitemap_stream([data])
+    assert list(sitemap.entries) == ["https://code.claude.com/docs/en/hooks"]
+
+
+def test_parse_rejects_doctype():
+    data = b'<?xml version="1.0"?><!DOCTYPE x [<!ENTITY a "b">]><urlset></urlset>'
+    with pytest.raises(ValueError):
+        parse_sitemap_stream([data])
+
+
+def test_discovery_reuses_parsed_sitemap():
+    sitemap = parse_sitemap_stream([URLSET])
+    pages = discover_documentation_lastmods(None, sitemap, ['/docs/en/'], ['/legacy/'], "Platform")
+
+    assert pages == {
+        "/docs/en/api/overview": "2026-01-03",
+        "/docs/en/intro": "2026-01-02",
+    }
+
+
+def test_empty_sitemap_has_no_base_url():
+    assert Sitemap("https://example.com/sitemap.xml", {}).base_url is None
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        return chunked(self.body, 5)
+
+
+class FakeSession:
+    """Serves canned sitemap bodies by URL and records what was requested."""
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        return FakeResponse(self.bodies[url])
+
+
+def test_gunzip_stream_passes_plain_xml_through():
+    assert b"".join(gunzip_stream(chunked(URLSET, 9))) == URLSET
+
+
+def test_gunzip_stream_decompresses_gzip():
+    assert b"".join(gunzip_stream(chunked(gzip.compress(URLSET), 9))) == URLSET
+
+
+def test_gunzip_stream_caps_output():
+    with pytest.raises(ValueError):
+        b"".join(gunzip_stream([gzip.compress(b"x" * 1000)], max_bytes=100))
+
+
+def test_fetch_sitemap_follows_nested_indexes():
+    index = b"""<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+      <sitemap><loc>https://example.com/a.xml.gz</loc></sitemap>
+      <sitemap><loc>https://example.com/nested.xml</loc></sitemap>
+    </sitemapindex>"""
+    nested = b"""<sitemapindex><sitemap><loc>https://example.com/b.xml</loc></sitemap>
+      <sitemap><loc>https://example.com/index.xml</loc></sitemap></sitemapindex>"""
+    child_a = gzip.compress(b"<urlset><url><loc>https://example.com/docs/en/a</loc>"
+                            b"<lastmod>2026-01-01</lastmod></url></urlset>")
+    child_b = b"<urlset><url><loc>https://example.com/docs/en/b</loc></url></urlset>"
+    session = FakeSession({
+        "https://example.com/index.xml": index,
+        "https://example.com/a.xml.gz": child_a,
+        "https://example.com/nested.xml": nested,
+        "https://example.com/b.xml": child_b,
+    })
+
+    sitemap = fetch_sitemap(session, "https://example.com/index.xml")
+
+    assert sitemap.entries == {
+        "https://example.com/docs/en/a": "2026-01-01",
+        "https://example.com/docs/en/b": None,
+    }
+    assert sitemap.base_url == "https://example.com"
+    # The cycle back to index.xml is not followed
+    assert sorted(session.requested) == sorted(set(session.requested))
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Offline tests for docs snapshots, deltas and the local applier.
+"""
+import hashlib
+import json
+import shutil
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import pytest
+
+from fetch_claude_docs import save_manifest
+from changelog_index import INDEX_FILE as CHANGELOG_INDEX, refresh_index
+from search_index import INDEX_FILE, search
+from snapshot_bundle import (
+    INDEX_JSON,
+    apply_delta,
+    apply_patch,
+    docs_hashes,
+    encode_patch,
+    publish,
+    snapshot_id,
+    update,
+)
+from staged_update import STAGING_DIR
+from topic_index import TOPICS_FILE
+
+
+def long_page(title: str, paragraphs: int = 200) -> str:
+    return f"# {title}\n\n" + "".join(
+        f"Paragraph {n} of {title} describes request field number {n} in detail.\n\n" for n in range(paragraphs)
+    )
+
+
+def write_docs(docs_dir: Path, pages: dict) -> None:
+    """Write pages and a manifest listing exactly them."""
+    files = {}
+    for filename, text in pages.items():
+        (docs_dir / filename).parent.mkdir(parents=True, exist_ok=True)
+        (docs_dir / filename).write_text(text)
+        files[filename] = {"source": filename.split('/')[0], "hash": hashlib.sha256(text.encode()).hexdigest()}
+    for filename in {path.relative_to(docs_dir).as_posix() for path in docs_dir.rglob('*.md')} - pages.keys():
+        (docs_dir / filename).unlink()
+    save_manifest(docs_dir, {"files": files})
+
+
+PAGES = {
+    "claude-code/changelog.md": "# Changelog\n\n## 1.0.1\n\n- Added hooks\n\n## 1.0.0\n\n- First release\n",
+    "claude-code/hooks.md": long_page("Hooks"),
+    "platform/api/go/messages.md": long_page("Messages"),
+    "platform/intro.md": "# Intro\n\nWelcome\n",
+}
+
+
+def test_patch_copies_unchanged_blocks():
+    old = long_page("Messages", 2000).encode()
+    new = old.replace(b"field number 1000 ", b"field number 1000 (deprecated) ") + b"\nAppendix\n"
+    patch = encode_patch(old, new)
+    assert apply_patch(old, patch) == new
+    assert len(patch) < len(new) / 10
+    assert apply_patch(b"", encode_patch(b"", new)) == new
+    with pytest.raises(ValueError):
+        apply_patch(b"something else", patch)
+
+
+def test_update_follows_deltas_to_the_latest_snapshot(tmp_path):
+    server, client, published = tmp_path / "server", tmp_path / "client", tmp_path / "published"
+    write_docs(server, PAGES)
+    first = publish(server, published)
+    assert publish(server, published) is None
+    shutil.copytree(server, client)
+
+    for version in range(2):
+        pages = dict(PAGES)
+        pages["claude-code/hooks.md"] = PAGES["claude-code/hooks.md"].replace("Paragraph 7 ", f"Paragraph 7 v{version} ")
+        pages["platform/new.md"] = f"# New page\n\nAdded in version {version}\n"
+        del pages["platform/intro.md"]
+        write_docs(server, pages)
+        latest = publish(server, published)
+
+    index = json.loads((published / INDEX_JSON).read_text())
+    assert index["latest"] == latest != first
+    assert [delta["to"] for delta in index["deltas"]][-1] == latest
+    assert len(list(published.glob("snapshot-*"))) == 1
+    assert all(delta["size"] < index["snapshot"]["size"] for delta in index["deltas"])
+
+    downloaded = update(client, str(published))
+    assert downloaded == [delta["file"] for delta in index["deltas"]]
+    for filename, text in pages.items():
+        assert (client / filename).read_text() == text
+    assert not (client / "platform" / "intro.md").exists()
+    assert snapshot_id(docs_hashes(client)) == snapshot_id(docs_hashes(server)) == latest
+    assert search(client, "version")[0]["path"] == "platform/new.md"
+    assert update(client, str(published)) == []
+
+
+def test_unknown_local_state_installs_the_full_snapshot(tmp_path):
+    server, client, published = tmp_path / "server", tmp_path / "client", tmp_path / "published"
+    write_docs(server, PAGES)
+    refresh_index(server)
+    publish(server, published)
+    write_docs(client, {"platform/intro.md": "# Local edit\n", "platform/stale.md": "# Stale\n"})
+
+    assert update(client, str(published))[0].startswith("snapshot-")
+    for filename, text in PAGES.items():
+        assert (client / filename).read_text() == text
+    assert (client / CHANGELOG_INDEX).read_bytes() == (server / CHANGELOG_INDEX).read_bytes()
+    assert not (client / "platform" / "stale.md").exists()
+    assert (client / INDEX_FILE).exists()
+
+
+def test_delta_is_refused_or_rolled_back_on_mismatch(tmp_path):
+    server, client, published = tmp_path / "server", tmp_path / "client", tmp_path / "published"
+    write_docs(server, PAGES)
+    publish(server, published)
+    shutil.copytree(server, client)
+    write_docs(server, {**PAGES, "claude-code/hooks.md": long_page("Hooks", 201)})
+    publish(server, published)
+    delta = next(published.glob("delta-*"))
+
+    # Wrong starting snapshot
+    write_docs(client, {**PAGES, "platform/intro.md": "# Changed\n"})
+    with pytest.raises(ValueError):
+        apply_delta(client, delta)
+
+    # Right snapshot id, but a page edited behind the manifest's back
+    write_docs(client, PAGES)
+    (client / "claude-code" / "hooks.md").write_text(long_page("Edited"))
+    with pytest.raises(ValueError):
+        apply_delta(client, delta)
+    assert (client / "claude-code" / "hooks.md").read_text() == long_page("Edited")
+    assert not (client / STAGING_DIR).exists()
+
+
+def test_refetch_without_page_changes_publishes_nothing(tmp_path):
+    server, published = tmp_path / "server", tmp_path / "published"
+    write_docs(server, PAGES)
+    refresh_index(server)
+    first = publish(server, published)
+
+    # A fetch that changed no page still rewrites the manifest's timestamps and statistics
+    manifest = json.loads((server / "docs_manifest.json").read_text())
+    manifest["fetch_metadata"] = {"last_fetch_completed": "2026-10-17T12:00:00", "requests": 120}
+    manifest["sources"] = {"platform": {"pages_fetched": 0, "pages_skipped": 3}}
+    save_manifest(server, manifest)
+    assert publish(server, published) is None
+
+    index = json.loads((published / INDEX_JSON).read_text())
+    assert index["latest"] == first and index["deltas"] == []
+
+
+def test_metadata_only_change_is_a_new_snapshot(tmp_path):
+    server, client, published = tmp_path / "server", tmp_path / "client", tmp_path / "published"
+    write_docs(server, PAGES)
+    (server / TOPICS_FILE).write_text("hooks\tclaude-code/hooks.md\n")
+    first = publish(server, published)
+    shutil.copytree(server, client)
+
+    (server / TOPICS_FILE).write_text("hooks\tclaude-code/hooks.md\nintro\tplatform/intro.md\n")
+    latest = publish(server, published)
+    assert latest != first
+
+    assert update(client, str(published)) == [f"delta-{first}-{latest}.tar.xz"]
+    assert (client / TOPICS_FILE).read_text() == (server / TOPICS_FILE).read_text()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Offline tests for staged, crash-safe docs tree updates.
+"""
+import json
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from staged_update import (
+    StagedUpdate,
+    apply_journal,
+    recover,
+    STAGING_DIR,
+    JOURNAL_FILE,
+    MANIFEST_DB,
+    MANIFEST_FILE,
+)
+
+
+def make_docs(tmp_path):
+    (tmp_path / "claude-code").mkdir()
+    (tmp_path / "claude-code" / "hooks.md").write_text("old hooks")
+    (tmp_path / "claude-code" / "obsolete.md").write_text("going away")
+    (tmp_path / MANIFEST_FILE).write_text('{"version": "old"}')
+    return tmp_path
+
+
+def stage(staging, filename, text):
+    path = staging.path(filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_commit_moves_files_and_manifest(tmp_path):
+    docs = make_docs(tmp_path)
+    staging = StagedUpdate(docs)
+    staging.begin()
+    stage(staging, "claude-code/hooks.md", "new hooks")
+    stage(staging, "platform/intro.md", "intro")
+    stage(staging, MANIFEST_FILE, '{"version": "new"}')
+    stage(staging, MANIFEST_DB, "new database")
+    (staging.path("claude-code") / ".hooks.md.part").write_text("leftover temp file")
+    staging.remove("claude-code/obsolete.md")
+
+    # Nothing is visible before the commit
+    assert (docs / "claude-code" / "hooks.md").read_text() == "old hooks"
+    assert not (docs / "platform").exists()
+
+    staging.commit()
+
+    assert (docs / "claude-code" / "hooks.md").read_text() == "new hooks"
+    assert (docs / "platform" / "intro.md").read_text() == "intro"
+    assert json.loads((docs / MANIFEST_FILE).read_text()) == {"version": "new"}
+    assert (docs / MANIFEST_DB).read_text() == "new database"
+    assert not (docs / "claude-code" / "obsolete.md").exists()
+    assert not (docs / STAGING_DIR).exists()
+
+
+def test_uncommitted_update_is_rolled_back(tmp_path):
+    docs = make_docs(tmp_path)
+    staging = StagedUpdate(docs)
+    staging.begin()
+    stage(staging, "claude-code/hooks.md", "half-finished run")
+
+    assert recover(docs) == "rolled back"
+    assert (docs / "claude-code" / "hooks.md").read_text() == "old hooks"
+    assert not (docs / STAGING_DIR).exists()
+    assert recover(docs) is None
+
+
+def test_committed_update_is_rolled_forward(tmp_path):
+    docs = make_docs(tmp_path)
+    staging = StagedUpdate(docs)
+    staging.begin()
+    stage(staging, "claude-code/hooks.md", "new hooks")
+    stage(staging, "claude-code/sdk.md", "sdk")
+    stage(staging, MANIFEST_FILE, '{"version": "new"}')
+    journal = {
+        "files": ["claude-code/hooks.md", "claude-code/sdk.md"],
+        "manifest": True,
+        "remove": ["claude-code/obsolete.md"],
+    }
+    (staging.dir / JOURNAL_FILE).write_text(json.dumps(journal))
+
+    # Simulate a crash after the first rename
+    (staging.path("claude-code/hooks.md")).replace(docs / "claude-code" / "hooks.md")
+
+    assert recover(docs) == "rolled forward"
+    assert (docs / "claude-code" / "hooks.md").read_text() == "new hooks"
+    assert (docs / "claude-code" / "sdk.md").read_text() == "sdk"
+    assert json.loads((docs / MANIFEST_FILE).read_text()) == {"version": "new"}
+    assert not (docs / "claude-code" / "obsolete.md").exists()
+    assert not (docs / STAGING_DIR).exists()
+
+
+def test_apply_journal_is_idempotent(tmp_path):
+    docs = make_docs(tmp_path)
+    journal = {"files": ["claude-code/hooks.md"], "manifest": False, "remove": []}
+    apply_journal(docs, journal)
+    apply_journal(docs, journal)
+    assert (docs / "claude-code" / "hooks.md").read_text() == "old hooks"
+
+
+def test_begin_with_resume_keeps_uncommitted_files(tmp_path):
+    docs = make_docs(tmp_path)
+    staging = StagedUpdate(docs)
+    staging.begin()
+    stage(staging, "claude-code/hooks.md", "fetched before the crash")
+
+    assert StagedUpdate(docs).begin(resume=True) is True
+    assert staging.path("claude-code/hooks.md").read_text() == "fetched before the crash"
+
+    assert StagedUpdate(docs).begin() is False
+    assert not staging.path("claude-code/hooks.md").exists()
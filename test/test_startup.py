@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Offline tests that the command line tools start without their heavy imports,
+and within an import-time budget.
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS = Path(__file__).resolve().parent.parent / 'scripts'
+
+HEAVY_MODULES = {'requests', 'urllib3', 'numpy', 'sentence_transformers', 'torch'}
+
+# Cumulative import time allowed per module, as reported by `python -X importtime`.
+# fetch_claude_docs takes ~35 ms and the others ~15 ms; requests alone is ~160 ms.
+IMPORT_BUDGET_MS = 100
+
+
+def imported_modules(script):
+    """Import a script in a fresh interpreter and return the modules it loaded."""
+    code = (
+        "import importlib.util, sys\n"
+        f"spec = importlib.util.spec_from_file_location('cli', {str(SCRIPTS / script)!r})\n"
+        "module = importlib.util.module_from_spec(spec)\n"
+        "spec.loader.exec_module(module)\n"
+        "print('\\n'.join(sys.modules))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=SCRIPTS, capture_output=True, text=True, check=True
+    ).stdout
+    return {name.split('.')[0] for name in output.split()}
+
+
+@pytest.mark.parametrize('script', ['fetch_claude_docs.py', 'search_index.py', 'semantic-search.py'])
+def test_import_skips_heavy_dependencies(script):
+    assert not imported_modules(script) & HEAVY_MODULES
+
+
+def import_time_ms(module):
+    """Cumulative import time of a module in a fresh interpreter, best of three runs."""
+    times = []
+    for _ in range(3):
+        stderr = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=SCRIPTS, capture_output=True, text=True, check=True
+        ).stderr
+        # "import time: self [us] | cumulative | imported package"
+        cumulative = next(
+            int(line.split('|')[1])
+            for line in stderr.splitlines()
+            if line.startswith('import time:') and line.split('|')[2].strip() == module
+        )
+        times.append(cumulative / 1000)
+    return min(times)
+
+
+@pytest.mark.parametrize('module', [
+    'fetch_claude_docs', 'search_index', 'manifest_store', 'topic_index', 'changelog_index'
+])
+def test_import_time_budget(module):
+    assert import_time_ms(module) < IMPORT_BUDGET_MS
+
+
+def test_manifest_query_runs_without_network_stack(tmp_path):
+    (tmp_path / 'docs_manifest.json').write_text(
+        '{"files": {"claude-code/hooks.md": {"source": "claude-code", "hash": "abc"}}}'
+    )
+    code = (
+        "import sys\n"
+        "import fetch_claude_docs\n"
+        "try:\n"
+        f"    fetch_claude_docs.main(['manifest', '--docs-dir', {str(tmp_path)!r}, 'list'])\n"
+        "except SystemExit as e:\n"
+        "    assert not e.code, e.code\n"
+        "assert 'requests' not in sys.modules\n"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=SCRIPTS, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert 'claude-code/hooks.md' in result.stdout
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Offline tests for streaming page downloads to disk.
+"""
+import hashlib
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import pytest
+
+from fetch_claude_docs import (
+    VALIDATION_BYTES,
+    DOC_SOURCES,
+    stream_to_temp_file,
+    process_page,
+)
+
+PAGE = ("# Large reference\n\n" + "## Method\n\nCall `client.messages.create()` with [params](#p).\n\n" * 2000).encode()
+
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class FakeResponse:
+    def __init__(self, body: bytes, status_code: int = 200):
+        self.body = body
+        self.status_code = status_code
+        self.headers = {'ETag': '"v2"'}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1):
+        return iter(chunked(self.body, chunk_size))
+
+
+class FakeSession:
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def get(self, url, **kwargs):
+        assert kwargs.get('stream'), "pages must be streamed"
+        return FakeResponse(self.body)
+
+
+def test_stream_hashes_across_chunk_boundaries(tmp_path):
+    assert len(PAGE) > VALIDATION_BYTES * 4
+
+    temp_path, content_hash = stream_to_temp_file(chunked(PAGE, 1000), tmp_path, "big.md")
+
+    assert content_hash == hashlib.sha256(PAGE).hexdigest()
+    assert temp_path.parent == tmp_path
+    assert temp_path.read_bytes() == PAGE
+
+
+def test_stream_validates_short_pages_at_end(tmp_path):
+    small = b"# Title\n\n- one\n- two\n\n[link](https://code.claude.com/docs)\n"
+    temp_path, content_hash = stream_to_temp_file([small[:10], small[10:]], tmp_path, "small.md")
+    assert temp_path.read_bytes() == small
+
+
+def test_stream_rejects_html_and_removes_temp_file(tmp_path):
+    html = b"<!DOCTYPE html><html><body>" + b"x" * VALIDATION_BYTES * 2
+
+    consumed = []
+
+    def chunks():
+        for chunk in chunked(html, 4096):
+            consumed.append(chunk)
+            yield chunk
+
+    with pytest.raises(ValueError):
+        stream_to_temp_file(chunks(), tmp_path, "page.md")
+    assert list(tmp_path.iterdir()) == []
+    # Rejected after the first VALIDATION_BYTES, not after the whole body
+    assert sum(map(len, consumed)) < len(html)
+
+
+def test_process_page_replaces_file_only_when_hash_differs(tmp_path):
+    source = DOC_SOURCES["claude-code"]
+    target = tmp_path / "claude-code" / "reference.md"
+    target.parent.mkdir()
+    target.write_bytes(PAGE)
+    manifest = {"files": {"claude-code/reference.md": {"hash": hashlib.sha256(PAGE).hexdigest()}}}
+
+    before = target.stat().st_ino
+    filename, entry = process_page("/docs/en/reference", FakeSession(PAGE), "https://code.claude.com",
+                                   "claude-code", source, tmp_path, manifest)
+    assert filename == "claude-code/reference.md"
+    assert target.stat().st_ino == before
+    assert entry["etag"] == '"v2"'
+
+    changed = PAGE + b"\n## Appendix\n"
+    filename, entry = process_page("/docs/en/reference", FakeSession(changed), "https://code.claude.com",
+                                   "claude-code", source, tmp_path, manifest)
+    assert target.read_bytes() == changed
+    assert entry["hash"] == hashlib.sha256(changed).hexdigest()
+    assert [p.name for p in target.parent.iterdir()] == ["reference.md"]
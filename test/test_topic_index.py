@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the /docs topic lookup table.
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+from topic_index import (
+    build_topic_table,
+    load_topic_table,
+    main,
+    normalize_topic,
+    resolve_topic,
+    topic_aliases,
+    write_topic_table,
+    TOPICS_FILE,
+)
+
+FILES = {
+    "claude-code/hooks.md": "# Hooks reference\n",
+    "claude-code/overview.md": "> Index note\n\n# Claude Code overview\n",
+    "claude-code/sdk__migration-guide.md": "# Migrate to the Agent SDK\n",
+    "platform/intro.md": "# Intro to Claude\n",
+    "platform/about-claude/models/overview.md": "# Models overview\n",
+    "platform/build-with-claude/overview.md": "# Features overview\n",
+    "platform/build-with-claude/streaming.md": "# Streaming Messages\n",
+}
+
+
+def make_docs(tmp_path):
+    for filename, text in FILES.items():
+        (tmp_path / filename).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / filename).write_text(text)
+    return tmp_path
+
+
+def test_aliases_cover_paths_flattened_names_and_titles():
+    aliases = {alias for _, alias in topic_aliases("platform/about-claude/models/overview.md", "Models overview")}
+    assert aliases == {
+        "platform/about-claude/models/overview",
+        "about-claude/models/overview",
+        "about-claude__models__overview",
+        "models/overview",
+        "overview",
+        "models-overview",
+    }
+    flat = {alias for _, alias in topic_aliases("claude-code/sdk__migration-guide.md")}
+    assert {"sdk__migration-guide", "sdk/migration-guide", "migration-guide"} <= flat
+
+
+def test_shared_aliases_prefer_claude_code_then_shallower_paths(tmp_path):
+    table = build_topic_table(FILES, [make_docs(tmp_path)])
+    assert table["overview"] == "claude-code/overview.md"
+    assert table["models/overview"] == "platform/about-claude/models/overview.md"
+    assert table["streaming"] == "platform/build-with-claude/streaming.md"
+    assert table["platform/intro"] == "platform/intro.md"
+
+
+def test_resolve_round_trips_through_the_file(tmp_path):
+    docs = make_docs(tmp_path)
+    write_topic_table(docs, build_topic_table(FILES, [docs]))
+    table = load_topic_table(docs)
+    lines = (docs / TOPICS_FILE).read_text().splitlines()
+    assert lines == sorted(lines)
+
+    assert resolve_topic(table, "hooks") == "claude-code/hooks.md"
+    assert resolve_topic(table, "Hooks.md") == "claude-code/hooks.md"
+    assert resolve_topic(table, "sdk/migration-guide") == "claude-code/sdk__migration-guide.md"
+    assert resolve_topic(table, "models overview") == "platform/about-claude/models/overview.md"
+    assert resolve_topic(table, "Streaming Messages") == "platform/build-with-claude/streaming.md"
+    assert resolve_topic(table, "platform/hooks") is None
+    assert load_topic_table(tmp_path / "missing") == {}
+
+
+def test_titles_come_from_the_first_root_that_has_the_file(tmp_path):
+    docs = make_docs(tmp_path / "docs")
+    staging = tmp_path / "staging"
+    (staging / "claude-code").mkdir(parents=True)
+    (staging / "claude-code" / "hooks.md").write_text("# Lifecycle hooks\n")
+    table = build_topic_table(["claude-code/hooks.md"], [staging, docs])
+    assert table["lifecycle-hooks"] == "claude-code/hooks.md"
+    assert "hooks-reference" not in table
+
+
+def test_cli_prints_helper_format(tmp_path, capsys):
+    docs = make_docs(tmp_path)
+    write_topic_table(docs, build_topic_table(FILES, [docs]))
+    assert main(["--docs-dir", str(docs), "resolve", "models", "overview"]) == 0
+    assert capsys.readouterr().out.strip() == \
+        f"platform|{docs / 'platform/about-claude/models/overview.md'}|about-claude/models/overview"
+    assert main(["--docs-dir", str(docs), "resolve", "nothing-here"]) == 1
+
+
+def test_normalize_topic():
+    assert normalize_topic(" /Platform/Intro.md ") == "platform/intro"
+    assert normalize_topic("models  overview") == "models-overview"
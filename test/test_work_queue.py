@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the persisted fetch work queue.
+"""
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+
+import pytest
+
+from work_queue import (
+    WorkQueue,
+    retry_backoff,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    DONE,
+    FAILED,
+    PENDING,
+)
+from fetch_claude_docs import HostRateLimiter, RetryLater
+
+LASTMODS = {"/docs/en/a": "2026-01-01", "/docs/en/b": None, "/docs/en/c": "2026-01-03"}
+
+
+def test_queue_survives_reload(tmp_path):
+    queue = WorkQueue(tmp_path / ".queue.json", full_sweep=False)
+    queue.add_source("platform", {"base_url": "https://platform.claude.com"}, LASTMODS)
+    queue.mark_done("platform", "/docs/en/a", "platform/a.md", {"hash": "1"})
+    queue.mark_failed("platform", "/docs/en/b", ValueError("boom"))
+    queue.save(force=True)
+
+    loaded = WorkQueue.load(tmp_path / ".queue.json")
+    assert loaded.full_sweep is False
+    assert "platform" in loaded
+    assert loaded.info("platform")["base_url"] == "https://platform.claude.com"
+    pages = loaded.pages("platform")
+    assert list(pages) == list(LASTMODS)
+    assert pages["/docs/en/a"]["status"] == DONE
+    assert pages["/docs/en/b"]["status"] == FAILED
+    assert pages["/docs/en/b"]["error"] == "boom"
+    assert pages["/docs/en/c"]["status"] == PENDING
+
+    # Only the remainder is due; the failed page waits for its backoff
+    assert loaded.due("platform") == ["/docs/en/c"]
+    later = datetime.now() + timedelta(seconds=RETRY_BACKOFF_BASE + 1)
+    assert loaded.due("platform", later) == ["/docs/en/b", "/docs/en/c"]
+
+
+def test_load_missing_queue(tmp_path):
+    assert WorkQueue.load(tmp_path / ".queue.json") is None
+
+
+def test_retry_state_carries_over_between_runs(tmp_path):
+    retry_at = (datetime.now() + timedelta(hours=1)).isoformat()
+    queue = WorkQueue(tmp_path / ".queue.json")
+    queue.add_source("platform", {}, LASTMODS, {"/docs/en/a": {"attempts": 2, "retry_at": retry_at, "error": "x"}})
+
+    assert queue.due("platform") == ["/docs/en/b", "/docs/en/c"]
+    record = queue.mark_failed("platform", "/docs/en/a", RetryLater("slow down", 7200), retry_after=7200)
+    assert record["attempts"] == 3
+    assert record["retry_at"] > retry_at
+
+
+def test_retry_backoff_grows_and_is_capped():
+    assert retry_backoff(1) == RETRY_BACKOFF_BASE
+    assert retry_backoff(2) == RETRY_BACKOFF_BASE * 2
+    assert retry_backoff(50) == RETRY_BACKOFF_MAX
+
+
+def test_paused_host_defers_instead_of_blocking():
+    limiter = HostRateLimiter()
+    limiter.pause("https://platform.claude.com/a", 3600)
+    with pytest.raises(RetryLater):
+        limiter.acquire("https://platform.claude.com/b", max_wait=60)
+    # Other hosts are unaffected
+    limiter.acquire("https://code.claude.com/docs/en/hooks", max_wait=60)